@@ -0,0 +1,339 @@
+"""
+End-to-end throughput benchmark for both pipeline phases
+Builds a synthetic corpus of N contracts from data/hospital_agreements.csv,
+starts the local stand-ins (standins/) with the canned samples/ results, and
+runs Phase 1 then Phase 2 for every worker count in the sweep. Each run is a
+separate process on a fresh database, so peak RSS is per run.
+
+Writes a JSON report (sorted keys) that can be diffed between commits.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --contracts 200 --workers 5 10 20
+    python benchmarks/pipeline_benchmark.py --contracts 50 --docai-latency-ms 3000 --llm-latency-ms 20000
+"""
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).parent.parent
+CSV_PATH = REPO_ROOT / "data" / "hospital_agreements.csv"
+REPORT_PATH = REPO_ROOT / "benchmarks" / "results" / "benchmark_report.json"
+
+# Seconds between checks on a benchmark child process
+CHILD_POLL_SECONDS = 1.0
+
+sys.path.insert(0, str(REPO_ROOT / "standins"))
+
+def percentiles(values):
+    """p50 / p95 / p99 (nearest rank) of a list of seconds"""
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, max(0, int(len(ordered) * p / 100 + 0.5) - 1))], 3)
+
+    return {'p50': rank(50), 'p95': rank(95), 'p99': rank(99), 'count': len(ordered)}
+
+def build_corpus(num_contracts, csv_path, out_path):
+    """Write a synthetic CSV of num_contracts contracts cycled from the real CSV
+
+    Every contract gets a unique id and a gs:// path, so Phase 1 takes the
+    GCS fast path and the Document AI stand-in picks a canned document by URI.
+    """
+    source = pd.read_csv(csv_path)
+    rows = []
+    for k in range(num_contracts):
+        row = source.iloc[k % len(source)].to_dict()
+        contract_id = f"bench-{k:06d}-{str(row['id'])[:8]}"
+        row['id'] = contract_id
+        row['gcs_pdf_path'] = f"gs://bench-corpus/{contract_id}.pdf"
+        rows.append(row)
+
+    pd.DataFrame(rows).to_csv(out_path, index=False)
+    return out_path
+
+def start_standins(args):
+    """Start the Document AI and OpenAI stand-ins on free ports (daemon threads)
+
+    Returns:
+        dict: Environment variables pointing the pipelines at them
+    """
+    from http.server import ThreadingHTTPServer
+    from faults import FaultInjector
+    import docai_server
+    import openai_server
+
+    docai_server.StandInHandler.standin = docai_server.DocAIStandIn(docai_server.load_canned_documents())
+    docai_server.StandInHandler.faults = FaultInjector(
+        latency_ms=args.docai_latency_ms, latency_sigma=args.latency_sigma,
+        rate_429=args.rate_429, seed=args.seed
+    )
+    openai_server.ChatCompletionsHandler.completions = openai_server.load_canned_completions()
+    openai_server.ChatCompletionsHandler.faults = FaultInjector(
+        latency_ms=args.llm_latency_ms, latency_sigma=args.latency_sigma,
+        rate_429=args.rate_429, seed=args.seed
+    )
+
+    servers = [
+        ThreadingHTTPServer(('127.0.0.1', 0), docai_server.StandInHandler),
+        ThreadingHTTPServer(('127.0.0.1', 0), openai_server.ChatCompletionsHandler),
+    ]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    docai_url = f"http://127.0.0.1:{servers[0].server_port}"
+    return {
+        'DOCAI_BASE_URL': docai_url,
+        'GCS_API_URL': docai_url,
+        'DOCAI_STATIC_TOKEN': 'benchmark',
+        'OPENAI_BASE_URL': f"http://127.0.0.1:{servers[1].server_port}/v1",
+        'OPENAI_API_KEY': 'benchmark',
+        # Quotas would cap the stand-ins - measure the pipeline itself
+        'DOCAI_REQUESTS_PER_MINUTE': '0',
+        'OPENAI_REQUESTS_PER_MINUTE': '0',
+        'OPENAI_TOKENS_PER_MINUTE': '0',
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_phase1(config, results):
+    """Child process: Phase 1 on a fresh database"""
+    os.environ.update(config['env'])
+    os.chdir(config['work_dir'])
+    sys.path.insert(0, str(REPO_ROOT))
+    import asyncio
+
+    with open(config['log_path'], 'a') as log, redirect_stdout(log):
+        import main_extraction_pipeline_async as phase1
+
+        latencies = []
+
+        class TimedPipeline(phase1.AsyncExtractionPipeline):
+            def finish(self, job, result):
+                # Time in the pipeline, from entering the first stage queue to the result
+                latencies.append(time.perf_counter() - job.started)
+                super().finish(job, result)
+
+        pipeline = TimedPipeline(
+            db_path=config['db_path'], csv_path=config['csv_path'],
+            num_workers=config['workers'], max_workers=config['workers'], adaptive=False, order=config['order']
+        )
+        started = time.perf_counter()
+        asyncio.run(pipeline.run_async())
+        elapsed = time.perf_counter() - started
+        stats = pipeline.get_processing_stats()
+
+    from stage_timer import stage_percentiles, PHASE1
+    conn = phase1.connect(config['db_path'], readonly=True)
+    stages = stage_percentiles(conn, PHASE1)
+    conn.close()
+
+    results.put({
+        'elapsed': elapsed,
+        'succeeded': stats['success'],
+        'failed': stats['failed'],
+        'latency': {'contract': percentiles(latencies)},
+        'stages': stages,
+        'queues': {name: stage_queue.stats() for name, stage_queue in pipeline.queues.items()},
+        'db_write_seconds': pipeline.writer.stats()['write_seconds'],
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+def run_phase2(config, results):
+    """Child process: Phase 2 on the database Phase 1 produced"""
+    os.environ.update(config['env'])
+    os.chdir(config['work_dir'])  # Phase 2 writes debug_*.txt files to the cwd
+    sys.path.insert(0, str(REPO_ROOT))
+    import asyncio
+
+    with open(config['log_path'], 'a') as log, redirect_stdout(log):
+        import llm_extract_tables_openai as phase2
+
+        latencies = []
+        llm_latencies = []
+
+        class TimedExtractor(phase2.GPT5TableExtractor):
+            def setup_client(self):
+                super().setup_client()
+                call = self.llm_caller.call
+
+                def timed_call(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return call(*args, **kwargs)
+                    finally:
+                        llm_latencies.append(time.perf_counter() - started)
+
+                self.llm_caller.call = timed_call
+
+            async def process_contract_async(self, *args, **kwargs):
+                started = time.perf_counter()
+                result = await super().process_contract_async(*args, **kwargs)
+                latencies.append(time.perf_counter() - started)
+                return result
+
+        extractor = TimedExtractor(num_workers=config['workers'], db_path=config['db_path'], order=config['order'])
+        started = time.perf_counter()
+        asyncio.run(extractor.run_async())
+        elapsed = time.perf_counter() - started
+
+    from stage_timer import stage_percentiles, PHASE2
+    conn = phase2.connect(config['db_path'], readonly=True)
+    succeeded = conn.execute("SELECT COUNT(*) FROM contracts WHERE llm_extracted_tables IS NOT NULL").fetchone()[0]
+    stages = stage_percentiles(conn, PHASE2)
+    conn.close()
+
+    results.put({
+        'elapsed': elapsed,
+        'succeeded': succeeded,
+        'failed': len(latencies) - succeeded,
+        'latency': {'contract': percentiles(latencies), 'llm_call': percentiles(llm_latencies)},
+        'stages': stages,
+        'db_write_seconds': extractor.writer.stats()['write_seconds'],
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+def run_in_child(target, config):
+    """Run one benchmark step in a fresh process and return its result dict
+
+    Raises:
+        RuntimeError: If the child exits without a result (import error, crash)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=target, args=(config, results))
+    process.start()
+
+    while True:
+        # Check the child between polls - a dead child never puts its result
+        alive = process.is_alive()
+        try:
+            result = results.get(timeout=CHILD_POLL_SECONDS)
+            break
+        except queue.Empty:
+            if not alive:
+                process.join()
+                raise RuntimeError(f"{target.__name__} exited with status {process.exitcode} without a result "
+                                   f"(traceback on stderr, output in {config['log_path']})")
+
+    process.join()
+    return result
+
+def git_commit():
+    """Current commit hash (or None outside a git checkout)"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='End-to-end benchmark for Phase 1 and Phase 2 against local stand-ins')
+    parser.add_argument('--contracts', type=int, default=100, help='Synthetic corpus size (default: 100)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[5, 10, 20], help='Worker counts to sweep (default: 5 10 20)')
+    parser.add_argument('--phases', nargs='+', choices=['phase1', 'phase2'], default=['phase1', 'phase2'],
+                        help='Phases to run (phase2 needs phase1 output)')
+    parser.add_argument('--docai-latency-ms', type=float, default=1500, help='Stand-in Document AI median latency (default: 1500)')
+    parser.add_argument('--llm-latency-ms', type=float, default=3000, help='Stand-in LLM median latency (default: 3000)')
+    parser.add_argument('--latency-sigma', type=float, default=0.4, help='Lognormal latency spread (default: 0.4)')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Injected 429 probability (default: 0)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', default=str(REPORT_PATH), help=f'Report path (default: {REPORT_PATH.relative_to(REPO_ROOT)})')
+    parser.add_argument('--order', choices=['id', 'lpt', 'spt'], default='id', help='Queue order (default: id)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temp work directory (databases, logs)')
+    args = parser.parse_args()
+
+    work_root = Path(tempfile.mkdtemp(prefix='grilo_bench_'))
+    csv_path = build_corpus(args.contracts, CSV_PATH, work_root / "corpus.csv")
+    env = start_standins(args)
+
+    print("="*80)
+    print(f"BENCHMARK - {args.contracts} contracts, workers {args.workers}")
+    print("="*80)
+    print(f"Work dir: {work_root}\n")
+
+    runs = []
+    for workers in args.workers:
+        run_dir = work_root / f"workers_{workers}"
+        run_dir.mkdir()
+        config = {
+            # Every run starts cold and leaves the real caches alone
+            'env': {**env, 'RESPONSE_PACK_DIR': str(run_dir / "response_packs"),
+                    'PDF_CACHE_DIR': str(run_dir / "pdf_cache"),
+                    'DOCAI_TOKEN_CACHE': str(run_dir / "docai_token_cache.json")},
+            'work_dir': str(run_dir),
+            'db_path': str(run_dir / "hospital_tables.db"),
+            'csv_path': str(csv_path),
+            'log_path': str(run_dir / "run.log"),
+            'workers': workers,
+            'order': args.order,
+        }
+
+        for phase in args.phases:
+            target = run_phase1 if phase == 'phase1' else run_phase2
+            result = run_in_child(target, config)
+            result.update({
+                'phase': phase,
+                'workers': workers,
+                'contracts': args.contracts,
+                'elapsed': round(result['elapsed'], 2),
+                'contracts_per_min': round(result['succeeded'] / result['elapsed'] * 60, 1) if result['elapsed'] else None,
+                'db_write_seconds': round(result['db_write_seconds'], 3),
+            })
+            runs.append(result)
+
+            contract = result['latency']['contract']
+            print(f"[{phase}] workers={workers:<3} {result['contracts_per_min']:>8} contracts/min  "
+                  f"p50={contract['p50']}s p95={contract['p95']}s p99={contract['p99']}s  "
+                  f"db={result['db_write_seconds']}s rss={result['peak_rss_mb']}MB  "
+                  f"({result['succeeded']} ok, {result['failed']} failed)")
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'contracts': args.contracts,
+            'workers': args.workers,
+            'phases': args.phases,
+            'docai_latency_ms': args.docai_latency_ms,
+            'llm_latency_ms': args.llm_latency_ms,
+            'latency_sigma': args.latency_sigma,
+            'rate_429': args.rate_429,
+            'seed': args.seed,
+            'order': args.order,
+        },
+        'runs': runs,
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if not args.keep:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    print(f"\n[OK] Report saved to: {output}")
+
+if __name__ == "__main__":
+    main()
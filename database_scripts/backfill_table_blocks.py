@@ -0,0 +1,90 @@
+"""
+Backfill table_blocks_json for rows Phase 1 wrote before it was materialized
+(or with an older TABLE_BLOCKS_VERSION, see src/google_docai/table_blocks.py)
+
+Safe to stop and re-run: only rows without the current version are
+processed and every chunk commits on its own.
+
+Usage:
+    python database_scripts/backfill_table_blocks.py
+    python database_scripts/backfill_table_blocks.py --limit 100
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Shared modules (DB connection factory, codec, table_blocks) live in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "google_docai"))
+from db_connection import connect, DB_PATH
+import json_codec
+from table_blocks import materialize_table_blocks, ensure_table_blocks_columns, TABLE_BLOCKS_VERSION
+
+CHUNK_SIZE = 100
+
+def backfill(conn, limit=None):
+    """Materialize table blocks chunk by chunk
+
+    Returns:
+        tuple: (rows updated, rows that failed)
+    """
+    updated = failed = 0
+    last_rowid = 0
+
+    while limit is None or updated + failed < limit:
+        chunk = CHUNK_SIZE if limit is None else min(CHUNK_SIZE, limit - updated - failed)
+        rows = conn.execute("""
+            SELECT rowid, id, raw_json FROM contracts
+            WHERE rowid > ? AND raw_json IS NOT NULL
+              AND (table_blocks_version IS NULL OR table_blocks_version != ?)
+            ORDER BY rowid LIMIT ?
+        """, (last_rowid, TABLE_BLOCKS_VERSION, chunk)).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+
+        updates = []
+        for rowid, contract_id, raw_json in rows:
+            try:
+                table_blocks_json, num_blocks, num_cells = materialize_table_blocks(json_codec.loads(raw_json))
+            except Exception as e:
+                print(f"  [WARNING] {contract_id[:40]}: {e}")
+                failed += 1
+                continue
+            updates.append((json_codec.encode(table_blocks_json), TABLE_BLOCKS_VERSION, num_blocks, num_cells, rowid))
+
+        if updates:
+            with conn:
+                conn.executemany("""
+                    UPDATE contracts
+                    SET table_blocks_json = ?, table_blocks_version = ?, table_block_count = ?, table_cell_count = ?
+                    WHERE rowid = ?
+                """, updates)
+            updated += len(updates)
+            print(f"  {updated} rows backfilled...")
+
+    return updated, failed
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Backfill table_blocks_json from raw_json')
+    parser.add_argument('--db', default=DB_PATH, help='Database path (default: data/hospital_tables.db)')
+    parser.add_argument('--limit', type=int, help='Stop after this many rows')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print(f"BACKFILL TABLE BLOCKS (v{TABLE_BLOCKS_VERSION})")
+    print("="*80 + "\n")
+
+    conn = connect(args.db)
+    ensure_table_blocks_columns(conn)
+
+    started = time.time()
+    updated, failed = backfill(conn, args.limit)
+    conn.close()
+
+    print(f"\n[OK] {updated} rows backfilled, {failed} failed ({time.time() - started:.1f}s)\n")
+
+if __name__ == "__main__":
+    main()
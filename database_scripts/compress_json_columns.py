@@ -0,0 +1,129 @@
+"""
+Compress the JSON columns in place (one-shot migration, see src/json_codec.py)
+Rewrites raw_json, extracted_tables, llm_extracted_tables, aistudio_json and
+table_blocks_json as tagged zstd/gzip BLOBs, then VACUUMs so the file
+actually shrinks.
+
+Safe to stop and re-run: values already in the target format are skipped
+and every chunk commits on its own. Response pack pointers are left alone
+(database_scripts/pack_raw_json.py --unpack moves those back into the row).
+
+Usage:
+    python database_scripts/compress_json_columns.py
+    python database_scripts/compress_json_columns.py --codec gzip
+    python database_scripts/compress_json_columns.py --decompress   # Back to plain TEXT
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Shared modules (DB connection factory, codec) live in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect, DB_PATH
+import json_codec
+
+CHUNK_SIZE = 200
+
+TAGS = {'zstd': json_codec.TAG_ZSTD, 'gzip': json_codec.TAG_GZIP, 'none': json_codec.TAG_PLAIN}
+
+def db_size_mb(db_path):
+    """Database file + WAL size in MB"""
+    total = 0
+    for suffix in ('', '-wal'):
+        path = Path(f"{db_path}{suffix}")
+        if path.exists():
+            total += path.stat().st_size
+    return total / (1024 * 1024)
+
+def convert(value, codec, decompress):
+    """New stored value, or None if the value is already in the target format
+
+    Pack pointers are never rewritten - decoding one would copy the whole
+    response back into the row and undo the packing.
+    """
+    if value is None or json_codec.is_pack_pointer(value):
+        return None
+    if decompress:
+        return json_codec.decode(value) if json_codec.is_encoded(value) else None
+    if json_codec.is_encoded(value) and bytes(value[:1]) == TAGS[codec]:
+        return None
+    return json_codec.encode(json_codec.decode(value), codec)
+
+def migrate_column(conn, column, codec, decompress):
+    """Rewrite one column chunk by chunk
+
+    Returns:
+        tuple: (rows rewritten, bytes before, bytes after)
+    """
+    rewritten = bytes_before = bytes_after = 0
+    last_rowid = 0
+
+    while True:
+        rows = conn.execute(f"""
+            SELECT rowid, {column} FROM contracts
+            WHERE rowid > ? AND {column} IS NOT NULL
+            ORDER BY rowid LIMIT ?
+        """, (last_rowid, CHUNK_SIZE)).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+
+        updates = []
+        for rowid, value in rows:
+            new_value = convert(value, codec, decompress)
+            if new_value is None:
+                continue
+            old_size = len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+            new_size = len(new_value.encode('utf-8')) if isinstance(new_value, str) else len(new_value)
+            bytes_before += old_size
+            bytes_after += new_size
+            updates.append((new_value, rowid))
+
+        if updates:
+            with conn:
+                conn.executemany(f"UPDATE contracts SET {column} = ? WHERE rowid = ?", updates)
+            rewritten += len(updates)
+            print(f"  {column}: {rewritten} rows rewritten...")
+
+    return rewritten, bytes_before, bytes_after
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Compress JSON columns in place (tagged zstd/gzip BLOBs)')
+    parser.add_argument('--db', default=DB_PATH, help='Database path (default: data/hospital_tables.db)')
+    parser.add_argument('--codec', choices=['zstd', 'gzip', 'none'], default=json_codec.CODEC,
+                        help=f'Target codec (default: {json_codec.CODEC})')
+    parser.add_argument('--decompress', action='store_true', help='Rewrite everything back to plain TEXT')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip the final VACUUM')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("DECOMPRESS JSON COLUMNS" if args.decompress else f"COMPRESS JSON COLUMNS ({args.codec})")
+    print("="*80 + "\n")
+
+    size_before = db_size_mb(args.db)
+    conn = connect(args.db)
+
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(contracts)").fetchall()]
+    targets = [column for column in json_codec.JSON_COLUMNS if column in columns]
+    print(f"[INFO] Columns: {', '.join(targets)}\n")
+
+    for column in targets:
+        rewritten, bytes_before, bytes_after = migrate_column(conn, column, args.codec, args.decompress)
+        if rewritten:
+            print(f"[OK] {column}: {rewritten} rows, {bytes_before / 1024 / 1024:.1f} MB -> "
+                  f"{bytes_after / 1024 / 1024:.1f} MB")
+        else:
+            print(f"[OK] {column}: nothing to rewrite")
+
+    if not args.no_vacuum:
+        print("\n[INFO] Checkpointing and vacuuming (rewrites the file)...")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    print(f"\n[OK] Database: {size_before:.1f} MB -> {db_size_mb(args.db):.1f} MB\n")
+
+if __name__ == "__main__":
+    main()
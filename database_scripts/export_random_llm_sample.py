@@ -4,14 +4,23 @@ Creates: samples/export_N/ containing:
   - contract.pdf (Downloaded PDF if possible)
   - pdf_link.txt (PDF URL for reference)
   - raw_json.json (Google Document AI output)
+  - table_blocks.json (tableBlocks materialized by Phase 1, if present)
   - llm_extraction.json (Gemini formatted tables)
 """
-import sqlite3
+import sys
 import json
 import os
+import shutil
+import tempfile
 from pathlib import Path
 import random
 
+# Shared modules (DB connection factory, PDF cache) live in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+from pdf_cache import get_pdf_cache
+import json_codec
+
 # Try to import download libraries
 try:
     import requests
@@ -53,31 +62,39 @@ def get_next_export_number():
 def export_random_llm_extraction():
     """Export one random LLM-extracted table to a numbered folder"""
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH, readonly=True)
     cursor = conn.cursor()
     
-    # Get all contracts with LLM-extracted tables
-    cursor.execute("""
+    # Get all contracts with LLM-extracted tables (ids only - the JSON is fetched for the pick)
+    cursor.execute("SELECT id FROM contracts WHERE llm_extracted_tables IS NOT NULL")
+    ids = [row[0] for row in cursor.fetchall()]
+    
+    if not ids:
+        conn.close()
+        print("[INFO] No LLM-extracted tables found in database")
+        return
+    
+    columns = [col[1] for col in cursor.execute("PRAGMA table_info(contracts)").fetchall()]
+    table_blocks_column = 'table_blocks_json' if 'table_blocks_json' in columns else 'NULL'
+    
+    # Pick one random contract
+    cursor.execute(f"""
         SELECT 
             id, 
             hospital_name, 
             year, 
             original_pdf_url, 
             raw_json,
-            llm_extracted_tables 
+            llm_extracted_tables,
+            {table_blocks_column}
         FROM contracts 
-        WHERE llm_extracted_tables IS NOT NULL
-    """)
-    
-    rows = cursor.fetchall()
+        WHERE id = ?
+    """, (random.choice(ids),))
+    contract_id, hospital, year, pdf_url, raw_json, llm_extraction, table_blocks = cursor.fetchone()
     conn.close()
     
-    if not rows:
-        print("[INFO] No LLM-extracted tables found in database")
-        return
-    
-    # Pick one random contract
-    contract_id, hospital, year, pdf_url, raw_json, llm_extraction = random.choice(rows)
+    raw_json = json_codec.decode(raw_json)
+    llm_extraction = json_codec.decode(llm_extraction)
     
     # Get next export number
     export_num = get_next_export_number()
@@ -126,16 +143,25 @@ def export_random_llm_extraction():
     print(f"Downloading PDF...")
     
     pdf_downloaded = False
+    cache = get_pdf_cache()
+    cached_path = cache.lookup(url=pdf_url, contract_id=contract_id)
+    
+    if cached_path:
+        shutil.copyfile(cached_path, pdf_file)
+        pdf_downloaded = True
+        print(f"[OK] Using cached PDF")
     
-    if HAS_REQUESTS:
+    elif HAS_REQUESTS:
         try:
             response = requests.get(pdf_url, timeout=30, stream=True)
             response.raise_for_status()
             
-            with open(pdf_file, 'wb') as f:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+                temp_path = f.name
             
+            shutil.copyfile(cache.add_file(temp_path, url=pdf_url, contract_id=contract_id), pdf_file)
             pdf_downloaded = True
             
         except Exception as e:
@@ -144,6 +170,7 @@ def export_random_llm_extraction():
     elif HAS_URLLIB:
         try:
             urllib.request.urlretrieve(pdf_url, pdf_file)
+            cache.add_file(pdf_file, url=pdf_url, contract_id=contract_id, move=False)
             pdf_downloaded = True
             
         except Exception as e:
@@ -174,6 +201,11 @@ def export_random_llm_extraction():
         with open(raw_json_file, 'w', encoding='utf-8') as f:
             f.write("null")
     
+    # Write table blocks (what Phase 2 sends to the LLM)
+    if table_blocks is not None:
+        with open(export_folder / "table_blocks.json", 'w', encoding='utf-8') as f:
+            json.dump(json_codec.loads(table_blocks), f, indent=2, ensure_ascii=False)
+    
     # Write LLM extraction (Gemini formatted tables)
     llm_file = export_folder / "llm_extraction.json"
     try:
@@ -190,6 +222,8 @@ def export_random_llm_extraction():
         print(f"  - contract.pdf        (Downloaded PDF)")
     print(f"  - pdf_link.txt        (PDF URL)")
     print(f"  - raw_json.json       (Google Document AI output)")
+    if table_blocks is not None:
+        print(f"  - table_blocks.json   (tableBlocks sent to the LLM)")
     print(f"  - llm_extraction.json (Gemini formatted tables)")
     print(f"\nYou can now:")
     if pdf_downloaded:
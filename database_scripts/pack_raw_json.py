@@ -0,0 +1,116 @@
+"""
+Move raw_json out of the database into the response pack archive
+(see src/response_pack.py). Each row's raw_json is compressed if needed,
+appended to data/response_packs/ and replaced by a pointer, then the
+database is VACUUMed.
+
+Safe to stop and re-run: rows that already hold a pointer are skipped and
+every chunk commits on its own.
+
+Usage:
+    python database_scripts/pack_raw_json.py
+    python database_scripts/pack_raw_json.py --verify     # Check every blob against its hash
+    python database_scripts/pack_raw_json.py --unpack     # Move responses back into the database
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Shared modules (DB connection factory, codec, packs) live in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect, DB_PATH
+import json_codec
+from response_pack import get_pack_writer, get_pack_reader, PACK_DIR
+
+CHUNK_SIZE = 200
+
+def db_size_mb(db_path):
+    """Database file + WAL size in MB"""
+    total = 0
+    for suffix in ('', '-wal'):
+        path = Path(f"{db_path}{suffix}")
+        if path.exists():
+            total += path.stat().st_size
+    return total / (1024 * 1024)
+
+def convert(contract_id, value, unpack):
+    """New raw_json value, or None if the row is already in the target form"""
+    if unpack:
+        if not json_codec.is_pack_pointer(value):
+            return None
+        return bytes(get_pack_reader().resolve(bytes(value)[1:]))
+
+    if json_codec.is_pack_pointer(value):
+        return None
+    blob = value if json_codec.is_encoded(value) else json_codec.encode(value)
+    return get_pack_writer().append(contract_id, blob)
+
+def move_raw_json(conn, unpack):
+    """Rewrite raw_json chunk by chunk
+
+    Returns:
+        int: Rows rewritten
+    """
+    rewritten = 0
+    last_rowid = 0
+
+    while True:
+        rows = conn.execute("""
+            SELECT rowid, id, raw_json FROM contracts
+            WHERE rowid > ? AND raw_json IS NOT NULL
+            ORDER BY rowid LIMIT ?
+        """, (last_rowid, CHUNK_SIZE)).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+
+        updates = []
+        for rowid, contract_id, value in rows:
+            new_value = convert(contract_id, value, unpack)
+            if new_value is not None:
+                updates.append((new_value, rowid))
+
+        if updates:
+            with conn:
+                conn.executemany("UPDATE contracts SET raw_json = ? WHERE rowid = ?", updates)
+            rewritten += len(updates)
+            print(f"  {rewritten} rows rewritten...")
+
+    return rewritten
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Move raw_json into the mmap response pack archive')
+    parser.add_argument('--db', default=DB_PATH, help='Database path (default: data/hospital_tables.db)')
+    parser.add_argument('--unpack', action='store_true', help='Move responses back into the database (compressed)')
+    parser.add_argument('--verify', action='store_true', help='Only verify pack contents against their hashes')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip the final VACUUM')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("RESPONSE PACK ARCHIVE")
+    print("="*80 + "\n")
+    print(f"Packs: {PACK_DIR}\n")
+
+    if args.verify:
+        checked, bad = get_pack_reader().verify()
+        print(f"[OK] {checked} blobs checked" if not bad else f"[ERROR] {len(bad)} of {checked} blobs are corrupt: {bad[:10]}")
+        return
+
+    size_before = db_size_mb(args.db)
+    conn = connect(args.db)
+
+    rewritten = move_raw_json(conn, args.unpack)
+    print(f"[OK] {rewritten} rows {'moved back into the database' if args.unpack else 'moved to packs'}")
+
+    if rewritten and not args.no_vacuum:
+        print("\n[INFO] Checkpointing and vacuuming (rewrites the file)...")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    print(f"\n[OK] Database: {size_before:.1f} MB -> {db_size_mb(args.db):.1f} MB\n")
+
+if __name__ == "__main__":
+    main()
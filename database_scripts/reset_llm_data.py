@@ -2,13 +2,18 @@
 Reset LLM extraction data
 Clears llm_extracted_tables column to re-run extraction
 """
-import sqlite3
+import sys
+from pathlib import Path
+
+# Shared DB connection factory lives in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
 
 DB_PATH = "data/hospital_tables.db"
 
 def reset_llm_extractions():
     """Clear all LLM extraction data"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     
     # Check if column exists
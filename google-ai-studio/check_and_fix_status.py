@@ -1,12 +1,18 @@
 """
-Check database status and fix stuck processing entries
+Check database status, show work leases and fix stuck processing entries
+(processing_worker_N rows are left by extractors from before work_leases)
 """
-import sqlite3
+import sys
 from pathlib import Path
 
+# Shared DB connection factory lives in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+from work_leases import setup_work_leases, lease_summary
+
 DB_PATH = Path(__file__).parent.parent / "data" / "hospital_tables.db"
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 cursor = conn.cursor()
 
 print("="*80)
@@ -45,6 +51,12 @@ cursor.execute("SELECT COUNT(*) FROM contracts WHERE aistudio_extraction_status
 failed_count = cursor.fetchone()[0]
 print(f"Failed extractions: {failed_count}")
 
+# Leases (Phase 1, Phase 2 and AI Studio) - expired ones are reclaimed by the next run
+setup_work_leases(conn)
+print("\nWork leases (active / expired):")
+for task, (active, expired) in sorted(lease_summary(conn).items()):
+    print(f"  {task}: {active} / {expired}")
+
 # Fix stuck entries
 if stuck_count > 0:
     print(f"\n{'='*80}")
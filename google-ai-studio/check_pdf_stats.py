@@ -1,9 +1,13 @@
-import sqlite3
+import sys
 from pathlib import Path
 
+# Shared DB connection factory lives in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+
 DB_PATH = Path(__file__).parent.parent / "data" / "hospital_tables.db"
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH, readonly=True)
 cursor = conn.cursor()
 
 # Total PDFs
@@ -2,10 +2,15 @@
 Fix UTF-8 encoding in extracted JSON files and database
 Run this AFTER batch extraction completes
 """
+import sys
 import json
-import sqlite3
 from pathlib import Path
 
+# Shared DB connection factory lives in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+import json_codec
+
 DB_PATH = Path(__file__).parent.parent / "data" / "hospital_tables.db"
 EXTRACTIONS_DIR = Path(__file__).parent / "extractions"
 
@@ -14,7 +19,7 @@ print("Fixing UTF-8 Encoding in Extracted Files")
 print("="*80 + "\n")
 
 # Get all successful extractions from database
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 cursor = conn.cursor()
 
 cursor.execute("""
@@ -32,16 +37,14 @@ fixed_count = 0
 for contract_id, json_str in results:
     try:
         # Parse the JSON (this might have encoding issues)
-        data = json.loads(json_str)
-        
-        # Re-save to database with explicit UTF-8 encoding
-        clean_json = json.dumps(data, ensure_ascii=False, indent=2)
+        data = json_codec.loads(json_str)
         
+        # Re-save to database with explicit UTF-8 encoding (compressed, see json_codec)
         cursor.execute("""
             UPDATE contracts 
             SET aistudio_json = ?
             WHERE id = ?
-        """, (clean_json, contract_id))
+        """, (json_codec.dumps(data), contract_id))
         
         fixed_count += 1
         if fixed_count % 10 == 0:
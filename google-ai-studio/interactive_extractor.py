@@ -2,14 +2,21 @@
 Interactive Google AI Studio Extractor
 Uses Playwright to semi-automate the extraction process with user guidance
 """
-import sqlite3
+import sys
 import json
 import asyncio
 from pathlib import Path
 from datetime import datetime
-import requests
 from playwright.async_api import async_playwright
 
+# Shared modules (DB connection factory, PDF cache) live in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+import json_codec
+from pdf_cache import get_pdf_cache
+from pdf_downloader import get_downloader, DownloadError
+from work_leases import WorkLeases, TASK_AISTUDIO, setup_work_leases
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -22,6 +29,12 @@ NUM_WORKERS = 8  # Number of parallel Chrome tabs (workers)
 BATCH_SIZE = 100  # Total PDFs to process in this batch
 
 DB_PATH = Path(__file__).parent.parent / "data" / "hospital_tables.db"
+
+# Contracts still to extract - also re-checked when claiming, so several
+# extractor processes (or machines sharing the database) split the backlog
+PENDING_SQL = """original_pdf_url IS NOT NULL
+    AND (aistudio_extraction_status IS NULL OR aistudio_extraction_status = 'failed')"""
+leases = WorkLeases(DB_PATH, TASK_AISTUDIO, pending_sql=PENDING_SQL)
 OUTPUT_DIR = Path(__file__).parent / "extractions"
 USER_DATA_DIR = Path(__file__).parent / "browser_data"  # Persistent browser data for cookies
 COOKIES_FILE = Path(__file__).parent / "cookies.json"  # Saved cookies for auto-login
@@ -76,25 +89,35 @@ Rules:
 - After the JSON, on a new line, write exactly: JSON EXTRACTED SUCCESSFULLY
 """
 
-async def download_pdf(pdf_url, output_path):
-    """Download PDF synchronously"""
+async def download_pdf(pdf_url, contract_id=None):
+    """Download PDF into the shared PDF cache (streamed, resumable)
+
+    Returns:
+        Path to the cached PDF (shared - do not delete) or None
+    """
+    cache = get_pdf_cache()
+    
+    cached_path = cache.lookup(url=pdf_url, contract_id=contract_id)
+    if cached_path:
+        print(f"[OK] Using cached PDF: {cached_path}")
+        return Path(cached_path)
+    
+    # Import PDFs downloaded by older runs into the cache
+    legacy_path = OUTPUT_DIR / "pdfs" / f"{contract_id}.pdf"
+    if contract_id and legacy_path.exists():
+        return Path(cache.add_file(legacy_path, url=pdf_url, contract_id=contract_id, move=False))
+    
     print(f"[INFO] Downloading: {pdf_url}")
     
     try:
-        response = requests.get(pdf_url, timeout=60, stream=True)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
+        output_path = Path(await get_downloader().download_async(pdf_url, contract_id=contract_id))
         size_mb = output_path.stat().st_size / (1024 * 1024)
         print(f"[OK] Downloaded ({size_mb:.2f} MB): {output_path}")
-        return True
+        return output_path
         
-    except Exception as e:
+    except DownloadError as e:
         print(f"[ERROR] Download failed: {e}")
-        return False
+        return None
 
 async def wait_for_user_action(page, message, timeout=300):
     """Wait for user to complete an action"""
@@ -757,7 +780,7 @@ async def save_result(contract_info, extracted_data, output_dir, success=True, w
     
     # Save to database with status
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(DB_PATH)
         cursor = conn.cursor()
         
         status = 'success' if success else 'failed'
@@ -768,7 +791,7 @@ async def save_result(contract_info, extracted_data, output_dir, success=True, w
                 aistudio_extraction_status = ?
             WHERE id = ?
         """, (
-            json.dumps(extracted_data, ensure_ascii=False) if extracted_data else None,
+            json_codec.dumps(extracted_data) if extracted_data else None,
             status,
             contract_info['id']
         ))
@@ -776,6 +799,9 @@ async def save_result(contract_info, extracted_data, output_dir, success=True, w
         conn.commit()
         conn.close()
         
+        # Result is stored - other extractors may pick the contract up again (if failed)
+        leases.release(contract_info['id'])
+        
         print(f"[OK] Saved to database - Status: {status}")
     except Exception as e:
         print(f"[WARNING] Could not save to database: {e}")
@@ -835,21 +861,16 @@ async def worker_process_pdfs(context, worker_id, assigned_pdfs):
         for pdf_index, contract in enumerate(assigned_pdfs, 1):
             print(f"\n[Worker {worker_id}] Processing PDF {pdf_index}/{len(assigned_pdfs)}: {contract['hospital_name']}")
             
-            # Download PDF
-            pdf_dir = OUTPUT_DIR / "pdfs"
-            pdf_dir.mkdir(exist_ok=True)
-            pdf_path = pdf_dir / f"{contract['id']}.pdf"
-            
-            if not pdf_path.exists():
-                success = await download_pdf(contract['pdf_url'], pdf_path)
-                if not success:
-                    print(f"[Worker {worker_id}] Download failed - retrying in 10 seconds...")
-                    await page.wait_for_timeout(10000)
-                    success = await download_pdf(contract['pdf_url'], pdf_path)
-                    if not success:
-                        await save_result(contract, None, OUTPUT_DIR, success=False, worker_id=worker_id)
-                        print(f"[Worker {worker_id}] ✗ Download failed after retry - skipping")
-                        continue
+            # Download PDF (or reuse it from the shared PDF cache)
+            pdf_path = await download_pdf(contract['pdf_url'], contract['id'])
+            if not pdf_path:
+                print(f"[Worker {worker_id}] Download failed - retrying in 10 seconds...")
+                await page.wait_for_timeout(10000)
+                pdf_path = await download_pdf(contract['pdf_url'], contract['id'])
+                if not pdf_path:
+                    await save_result(contract, None, OUTPUT_DIR, success=False, worker_id=worker_id)
+                    print(f"[Worker {worker_id}] ✗ Download failed after retry - skipping")
+                    continue
             
             # Process the PDF with retry logic
             max_retries = 4  # Increased to 4 attempts
@@ -986,35 +1007,42 @@ async def main():
         print(f"Batch Size: {BATCH_SIZE}")
     print(f"{'='*80}\n")
     
-    # Get ALL unprocessed contracts for this batch
-    conn = sqlite3.connect(DB_PATH)
+    # Get unprocessed contracts and claim up to BATCH_SIZE of them
+    conn = connect(DB_PATH)
+    setup_work_leases(conn)
     cursor = conn.cursor()
     
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT id, hospital_name, year, original_pdf_url
         FROM contracts 
-        WHERE original_pdf_url IS NOT NULL 
-          AND (aistudio_extraction_status IS NULL OR aistudio_extraction_status = 'failed')
+        WHERE {PENDING_SQL}
         ORDER BY id
-        LIMIT ?
-    """, (BATCH_SIZE,))
-    
-    all_contracts = [
-        {
-            'id': row[0],
-            'hospital_name': row[1],
-            'year': row[2],
-            'pdf_url': row[3]
-        }
-        for row in cursor.fetchall()
-    ]
+    """)
+    candidates = cursor.fetchall()
     conn.close()
     
+    # Leases are renewed by a heartbeat thread while the batch runs; if this
+    # process dies they expire and another extractor claims the contracts
+    leases.start()
+    all_contracts = []
+    for row in candidates:
+        if len(all_contracts) >= BATCH_SIZE:
+            break
+        if leases.claim(row[0]):
+            all_contracts.append({
+                'id': row[0],
+                'hospital_name': row[1],
+                'year': row[2],
+                'pdf_url': row[3]
+            })
+    
     if not all_contracts:
+        leases.stop()
         print("[INFO] No unprocessed contracts found!")
         return
     
-    print(f"[INFO] Retrieved {len(all_contracts)} contracts for processing")
+    print(f"[INFO] Claimed {len(all_contracts)} contracts for processing"
+          f"{f' ({leases.skipped} held by other extractors)' if leases.skipped else ''}")
     print(f"[INFO] Using {NUM_WORKERS} parallel workers with round-robin distribution\n")
     
     # Distribute PDFs using round-robin (math formula)
@@ -1117,6 +1145,9 @@ async def main():
         # Close browser
         await browser.close()
     
+    # Give back contracts a worker never got to (e.g. it failed to start)
+    leases.stop()
+    
     # Summary
     print(f"\n{'='*80}")
     print("EXTRACTION SUMMARY")
@@ -1,10 +1,13 @@
 """
 Test script to verify setup and database access
 """
-import sqlite3
 import sys
 from pathlib import Path
 
+# Shared DB connection factory lives in ../src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from db_connection import connect
+
 def test_database_connection():
     """Test database connectivity and show sample data"""
     db_path = Path(__file__).parent.parent / "data" / "hospital_tables.db"
@@ -20,7 +23,7 @@ def test_database_connection():
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect(db_path, readonly=True)
         cursor = conn.cursor()
         
         # Get table count
@@ -3,8 +3,6 @@ LLM Table Extraction - Using OpenAI GPT-5
 """
 print("[DEBUG] Script started...")
 
-import sqlite3
-print("[DEBUG] sqlite3 imported")
 import json
 print("[DEBUG] json imported")
 import os
@@ -24,12 +22,14 @@ print("[DEBUG] datetime imported")
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 print("[DEBUG] Added src to path")
 
-# Add google_docai to path (not needed anymore but keeping path for compatibility)
+# Add google_docai to path (table_blocks / filter_tables)
 sys.path.insert(0, str(Path(__file__).parent / 'src' / 'google_docai'))
 print("[DEBUG] Added google_docai to path")
 
-# No longer using filter_tables - sending raw JSON directly
-# from filter_tables import filter_table_blocks
+# Phase 1 materializes the filtered tableBlocks (table_blocks_json) - only
+# rows from before that are filtered here
+from table_blocks import materialize_table_blocks, ensure_table_blocks_columns, TABLE_BLOCKS_VERSION
+from input_fingerprint import ensure_fingerprint_columns
 
 from call_llm import LLMCaller
 print("[DEBUG] call_llm imported")
@@ -37,17 +37,45 @@ print("[DEBUG] call_llm imported")
 from prompt import get_extraction_prompt
 print("[DEBUG] prompt imported")
 
+from db_writer import BatchedDBWriter
+from db_connection import connect
+import json_codec
+from stage_timer import StageTimer, PHASE2, setup_stage_timings, print_stage_breakdown
+from scheduler import order_by_cost, ORDERS, ORDER_ID
+from work_leases import WorkLeases, TASK_PHASE2, RELEASE_SQL, setup_work_leases
+
 # Configuration
 DB_PATH = "data/hospital_tables.db"
 OPENAI_MODEL = "gpt-5-2025-08-07"  # OpenAI GPT-5
 
+# Current table_blocks_json if there is one, otherwise raw_json (params: version, version)
+TABLE_BLOCKS_SELECT = """
+    CASE WHEN table_blocks_version = ? THEN table_blocks_json END,
+    CASE WHEN table_blocks_version = ? THEN NULL ELSE raw_json END
+"""
+
+# Stage order for the --stats timing breakdown
+PHASE2_STAGES = ('load', 'prompt_build', 'llm_call', 'json_extract', 'parse', 'db_write')
+
+# Producer: ids fetched per page, queued contracts per worker (payloads are
+# loaded by the workers, so memory scales with workers, not contracts)
+ID_PAGE_SIZE = 500
+QUEUE_DEPTH_PER_WORKER = 2
+
 class GPT5TableExtractor:
     """Extract tables using OpenAI GPT-5"""
     
-    def __init__(self, num_workers=5):
-        self.db_path = DB_PATH
+    def __init__(self, num_workers=5, db_path=DB_PATH, order=ORDER_ID):
+        self.db_path = db_path
         self.num_workers = num_workers
+        self.order = order  # Queue order: 'id', 'lpt' (longest predicted first) or 'spt' (see scheduler)
         self.llm_caller = None
+        
+        # Single writer thread owns all DB writes (batched transactions)
+        self.writer = BatchedDBWriter(self.db_path)
+        
+        # Contract leases - lets several processes share the backlog (set per run)
+        self.leases = None
     
     def setup_client(self):
         """Setup OpenAI LLM client"""
@@ -59,7 +87,7 @@ class GPT5TableExtractor:
     
     def add_llm_column(self):
         """Add llm_extracted_tables column if doesn't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute("PRAGMA table_info(contracts)")
@@ -69,46 +97,85 @@ class GPT5TableExtractor:
             print("Adding llm_extracted_tables column...")
             cursor.execute("""
                 ALTER TABLE contracts 
-                ADD COLUMN llm_extracted_tables TEXT
+                ADD COLUMN llm_extracted_tables BLOB
             """)
             conn.commit()
             print("[OK] Column added\n")
         else:
             print("[OK] llm_extracted_tables column already exists\n")
         
+        ensure_table_blocks_columns(conn)
+        ensure_fingerprint_columns(conn)
+        setup_stage_timings(conn)
+        setup_work_leases(conn)
         conn.close()
     
-    def extract_with_llm(self, contract_id, raw_json_str, verbose=True):
-        """Extract tables from raw_json using OpenAI GPT-5
+    @staticmethod
+    def load_table_blocks(table_blocks, raw_json):
+        """Prompt input for a contract: the stored table_blocks_json, or the
+        tableBlocks filtered from raw_json for rows not materialized yet
+        
+        Args:
+            table_blocks: table_blocks_json as stored (None if missing / outdated)
+            raw_json: raw_json as stored (only needed without table_blocks)
+        
+        Returns:
+            str: Filtered Document AI JSON ({"documentLayout": {"blocks": [...]}})
+        """
+        if table_blocks is not None:
+            return json_codec.decode(table_blocks)
+        table_blocks_str, _, _ = materialize_table_blocks(json_codec.loads(raw_json))
+        return table_blocks_str
+    
+    def load_contract(self, contract_id, timer=None):
+        """Fetch one contract's prompt input from the database (worker thread)
+        
+        Returns:
+            str: Filtered tableBlocks JSON, or None if the row has no raw_json anymore
+        """
+        start = time.perf_counter()
+        conn = connect(self.db_path, readonly=True)
+        try:
+            row = conn.execute(f"""
+                SELECT {TABLE_BLOCKS_SELECT}
+                FROM contracts
+                WHERE id = ? AND raw_json IS NOT NULL
+            """, (TABLE_BLOCKS_VERSION, TABLE_BLOCKS_VERSION, contract_id)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        
+        table_blocks_str = self.load_table_blocks(*row)
+        if timer:
+            timer.add('load', time.perf_counter() - start, payload_bytes=len(table_blocks_str))
+        return table_blocks_str
+    
+    def extract_with_llm(self, contract_id, table_blocks_str, verbose=True, timer=None):
+        """Extract tables from the filtered tableBlocks using OpenAI GPT-5
         
         Args:
             contract_id: Contract ID
-            raw_json_str: Raw JSON string from Google Document AI
+            table_blocks_str: Filtered Document AI JSON (see load_table_blocks)
             verbose: Print progress
+            timer: Optional StageTimer - records 'prompt_build', 'llm_call',
+                'json_extract' and 'parse'
             
         Returns:
             dict: Extracted tables or None if failed
         """
+        timer = timer or StageTimer(contract_id, PHASE2)
+        
         try:
             if verbose:
                 print("\n" + "="*80)
-                print("STEP 1: PREPARING RAW JSON")
-                print("="*80)
-            
-            # Parse raw JSON (just to validate)
-            if verbose:
-                print(f"  Validating raw JSON ({len(raw_json_str):,} chars)...")
-            raw_json_dict = json.loads(raw_json_str)
-            if verbose:
-                print(f"  [OK] JSON is valid")
-            
-            if verbose:
-                print("\n" + "="*80)
-                print("STEP 2: BUILDING PROMPT")
+                print("STEP 1: BUILDING PROMPT")
                 print("="*80)
+                print(f"  Table blocks: {len(table_blocks_str):,} chars")
             
-            # Build prompt with RAW JSON (no filtering)
-            prompt = get_extraction_prompt(raw_json_str)
+            # Table blocks were serialized by Phase 1 - no need to re-parse them here
+            with timer.stage('prompt_build', payload_bytes=len(table_blocks_str)):
+                prompt = get_extraction_prompt(table_blocks_str)
             if verbose:
                 print(f"  Prompt size: {len(prompt):,} characters")
                 print(f"  Estimated tokens: ~{len(prompt)//4:,}")
@@ -121,10 +188,12 @@ class GPT5TableExtractor:
                 print(f"  Sending request...")
             
             # Call Cerebras via LLM Caller
-            result_text = self.llm_caller.call(
-                prompt=prompt,
-                temperature=0.1
-            )
+            with timer.stage('llm_call', payload_bytes=len(prompt)) as call_info:
+                result_text = self.llm_caller.call(
+                    prompt=prompt,
+                    temperature=0.1,
+                    call_info=call_info
+                )
             
             if not result_text:
                 raise Exception("Empty response from Cerebras")
@@ -150,6 +219,9 @@ class GPT5TableExtractor:
             if verbose:
                 print(f"\n  [INFO] Extracting JSON from response...")
             
+            extract_started = time.perf_counter()
+            response_bytes = len(result_text)
+            
             # Remove markdown code blocks
             if '```json' in result_text:
                 result_text = result_text.split('```json')[1].split('```')[0]
@@ -184,6 +256,7 @@ class GPT5TableExtractor:
                 raise Exception("Could not find closing brace for JSON object")
             
             result_text = result_text[json_start:json_end+1]
+            timer.add('json_extract', time.perf_counter() - extract_started, payload_bytes=response_bytes)
             
             if verbose:
                 print(f"  [OK] Extracted JSON portion: {len(result_text):,} chars")
@@ -192,6 +265,7 @@ class GPT5TableExtractor:
             if verbose:
                 print(f"\n  Parsing JSON...")
             
+            parse_started = time.perf_counter()
             try:
                 result = json.loads(result_text.strip())
             except json.JSONDecodeError as e:
@@ -215,6 +289,7 @@ class GPT5TableExtractor:
                         f.write(result_text)
                     print(f"  [ERROR] Saved problematic JSON to: {error_json_file}")
                     raise e2
+            timer.add('parse', time.perf_counter() - parse_started, payload_bytes=len(result_text))
             
             if verbose:
                 print(f"  [OK] JSON parsed successfully")
@@ -260,7 +335,7 @@ class GPT5TableExtractor:
             print(f"{'='*80}")
             print(f"Error type: {type(e).__name__}")
             print(f"Error message: {error_msg}")
-            print(f"Raw JSON size: {len(raw_json_str):,} chars")
+            print(f"Table blocks size: {len(table_blocks_str):,} chars")
             
             if 'prompt' in locals():
                 print(f"Prompt size: {len(prompt):,} chars")
@@ -277,7 +352,7 @@ class GPT5TableExtractor:
                 'error': error_msg,
                 'error_type': type(e).__name__,
                 'prompt_length': len(prompt) if 'prompt' in locals() else 0,
-                'raw_json_length': len(raw_json_str)
+                'table_blocks_length': len(table_blocks_str)
             }
             
             if 'result_text' in locals():
@@ -292,41 +367,66 @@ class GPT5TableExtractor:
             # Return error info instead of None
             return {'error': error_msg, 'error_type': type(e).__name__}
     
-    async def process_contract_async(self, contract_id, raw_json_str, worker_id):
-        """Process one contract asynchronously"""
+    async def claim(self, contract_id):
+        """Claim a contract off the event loop; False if another process has it"""
+        if not self.leases:
+            return True
+        return await asyncio.get_event_loop().run_in_executor(None, self.leases.claim, contract_id)
+    
+    def release_lease(self, contract_id):
+        """Queue the lease release behind the contract's result (same writer, same order)"""
+        if self.leases:
+            self.writer.submit(RELEASE_SQL, self.leases.release_params(contract_id))
+    
+    async def process_contract_async(self, contract_id, worker_id):
+        """Process one contract asynchronously (payload loaded here, see load_contract)"""
         
         loop = asyncio.get_event_loop()
+        timer = StageTimer(contract_id, PHASE2)
         
-        # Run blocking Cerebras call in thread pool
-        result = await loop.run_in_executor(
-            None,
-            lambda: self.extract_with_llm(contract_id, raw_json_str, verbose=False)
-        )
+        def load_and_extract():
+            table_blocks_str = self.load_contract(contract_id, timer)
+            if table_blocks_str is None:
+                return {'error': 'raw_json missing', 'error_type': 'MissingPayload'}
+            return self.extract_with_llm(contract_id, table_blocks_str, verbose=False, timer=timer)
         
-        # Check if extraction succeeded
-        if result and 'error' not in result:
-            num_tables = len(result.get('extracted_tables', []))
-            num_rows = sum(
-                len(table.get('table_data', []))
-                for table in result.get('extracted_tables', [])
-            )
-            
-            # Store in database
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE contracts 
-                SET llm_extracted_tables = ?
-                WHERE id = ?
-            """, (json.dumps(result, ensure_ascii=False), contract_id))
-            conn.commit()
-            conn.close()
-            
-            return {'status': 'success', 'num_tables': num_tables, 'num_rows': num_rows}
-        else:
-            # Extraction failed
-            error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
-            return {'status': 'failed', 'error': error_msg}
+        # Load + decompress + blocking LLM call in thread pool. A load error
+        # (sqlite, corrupt payload) fails the contract like an LLM error
+        try:
+            result = await loop.run_in_executor(None, load_and_extract)
+        except Exception as e:
+            result = {'error': f"{type(e).__name__}: {e}", 'error_type': type(e).__name__}
+        
+        # The lease is released on every path (queued behind the result on success),
+        # so a contract is never left blocked until its lease expires
+        try:
+            # Check if extraction succeeded
+            if result and 'error' not in result:
+                num_tables = len(result.get('extracted_tables', []))
+                num_rows = sum(
+                    len(table.get('table_data', []))
+                    for table in result.get('extracted_tables', [])
+                )
+                
+                def on_commit(seconds):
+                    timer.add('db_write', seconds)
+                    timer.flush(self.writer)
+                
+                # Queue database update for the writer thread (remembering which Phase 1 input it used)
+                self.writer.submit("""
+                    UPDATE contracts 
+                    SET llm_extracted_tables = ?, llm_input_fingerprint = input_fingerprint
+                    WHERE id = ?
+                """, lambda: (json_codec.dumps(result), contract_id), on_commit=on_commit)
+                
+                return {'status': 'success', 'num_tables': num_tables, 'num_rows': num_rows}
+            else:
+                # Extraction failed
+                timer.flush(self.writer)
+                error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
+                return {'status': 'failed', 'error': error_msg}
+        finally:
+            self.release_lease(contract_id)
     
     async def worker(self, queue, worker_id, total):
         """Worker that processes contracts from queue"""
@@ -336,14 +436,15 @@ class GPT5TableExtractor:
             try:
                 item = await queue.get()
                 if item is None:  # Poison pill
+                    queue.task_done()
                     break
                 
-                idx, contract_id, raw_json_str = item
+                idx, contract_id = item
                 
                 print(f"[Worker {worker_id}] [{idx}/{total}] {contract_id[:40]}")
                 print(f"[Worker {worker_id}] Starting OpenAI GPT-5 call...")
                 
-                result = await self.process_contract_async(contract_id, raw_json_str, worker_id)
+                result = await self.process_contract_async(contract_id, worker_id)
                 
                 if result['status'] == 'success':
                     print(f"[Worker {worker_id}] [OK] {result['num_tables']} tables, {result['num_rows']} rows")
@@ -353,9 +454,6 @@ class GPT5TableExtractor:
                 processed += 1
                 queue.task_done()
                 
-                # Rate limiting
-                await asyncio.sleep(0.5)
-                
             except Exception as e:
                 print(f"\n{'='*80}")
                 print(f"[Worker {worker_id}] EXCEPTION IN WORKER")
@@ -372,6 +470,45 @@ class GPT5TableExtractor:
         
         print(f"[Worker {worker_id}] Finished processing {processed} contracts")
     
+    async def produce_ids(self, queue, where, total, ordered_ids=None):
+        """Stream contract ids into the bounded queue, then one poison pill per worker
+        
+        Ids are read page by page (keyset on id), so no read transaction stays
+        open while the writer thread commits results. ordered_ids (--order
+        lpt/spt) replaces the paging with a precomputed id list. Each id is
+        claimed just before it is queued; ids another process holds or has
+        finished are skipped.
+        """
+        loop = asyncio.get_event_loop()
+        conn = connect(self.db_path, readonly=True, check_same_thread=False)
+        last_id = ''
+        idx = 0
+        
+        try:
+            for contract_id in ordered_ids or []:
+                if await self.claim(contract_id):
+                    idx += 1
+                    await queue.put((idx, contract_id))
+            
+            while ordered_ids is None and idx < total:
+                page = await loop.run_in_executor(None, lambda: conn.execute(f"""
+                    SELECT id FROM contracts
+                    WHERE {where} AND id > ?
+                    ORDER BY id LIMIT ?
+                """, (last_id, min(ID_PAGE_SIZE, total - idx))).fetchall())
+                if not page:
+                    break
+                last_id = page[-1][0]
+                
+                for (contract_id,) in page:
+                    if await self.claim(contract_id):
+                        idx += 1
+                        await queue.put((idx, contract_id))
+        finally:
+            conn.close()
+            for _ in range(self.num_workers):
+                await queue.put(None)
+    
     async def run_async(self, limit=None, reprocess=False):
         """Run LLM extraction on all raw_jsons"""
         print("="*80)
@@ -386,62 +523,50 @@ class GPT5TableExtractor:
         print("[2/7] Setting up LiteLLM client...")
         self.setup_client()
         
-        # Get contracts to process
-        print("[3/7] Querying database for contracts to process...")
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if reprocess:
-            cursor.execute("""
-                SELECT id, raw_json 
-                FROM contracts 
-                WHERE raw_json IS NOT NULL
-                ORDER BY id
-            """)
-        else:
-            cursor.execute("""
-                SELECT id, raw_json 
-                FROM contracts 
-                WHERE raw_json IS NOT NULL 
-                  AND llm_extracted_tables IS NULL
-                ORDER BY id
-            """)
-        
-        print("[4/7] Fetching contracts from database...")
-        contracts = cursor.fetchall()
+        # Count contracts to process (ids are streamed later, payloads loaded per worker)
+        print("[3/7] Counting contracts to process...")
+        # Not extracted yet, or Phase 1 re-ran on changed inputs since (see input_fingerprint)
+        where = "raw_json IS NOT NULL" if reprocess else \
+            "raw_json IS NOT NULL AND (llm_extracted_tables IS NULL OR llm_input_fingerprint IS NOT input_fingerprint)"
+        conn = connect(self.db_path, readonly=True)
+        total = conn.execute(f"SELECT COUNT(*) FROM contracts WHERE {where}").fetchone()[0]
         conn.close()
-        print(f"  [OK] Fetched {len(contracts)} contracts from database")
+        print(f"  [OK] {total} contracts in database")
         
         if limit:
-            contracts = contracts[:limit]
+            total = min(total, limit)
             print(f"  [OK] Limited to {limit} contracts")
         
-        total = len(contracts)
-        
         if total == 0:
             print("[OK] No contracts to process\n")
             return
         
-        print(f"\n[5/7] Processing {total} contracts with {self.num_workers} workers")
-        print("="*80 + "\n")
-        
-        # Create queue
-        print("[6/7] Creating async queue and adding contracts...")
-        queue = asyncio.Queue()
+        # Cost-ordered runs need the whole id list up front (ids only, no payloads)
+        ordered_ids = None
+        if self.order != ORDER_ID:
+            conn = connect(self.db_path, readonly=True)
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM contracts WHERE {where} ORDER BY id")]
+            ordered_ids = order_by_cost(conn, ids, PHASE2, self.order)[:total]
+            conn.close()
+            print(f"  [OK] Ordered by predicted cost ({self.order})")
         
-        # Add contracts to queue
-        for idx, (contract_id, raw_json_str) in enumerate(contracts, 1):
-            await queue.put((idx, contract_id, raw_json_str))
+        print(f"\n[4/7] Processing {total} contracts with {self.num_workers} workers")
+        print("="*80 + "\n")
         
-        # Add poison pills
-        for _ in range(self.num_workers):
-            await queue.put(None)
+        # Bounded queue - the producer waits while workers are busy
+        print("[5/7] Creating bounded queue...")
+        queue = asyncio.Queue(maxsize=self.num_workers * QUEUE_DEPTH_PER_WORKER)
+        print(f"  [OK] Queue depth: {queue.maxsize}")
         
-        print(f"  [OK] Added {total} contracts to queue")
+        print("[6/7] Starting id producer...")
+        self.leases = WorkLeases(self.db_path, TASK_PHASE2, pending_sql=where)
+        self.leases.start()
+        producer = asyncio.create_task(self.produce_ids(queue, where, total, ordered_ids))
         
         # Start workers
         print(f"[7/7] Starting {self.num_workers} workers...")
         start_time = time.time()
+        self.writer.start()
         
         workers = [
             asyncio.create_task(self.worker(queue, i+1, total))
@@ -452,9 +577,14 @@ class GPT5TableExtractor:
         print("="*80 + "\n")
         
         # Wait for completion
+        await producer
         await queue.join()
         await asyncio.gather(*workers)
         
+        # Flush remaining batched writes (lease releases included)
+        await asyncio.get_event_loop().run_in_executor(None, self.writer.close)
+        self.leases.stop()
+        
         elapsed = time.time() - start_time
         
         # Summary
@@ -464,11 +594,19 @@ class GPT5TableExtractor:
         print(f"Time elapsed: {elapsed/60:.1f} minutes")
         print(f"Average: {elapsed/total:.1f} seconds per contract")
         print(f"Workers: {self.num_workers}")
+        writer_stats = self.writer.stats()
+        print(f"DB writes: {writer_stats['statements']} statements in {writer_stats['transactions']} transactions, "
+              f"{writer_stats['errors']} failed")
+        if writer_stats['errors']:
+            print(f"[WARNING] {writer_stats['errors']} DB writes failed and were not saved (see the log above)")
+        lease_stats = self.leases.stats()
+        if lease_stats['skipped']:
+            print(f"Leases: {lease_stats['claimed']} claimed, {lease_stats['skipped']} skipped (claimed or finished by another process)")
         print("="*80)
 
 def show_stats():
     """Show LLM extraction statistics"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH, readonly=True)
     cursor = conn.cursor()
     
     print("="*80)
@@ -491,6 +629,17 @@ def show_stats():
     print(f"Pending:                       {pending}")
     print(f"Success rate:                  {completed/total_raw*100:.1f}%\n" if total_raw > 0 else "")
     
+    # Materialized table blocks (Phase 1 ingest / backfill_table_blocks.py)
+    columns = [col[1] for col in cursor.execute("PRAGMA table_info(contracts)").fetchall()]
+    if 'table_blocks_version' in columns:
+        cursor.execute("""
+            SELECT COUNT(*), SUM(table_block_count), SUM(table_cell_count)
+            FROM contracts WHERE table_blocks_version = ?
+        """, (TABLE_BLOCKS_VERSION,))
+        materialized, blocks, cells = cursor.fetchone()
+        print(f"Table blocks materialized:     {materialized}/{total_raw} (v{TABLE_BLOCKS_VERSION}, "
+              f"{blocks or 0} tables, {cells or 0} cells)\n")
+    
     # Show sample of completed
     if completed > 0:
         cursor.execute("""
@@ -503,6 +652,8 @@ def show_stats():
         for contract_id, hospital in cursor.fetchall():
             print(f"  - {contract_id[:40]} | {hospital[:50]}")
     
+    print_stage_breakdown(conn, PHASE2, PHASE2_STAGES)
+    
     print("\n" + "="*80)
     conn.close()
 
@@ -514,6 +665,9 @@ def main():
     parser.add_argument('--limit', type=int, help='Limit number of contracts')
     parser.add_argument('--reprocess', action='store_true', help='Reprocess all')
     parser.add_argument('--workers', type=int, default=5, help='Number of workers (default: 5)')
+    parser.add_argument('--order', choices=ORDERS, default=ORDER_ID,
+                        help='Queue order: id (default), lpt = longest predicted first (shortest makespan), '
+                             'spt = shortest predicted first (quick smoke runs)')
     parser.add_argument('--test', action='store_true', help='Test with one contract')
     parser.add_argument('--stats', action='store_true', help='Show statistics')
     
@@ -526,30 +680,33 @@ def main():
         # Test with one contract
         print("Testing OpenAI GPT-5 extraction on one contract...\n")
         
-        conn = sqlite3.connect(DB_PATH)
+        extractor = GPT5TableExtractor()
+        extractor.add_llm_column()
+        
+        conn = connect(DB_PATH, readonly=True)
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, raw_json 
+        cursor.execute(f"""
+            SELECT id, {TABLE_BLOCKS_SELECT}
             FROM contracts 
             WHERE raw_json IS NOT NULL 
             LIMIT 1
-        """)
+        """, (TABLE_BLOCKS_VERSION, TABLE_BLOCKS_VERSION))
         
         result = cursor.fetchone()
         if not result:
             print("[ERROR] No contracts with raw_json found!")
             return
         
-        contract_id, raw_json_str = result
+        contract_id, table_blocks, raw_json = result
+        table_blocks_str = GPT5TableExtractor.load_table_blocks(table_blocks, raw_json)
         conn.close()
         
         print(f"Contract: {contract_id}")
-        print(f"Raw JSON size: {len(raw_json_str):,} characters\n")
+        print(f"Table blocks size: {len(table_blocks_str):,} characters\n")
         
-        extractor = GPT5TableExtractor()
         extractor.setup_client()
         
-        result = extractor.extract_with_llm(contract_id, raw_json_str, verbose=True)
+        result = extractor.extract_with_llm(contract_id, table_blocks_str, verbose=True)
         
         if result:
             print("\n" + "="*80)
@@ -571,17 +728,17 @@ def main():
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(result, f, indent=2, ensure_ascii=False)
             
-            # Save the raw JSON input (no filtering)
+            # Save the table blocks input
             raw_input_file = samples_dir / f'test_{next_num:03d}_raw_input.json'
             with open(raw_input_file, 'w', encoding='utf-8') as f:
-                json.dump(json.loads(raw_json_str), f, indent=2, ensure_ascii=False)
+                json.dump(json.loads(table_blocks_str), f, indent=2, ensure_ascii=False)
             
             # Save contract info
             info_file = samples_dir / f'test_{next_num:03d}_info.txt'
             with open(info_file, 'w', encoding='utf-8') as f:
                 f.write(f"Test Number: {next_num}\n")
                 f.write(f"Contract ID: {contract_id}\n")
-                f.write(f"Raw JSON size: {len(raw_json_str):,} characters\n")
+                f.write(f"Table blocks size: {len(table_blocks_str):,} characters\n")
                 f.write(f"Model: {OPENAI_MODEL}\n")
                 f.write(f"Timestamp: {datetime.now().isoformat()}\n")
                 f.write(f"Tables extracted: {len(result.get('extracted_tables', []))}\n")
@@ -595,7 +752,7 @@ def main():
     else:
         # Run full extraction
         print("\n[STARTUP] Initializing extractor...")
-        extractor = GPT5TableExtractor(num_workers=args.workers)
+        extractor = GPT5TableExtractor(num_workers=args.workers, order=args.order)
         print(f"[STARTUP] Starting async extraction with {args.workers} workers...")
         asyncio.run(extractor.run_async(
             limit=args.limit,
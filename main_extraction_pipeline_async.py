@@ -1,51 +1,143 @@
 """
 Main Table Extraction Pipeline with SQLite Database - ASYNC VERSION
-Processes PDFs with 5 concurrent workers for faster extraction
+Processes PDFs as a staged pipeline: download (I/O threads) -> preflight
+(PDF checks + pdf_metadata) -> prepare (page selection + base64 in worker
+processes) -> Document AI (async, adaptive concurrency) -> store (filtering
++ batched DB writes), connected by bounded queues
 """
-import sqlite3
 import json
+import os
 import sys
 import time
 import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-import threading
 
-# Add google_docai to path
+# Add src and google_docai to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
 sys.path.insert(0, str(Path(__file__).parent / 'src' / 'google_docai'))
 
 import pandas as pd
-from extract_tables import create_creds, download_pdf, extract_tables_from_pdf
-
-try:
-    from PyPDF2 import PdfReader, PdfWriter
-    HAS_PYPDF2 = True
-except ImportError:
-    HAS_PYPDF2 = False
+from extract_tables import create_creds, download_pdf, build_tables
+from request_prep import prepare_request, PAGE_SELECTION_VERSION
+from pdf_preflight import (inspect_pdf, metadata_params, known_page_counts, metadata_summary,
+                           setup_pdf_metadata, UPSERT_METADATA_SQL)
+from input_fingerprint import (input_fingerprint, gcs_document, processor_version, ensure_fingerprint_columns,
+                               fingerprint_rows, GCS_POLICY)
+from pdf_split import merge_responses
+from async_api_client import AsyncLayoutParserClient
+from response_cache import get_response_cache, page_range
+from batch_client import BatchLayoutParserClient, to_gcs_uri, object_generation
+from aimd_controller import AIMDController
+from rate_limiter import get_rate_limiter
+from db_writer import BatchedDBWriter
+from db_connection import connect
+from csv_values import parse_year
+import json_codec
+from response_pack import get_pack_writer
+from pdf_downloader import get_downloader, DownloadError
+from pdf_cache import get_pdf_cache
+from scheduler import order_by_cost, ORDERS, ORDER_ID
+from table_blocks import materialize_table_blocks, ensure_table_blocks_columns, TABLE_BLOCKS_VERSION
+from stage_timer import StageTimer, PHASE1, setup_stage_timings, print_stage_breakdown
+from stage_queue import StageQueue
+from work_leases import WorkLeases, TASK_PHASE1, RELEASE_SQL, setup_work_leases
 
 # Database configuration
 DB_PATH = "data/hospital_tables.db"
 CSV_PATH = "data/hospital_agreements.csv"
 
+# CSV sync: columns copied into contracts, rows per read_csv chunk
+CSV_COLUMNS = ('id', 'year', 'hospital_name', 'region', 'contract_title',
+               'original_pdf_url', 'gcs_pdf_path', 'scraped_at', 'created_at', 'updated_at')
+CSV_CHUNK_ROWS = 10000
+
+# Insert new contracts; refresh existing ones only when the CSV's updated_at
+# moved (results are kept - --changed-only notices a new URL via the fingerprint)
+UPSERT_CONTRACT_SQL = f"""
+    INSERT INTO contracts ({', '.join(CSV_COLUMNS)})
+    VALUES ({', '.join('?' * len(CSV_COLUMNS))})
+    ON CONFLICT(id) DO UPDATE SET
+        {', '.join(f'{column} = excluded.{column}' for column in CSV_COLUMNS[1:])}
+    WHERE contracts.updated_at IS NOT excluded.updated_at
+"""
+
+# Rows a resumed run may still claim (another process may have finished them since)
+PHASE1_PENDING = "extraction_status IN ('pending', 'failed')"
+
+# Stage order for the --stats / summary timing breakdown
+PHASE1_STAGES = ('download', 'preflight', 'trim', 'encode', 'docai', 'docai_cache', 'filter', 'table_blocks', 'serialize', 'db_write')
+
+# Layout Parser online processing limit
+MAX_PAGES = 30
+
+class ContractJob:
+    """One contract moving through the Phase 1 stages"""
+    
+    def __init__(self, idx, contract_id, pdf_url, gcs_path):
+        self.idx = idx
+        self.contract_id = contract_id
+        self.pdf_url = pdf_url
+        self.gcs_path = gcs_path if gcs_path and gcs_path.startswith('gs://') else None
+        self.timer = StageTimer(contract_id, PHASE1)
+        self.started = time.perf_counter()
+        self.pdf_path = None  # Cached download (owned by the PDF cache)
+        self.pinned_path = None  # Cache path pinned against eviction until the job finishes
+        self.metadata = None  # pdf_preflight.inspect_pdf() output
+        self.request = None   # request_prep.prepare_request() output
+        self.response = None  # Document AI response
+        self.cache_key = None  # response_cache key of the final response (None = not cacheable)
+        self.gcs_generation = None  # Generation of the GCS object Document AI read
+        self.from_cache = False  # Response came from the cache (already merged and page-mapped)
+
 class AsyncExtractionPipeline:
-    """Async extraction pipeline with concurrent workers"""
+    """Staged async extraction pipeline (see module docstring)"""
     
-    def __init__(self, db_path=DB_PATH, csv_path=CSV_PATH, num_workers=5):
+    def __init__(self, db_path=DB_PATH, csv_path=CSV_PATH, num_workers=5, max_workers=50, adaptive=True,
+                 page_selection='screen', shard_pages=30, raw_json_store='pack', order=ORDER_ID,
+                 download_workers=8, prepare_workers=None, store_workers=2, queue_depth=None):
         self.db_path = db_path
         self.csv_path = csv_path
         self.num_workers = num_workers
+        self.max_workers = max_workers if adaptive else num_workers
+        self.page_selection = page_selection  # 'screen' (table pages), 'trim' (last 30) or 'split' (all, in chunks)
+        self.shard_pages = shard_pages if page_selection == 'split' else None
+        self.raw_json_store = raw_json_store  # 'pack' (response pack + pointer, see response_pack) or 'db' (inline)
+        self.order = order  # Queue order: 'id', 'lpt' (longest predicted first) or 'spt' (see scheduler)
         self.credentials = None
+        self.docai_client = None
+        
+        # Input fingerprint parts that come from the configuration (see input_fingerprint)
+        self.page_policy = f"{page_selection}:{self.shard_pages or MAX_PAGES}:v{PAGE_SELECTION_VERSION}"
+        self.processor = processor_version()
+        
+        # Per-stage concurrency (the API stage is sized by the AIMD controller)
+        self.download_workers = download_workers
+        self.prepare_workers = prepare_workers or os.cpu_count() or 1
+        self.store_workers = store_workers
+        self.queue_depth = queue_depth  # Max items waiting per stage (default: 2x the stage's workers)
+        self.queues = {}
+        
+        # AIMD controller decides how many API calls may be in flight
+        self.controller = AIMDController(
+            initial=num_workers,
+            min_limit=1 if adaptive else num_workers,
+            max_limit=self.max_workers
+        )
+        
+        # Single writer thread owns all DB writes (batched transactions)
+        self.writer = BatchedDBWriter(db_path)
+        
+        # Contract leases - lets several processes share the backlog (set per run)
+        self.leases = None
         
-        # Thread-safe database connection per thread
-        self.db_lock = threading.Lock()
-        self.thread_local = threading.local()
+        # Page counts from pdf_metadata - route GCS inputs over the page limit (set per run)
+        self.page_counts = {}
         
-    def get_connection(self):
-        """Get thread-local database connection"""
-        if not hasattr(self.thread_local, 'conn'):
-            self.thread_local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        return self.thread_local.conn
+        # Pending puts of jobs sent back to an earlier stage (see requeue)
+        self.requeues = set()
         
     def setup_database(self):
         """Create database and table structure"""
@@ -53,7 +145,7 @@ class AsyncExtractionPipeline:
         print("Setting up SQLite Database")
         print("="*80 + "\n")
         
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Create main table
@@ -69,8 +161,8 @@ class AsyncExtractionPipeline:
                 scraped_at TEXT,
                 created_at TEXT,
                 updated_at TEXT,
-                raw_json TEXT,
-                extracted_tables TEXT,
+                raw_json BLOB,
+                extracted_tables BLOB,
                 extraction_status TEXT DEFAULT 'pending',
                 extraction_timestamp TEXT,
                 error_message TEXT,
@@ -92,279 +184,501 @@ class AsyncExtractionPipeline:
         """)
         
         conn.commit()
+        ensure_table_blocks_columns(conn)
+        ensure_fingerprint_columns(conn)
+        setup_stage_timings(conn)
+        setup_work_leases(conn)
+        setup_pdf_metadata(conn)
         conn.close()
         print(f"[OK] Database initialized: {self.db_path}\n")
         
     def load_csv_data(self):
-        """Load CSV and populate database"""
+        """Sync the CSV into the database (bulk upsert, streamed in chunks)
+
+        New contracts are inserted; existing ones are refreshed only if their
+        updated_at moved, so an unchanged CSV costs no writes. Extraction
+        results are left alone - run --changed-only to re-extract contracts
+        whose URL (or PDF) changed. Everything commits in one transaction.
+        """
         print("="*80)
         print("Loading CSV Data")
         print("="*80 + "\n")
         
-        df = pd.read_csv(self.csv_path)
-        print(f"[OK] Loaded {len(df)} contracts from CSV\n")
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = connect(self.db_path)
+        count_before = conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0]
+        changes_before = conn.total_changes
+        total = 0
         
-        inserted = 0
-        updated = 0
+        with conn:
+            # dtype=str keeps values as plain Python strings (no NaN/numpy types to bind)
+            for chunk in pd.read_csv(self.csv_path, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_ROWS):
+                chunk = chunk.reindex(columns=CSV_COLUMNS, fill_value='')
+                chunk['year'] = [parse_year(year) for year in chunk['year']]
+                conn.executemany(UPSERT_CONTRACT_SQL, chunk.itertuples(index=False, name=None))
+                total += len(chunk)
         
-        for _, row in df.iterrows():
-            cursor.execute("SELECT id FROM contracts WHERE id = ?", (row['id'],))
-            exists = cursor.fetchone()
-            
-            if exists:
-                cursor.execute("""
-                    UPDATE contracts 
-                    SET year = ?, hospital_name = ?, region = ?, contract_title = ?,
-                        original_pdf_url = ?, gcs_pdf_path = ?, scraped_at = ?,
-                        created_at = ?, updated_at = ?
-                    WHERE id = ? AND extraction_status = 'pending'
-                """, (
-                    row.get('year', None), row.get('hospital_name', ''),
-                    row.get('region', ''), row.get('contract_title', ''),
-                    row.get('original_pdf_url', ''), row.get('gcs_pdf_path', ''),
-                    row.get('scraped_at', ''), row.get('created_at', ''),
-                    row.get('updated_at', ''), row['id']
-                ))
-                if cursor.rowcount > 0:
-                    updated += 1
-            else:
-                cursor.execute("""
-                    INSERT INTO contracts (
-                        id, year, hospital_name, region, contract_title,
-                        original_pdf_url, gcs_pdf_path, scraped_at, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    row['id'], row.get('year', None), row.get('hospital_name', ''),
-                    row.get('region', ''), row.get('contract_title', ''),
-                    row.get('original_pdf_url', ''), row.get('gcs_pdf_path', ''),
-                    row.get('scraped_at', ''), row.get('created_at', ''),
-                    row.get('updated_at', '')
-                ))
-                inserted += 1
-        
-        conn.commit()
+        inserted = conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0] - count_before
+        updated = conn.total_changes - changes_before - inserted
         conn.close()
-        print(f"[OK] Inserted: {inserted}, Updated: {updated}\n")
+        print(f"[OK] Loaded {total} contracts from CSV")
+        print(f"[OK] Inserted: {inserted}, Updated: {updated}, Unchanged: {total - inserted - updated}\n")
         
     def log_processing(self, contract_id, status, message):
-        """Thread-safe log processing event"""
-        with self.db_lock:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO processing_log (contract_id, timestamp, status, message)
-                VALUES (?, ?, ?, ?)
-            """, (contract_id, datetime.now().isoformat(), status, message))
-            conn.commit()
+        """Queue a processing log event for the writer thread"""
+        self.writer.submit("""
+            INSERT INTO processing_log (contract_id, timestamp, status, message)
+            VALUES (?, ?, ?, ?)
+        """, (contract_id, datetime.now().isoformat(), status, message))
     
-    def trim_large_pdf(self, pdf_path, max_pages=30, verbose=False):
-        """Remove pages from start to keep exactly max_pages"""
-        if not HAS_PYPDF2:
-            return pdf_path
-        
-        try:
-            reader = PdfReader(pdf_path)
-            num_pages = len(reader.pages)
-            
-            if num_pages <= max_pages:
-                return pdf_path
-            
-            # Calculate how many pages to remove from start
-            pages_to_remove = num_pages - max_pages
-            
-            if verbose:
-                print(f"    [INFO] Trimming {num_pages} pages → {max_pages} (removing first {pages_to_remove})")
-            
-            writer = PdfWriter()
-            for page_num in range(pages_to_remove, num_pages):
-                writer.add_page(reader.pages[page_num])
-            
-            trimmed_path = pdf_path.replace('.pdf', '_trimmed.pdf')
-            with open(trimmed_path, 'wb') as f:
-                writer.write(f)
-            
-            return trimmed_path
-            
-        except Exception as e:
-            return pdf_path
+    def fingerprint(self, pdf_url, gcs_path, pdf_sha256=None, generation=None):
+        """Input fingerprint of a contract - the downloaded PDF's hash, or
+        the gs:// path and object generation when Document AI read it from GCS"""
+        if pdf_sha256:
+            return input_fingerprint(pdf_sha256, pdf_url, self.page_policy, self.processor)
+        return input_fingerprint(gcs_document(to_gcs_uri(gcs_path), generation), pdf_url, GCS_POLICY, self.processor)
     
-    async def process_contract_async(self, contract_id, pdf_url, gcs_path, worker_id):
-        """Process single contract asynchronously"""
+    def save_success(self, contract_id, tables, raw_api_response, timer=None, fingerprint=None, pdf_sha256=None,
+                     cache_key=None, on_saved=None, on_failed=None):
+        """Queue the success update for a contract
         
-        pdf_path = None
-        trimmed_path = None
+        The tableBlocks are materialized into table_blocks_json here, once,
+        so Phase 2 never has to re-parse the full response. fingerprint /
+        pdf_sha256 record the inputs (see input_fingerprint). With a
+        cache_key the stored raw_json also becomes the cached response.
         
-        try:
-            # Run blocking I/O in thread pool
-            loop = asyncio.get_event_loop()
+        With a timer, 'table_blocks', 'serialize' and 'db_write' are recorded
+        on the writer thread and the timer is flushed once the update has committed.
+        
+        The success log row and the lease release are queued only once the
+        update has committed, then on_saved(result) runs on the writer thread.
+        If building or writing the update fails (table_blocks, pack append,
+        SQLite) on_failed(error_msg) runs there instead and records the
+        failure; without it the contract is saved as failed here.
+        
+        Returns:
+            tuple: (num_tables, num_rows)
+        """
+        result = {"contract_id": contract_id, "tables": tables}
+        num_tables = len(tables)
+        num_rows = sum(len(table['rows']) for table in tables)
+        
+        # Filtering, JSON serialization + compression run on the writer thread
+        timestamp = datetime.now().isoformat()
+        
+        def params():
+            started = time.perf_counter()
+            table_blocks_json, num_blocks, num_cells = materialize_table_blocks(raw_api_response)
+            table_blocks = json_codec.encode(table_blocks_json)
+            if timer:
+                timer.add('table_blocks', time.perf_counter() - started, payload_bytes=len(table_blocks_json))
             
-            # Choose fastest method
-            if gcs_path and gcs_path.startswith('gs://'):
-                try:
-                    # Try GCS path
-                    tables, raw_api_response = await loop.run_in_executor(
-                        None,
-                        lambda: extract_tables_from_pdf(
-                            gcs_path, self.credentials, verbose=False,
-                            save_intermediate=False, use_gcs=True, return_raw=True
-                        )
+            started = time.perf_counter()
+            raw_json = json_codec.dumps(raw_api_response)
+            extracted = json_codec.dumps(result)
+            payload_bytes = len(raw_json) + len(extracted)
+            if self.raw_json_store == 'pack':
+                raw_json = get_pack_writer().append(contract_id, raw_json)
+            get_response_cache().link(cache_key, raw_json)
+            if timer:
+                timer.add('serialize', time.perf_counter() - started, payload_bytes=payload_bytes)
+            return (raw_json, extracted, table_blocks, TABLE_BLOCKS_VERSION, num_blocks, num_cells,
+                    fingerprint, pdf_sha256, timestamp, num_tables, num_rows, contract_id)
+        
+        def on_commit(seconds):
+            if timer:
+                timer.add('db_write', seconds)
+                timer.flush(self.writer)
+            self.log_processing(contract_id, 'success', f"{num_tables} tables, {num_rows} rows")
+            self.release_lease(contract_id)
+            if on_saved:
+                on_saved({'status': 'success', 'num_tables': num_tables, 'num_rows': num_rows})
+        
+        def on_error(e):
+            error_msg = f"DB write failed: {e}"
+            if on_failed:
+                on_failed(error_msg)
+                return
+            self.save_failure(contract_id, error_msg)
+            if timer:
+                timer.flush(self.writer)
+        
+        self.writer.submit("""
+            UPDATE contracts 
+            SET raw_json = ?, extracted_tables = ?,
+                table_blocks_json = ?, table_blocks_version = ?, table_block_count = ?, table_cell_count = ?,
+                input_fingerprint = ?, input_pdf_sha256 = ?,
+                extraction_status = 'success', extraction_timestamp = ?,
+                num_tables = ?, num_rows = ?, error_message = NULL
+            WHERE id = ?
+        """, params, on_commit=on_commit, on_error=on_error)
+        return num_tables, num_rows
+    
+    def save_failure(self, contract_id, error_msg):
+        """Queue the failure update for a contract"""
+        self.writer.submit("""
+            UPDATE contracts 
+            SET extraction_status = 'failed', extraction_timestamp = ?, error_message = ?
+            WHERE id = ?
+        """, (datetime.now().isoformat(), error_msg, contract_id))
+        
+        self.log_processing(contract_id, 'failed', error_msg)
+        self.release_lease(contract_id)
+    
+    # ------------------------------------------------------------------
+    # Leases - claim a contract before working on it (see work_leases)
+    # ------------------------------------------------------------------
+    
+    def open_leases(self, resume=True):
+        """Start claiming contracts for this run (heartbeat thread included)"""
+        self.leases = WorkLeases(self.db_path, TASK_PHASE1, pending_sql=PHASE1_PENDING if resume else None)
+        self.leases.start()
+    
+    def close_leases(self):
+        """Stop the heartbeat and drop leases of contracts never finished"""
+        if self.leases:
+            self.leases.stop()
+            stats = self.leases.stats()
+            if stats['skipped']:
+                print(f"Leases: {stats['claimed']} claimed, {stats['skipped']} skipped (claimed or finished by another process)")
+    
+    async def claim(self, contract_id):
+        """Claim a contract off the event loop; False if another process has it"""
+        if not self.leases:
+            return True
+        return await asyncio.get_running_loop().run_in_executor(None, self.leases.claim, contract_id)
+    
+    def release_lease(self, contract_id):
+        """Queue the lease release behind the contract's result (same writer, same order)"""
+        if self.leases:
+            self.writer.submit(RELEASE_SQL, self.leases.release_params(contract_id))
+    
+    # ------------------------------------------------------------------
+    # Stages - each one loops over its input queue until cancelled
+    # ------------------------------------------------------------------
+    
+    def stage_queue(self, name, workers):
+        """Bounded input queue of a stage"""
+        queue = StageQueue(name, maxsize=self.queue_depth or 2 * workers)
+        self.queues[name] = queue
+        return queue
+    
+    async def download_stage(self):
+        """Download PDFs on the I/O pool (through the shared PDF cache)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queues['download'].get()
+            try:
+                with job.timer.stage('download') as meta:
+                    job.pdf_path = await loop.run_in_executor(
+                        self.io_pool, lambda: download_pdf(job.pdf_url, verbose=False, contract_id=job.contract_id)
                     )
-                except Exception as e:
-                    error_str = str(e)
-                    if 'PAGE_LIMIT_EXCEEDED' in error_str or 'pages exceed the limit' in error_str:
-                        # Download and trim
-                        pdf_path = await loop.run_in_executor(
-                            None, lambda: download_pdf(pdf_url, verbose=False)
-                        )
-                        if not pdf_path:
-                            raise Exception("PDF download failed")
-                        
-                        trimmed_path = self.trim_large_pdf(pdf_path, 30, False)
-                        
-                        # Retry with trimmed
-                        tables, raw_api_response = await loop.run_in_executor(
-                            None,
-                            lambda: extract_tables_from_pdf(
-                                trimmed_path, self.credentials, verbose=False,
-                                save_intermediate=False, use_gcs=False, return_raw=True
-                            )
-                        )
-                    else:
-                        raise
-            else:
-                # Download PDF
-                pdf_path = await loop.run_in_executor(
-                    None, lambda: download_pdf(pdf_url, verbose=False)
-                )
-                if not pdf_path:
+                    if job.pdf_path:
+                        meta['payload_bytes'] = Path(job.pdf_path).stat().st_size
+                if not job.pdf_path:
                     raise Exception("PDF download failed")
-                
-                trimmed_path = self.trim_large_pdf(pdf_path, 30, False)
-                
-                # Extract tables
-                tables, raw_api_response = await loop.run_in_executor(
-                    None,
-                    lambda: extract_tables_from_pdf(
-                        trimmed_path, self.credentials, verbose=False,
-                        save_intermediate=False, use_gcs=False, return_raw=True
-                    )
-                )
-            
-            # Store results
-            result = {"contract_id": contract_id, "tables": tables}
-            num_tables = len(tables)
-            num_rows = sum(len(table['rows']) for table in tables)
-            
-            # Thread-safe database update
-            with self.db_lock:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE contracts 
-                    SET raw_json = ?, extracted_tables = ?,
-                        extraction_status = 'success', extraction_timestamp = ?,
-                        num_tables = ?, num_rows = ?, error_message = NULL
-                    WHERE id = ?
-                """, (
-                    json.dumps(raw_api_response, ensure_ascii=False),
-                    json.dumps(result, ensure_ascii=False),
-                    datetime.now().isoformat(), num_tables, num_rows, contract_id
-                ))
-                conn.commit()
-            
-            self.log_processing(contract_id, 'success', f"{num_tables} tables, {num_rows} rows")
-            
-            # Cleanup
-            if pdf_path:
-                Path(pdf_path).unlink(missing_ok=True)
-            if trimmed_path and trimmed_path != pdf_path:
-                Path(trimmed_path).unlink(missing_ok=True)
-            
-            return {'status': 'success', 'num_tables': num_tables, 'num_rows': num_rows}
-            
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Thread-safe error update
-            with self.db_lock:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE contracts 
-                    SET extraction_status = 'failed', extraction_timestamp = ?, error_message = ?
-                    WHERE id = ?
-                """, (datetime.now().isoformat(), error_msg, contract_id))
-                conn.commit()
-            
-            self.log_processing(contract_id, 'failed', error_msg)
-            
-            # Cleanup
-            if pdf_path:
-                Path(pdf_path).unlink(missing_ok=True)
-            if trimmed_path and trimmed_path != pdf_path:
-                Path(trimmed_path).unlink(missing_ok=True)
-            
-            return {'status': 'failed', 'error': error_msg}
+                self.pin_pdf(job)
+                await self.queues['preflight'].put(job)
+            except Exception as e:
+                self.finish_failure(job, str(e))
     
-    async def worker(self, queue, worker_id, total):
-        """Worker that processes contracts from queue"""
-        processed = 0
+    async def preflight_stage(self):
+        """Check PDFs before any API call, record them in pdf_metadata and route them
         
+        Files that aren't PDFs (HTML error pages) or can't be opened fail here.
+        GCS inputs with a cached copy go back to the API by GCS path when they
+        are within the page limit, and to page selection when they are over it.
+        """
+        loop = asyncio.get_running_loop()
         while True:
+            job = await self.queues['preflight'].get()
             try:
-                item = await queue.get()
-                if item is None:  # Poison pill
-                    break
-                
-                idx, contract_id, pdf_url, gcs_path = item
+                with job.timer.stage('preflight') as meta:
+                    job.metadata = await loop.run_in_executor(self.cpu_pool, inspect_pdf, job.pdf_path)
+                    meta['payload_bytes'] = job.metadata['byte_size']
+                self.writer.submit(UPSERT_METADATA_SQL, metadata_params(job.contract_id, job.pdf_url, job.metadata))
                 
-                print(f"[Worker {worker_id}] [{idx}/{total}] {contract_id[:40]}")
+                if not job.metadata['is_pdf']:
+                    # Don't keep serving the error page - the next run downloads again
+                    await loop.run_in_executor(self.io_pool, lambda: get_pdf_cache().forget(job.pdf_url, job.contract_id))
                 
-                result = await self.process_contract_async(contract_id, pdf_url, gcs_path, worker_id)
+                page_count = job.metadata['page_count']
+                if job.gcs_path and (job.metadata['error'] or page_count is None or page_count <= MAX_PAGES):
+                    # The cached copy can't overrule the GCS one - let Document AI read that
+                    job.pdf_path = job.metadata = None
+                    await self.queues['api'].put(job)
+                    continue
+                if job.metadata['error']:
+                    raise Exception(job.metadata['error'])
+                job.gcs_path = None
+                await self.queues['prepare'].put(job)
+            except Exception as e:
+                self.finish_failure(job, str(e))
+    
+    def cached_response(self, request):
+        """(cache key, cached final response or None) for a prepared request"""
+        cache = get_response_cache()
+        page_map = request['page_map']
+        key = cache.response_key([
+            cache.key(body, page_range(first_page, page_map)) for body, first_page in request['bodies']
+        ])
+        return key, cache.get(key)
+    
+    async def prepare_stage(self):
+        """Page selection, splitting and base64 encoding in worker processes
+        
+        Requests the response cache can answer skip the API stage (and its slots).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queues['prepare'].get()
+            try:
+                job.request = await loop.run_in_executor(
+                    self.cpu_pool, prepare_request, job.pdf_path, self.page_selection, MAX_PAGES, self.shard_pages,
+                    job.metadata['pdf_sha256']
+                )
+                job.timer.add('trim', job.request['trim_seconds'], payload_bytes=job.request['pdf_bytes'])
+                job.timer.add('encode', job.request['encode_seconds'], payload_bytes=job.request['payload_bytes'])
                 
-                if result['status'] == 'success':
-                    print(f"[Worker {worker_id}] [OK] {result['num_tables']} tables, {result['num_rows']} rows")
+                # Hashing and decoding large documents stays off the event loop
+                started = time.perf_counter()
+                job.cache_key, job.response = await loop.run_in_executor(self.io_pool, self.cached_response, job.request)
+                if job.response is None:
+                    await self.queues['api'].put(job)
+                    continue
+                job.timer.add('docai_cache', time.perf_counter() - started, payload_bytes=job.request['payload_bytes'])
+                job.request['bodies'] = None
+                job.from_cache = True
+                await self.queues['store'].put(job)
+            except Exception as e:
+                self.finish_failure(job, str(e))
+    
+    def requeue(self, job, stage):
+        """Send a job back to an earlier stage without waiting for room in its queue
+        
+        The put runs as a task (kept in self.requeues until it completes), so a
+        worker never blocks on a queue upstream of its own.
+        """
+        task = asyncio.create_task(self.queues[stage].put(job))
+        self.requeues.add(task)
+        task.add_done_callback(self.requeues.discard)
+    
+    async def api_stage(self):
+        """Document AI calls - the AIMD controller decides how many run at once"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for an in-flight slot before taking work
+            await self.controller.acquire()
+            job = await self.queues['api'].get()
+            started = time.time()
+            throttled = False
+            rerouted = False
+            try:
+                if job.request is None:
+                    # GCS input - no download needed unless the document is over the page limit
+                    # (only reached when preflight doesn't know its page count yet)
+                    job.gcs_generation = await loop.run_in_executor(
+                        self.io_pool, object_generation, to_gcs_uri(job.gcs_path), self.credentials
+                    )
+                    try:
+                        job.response = await self.docai_client.call_layout_parser(
+                            job.gcs_path, verbose=False, use_gcs=True, timer=job.timer
+                        )
+                    except Exception as e:
+                        if 'PAGE_LIMIT_EXCEEDED' not in str(e) and 'pages exceed the limit' not in str(e):
+                            raise
+                        # Download and select pages instead; requeued without blocking this slot
+                        job.gcs_path = None
+                        rerouted = True
+                        self.requeue(job, 'download')
+                        continue
                 else:
-                    print(f"[Worker {worker_id}] [FAILED] {result.get('error', 'Unknown error')[:50]}")
-                
-                processed += 1
-                queue.task_done()
-                
-                # Rate limiting
-                await asyncio.sleep(0.4)  # 0.4s * 5 workers = ~2s average between requests
-                
+                    bodies, job.request['bodies'] = job.request['bodies'], None
+                    responses = await asyncio.gather(*[
+                        self.docai_client.process_body(body, timer=job.timer) for body, _ in bodies
+                    ])
+                    first_pages = [first_page for _, first_page in bodies]
+                    job.response = responses[0] if len(responses) == 1 else \
+                        merge_responses(list(zip(responses, first_pages)))
+                await self.queues['store'].put(job)
             except Exception as e:
-                print(f"[Worker {worker_id}] [ERROR] {e}")
-                queue.task_done()
+                throttled = 'Rate limit exceeded' in str(e) or 'timed out' in str(e)
+                self.finish_failure(job, str(e))
+            finally:
+                # A routing failure says nothing about API latency - keep it out of the AIMD window
+                await self.controller.release(None if rerouted else time.time() - started, throttled=throttled)
+    
+    async def store_stage(self):
+        """Filter tables off the event loop and queue the results on the writer thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queues['store'].get()
+            try:
+                # Cached responses were stored with their pages already mapped back
+                page_map = job.request['page_map'] if job.request and not job.from_cache else None
+                with job.timer.stage('filter'):
+                    tables = await loop.run_in_executor(self.filter_pool, build_tables, job.response, page_map)
+                pdf_sha256 = job.request['pdf_sha256'] if job.request else None
+                # The contract leaves the pipeline once its update has committed,
+                # or through finish_failure if the writer couldn't store it
+                self.save_success(
+                    job.contract_id, tables, job.response, timer=job.timer,
+                    fingerprint=self.fingerprint(job.pdf_url, job.gcs_path, pdf_sha256, job.gcs_generation),
+                    pdf_sha256=pdf_sha256,
+                    cache_key=None if job.from_cache else job.cache_key,
+                    on_saved=lambda result, job=job: loop.call_soon_threadsafe(self.finish, job, result),
+                    on_failed=lambda error_msg, job=job: loop.call_soon_threadsafe(self.finish_failure, job, error_msg)
+                )
+                job.response = None
+            except Exception as e:
+                self.finish_failure(job, str(e))
+    
+    def finish_failure(self, job, error_msg):
+        """Record a failed contract (any stage)"""
+        self.save_failure(job.contract_id, error_msg)
+        job.timer.flush(self.writer)
+        self.finish(job, {'status': 'failed', 'error': error_msg})
+    
+    def finish(self, job, result):
+        """Report a contract that left the pipeline"""
+        self.unpin_pdf(job)
+        if result['status'] == 'success':
+            print(f"[{job.idx}/{self.total}] [OK] {job.contract_id[:40]} - "
+                  f"{result['num_tables']} tables, {result['num_rows']} rows")
+        elif result['status'] == 'skipped':
+            print(f"[{job.idx}/{self.total}] [SKIPPED] {job.contract_id[:40]} - claimed by another process")
+        else:
+            print(f"[{job.idx}/{self.total}] [FAILED] {job.contract_id[:40]} - {result.get('error', 'Unknown error')[:50]}")
         
-        print(f"[Worker {worker_id}] Processed {processed} contracts")
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.all_done.set()
     
-    async def run_async(self, limit=None, resume=True):
-        """Run async extraction pipeline"""
-        print("="*80)
-        print(f"ASYNC PIPELINE - {self.num_workers} CONCURRENT WORKERS")
-        print("="*80 + "\n")
+    async def first_stage(self, job):
+        """Route a job by what pdf_metadata knows about its PDF
         
-        # Setup
-        self.setup_database()
-        self.load_csv_data()
+        GCS inputs go straight to the API when their page count is known to be
+        within the limit, to download + page selection when it is over it, and
+        through preflight first when the PDF is already cached locally. Only a
+        GCS input never seen locally can still hit PAGE_LIMIT_EXCEEDED (once -
+        the fallback download records its page count).
+        """
+        if not job.gcs_path:
+            return 'download'
         
-        # Load credentials
-        try:
-            self.credentials = create_creds()
-            print("[OK] Google credentials loaded\n")
-        except Exception as e:
-            print(f"[ERROR] Failed to load credentials: {e}")
-            return
+        page_count = self.page_counts.get(job.contract_id)
+        if page_count is not None:
+            if page_count > MAX_PAGES:
+                job.gcs_path = None
+                return 'download'
+            return 'api'
+        
+        loop = asyncio.get_running_loop()
+        job.pdf_path = await loop.run_in_executor(
+            self.io_pool, lambda: get_pdf_cache().lookup(url=job.pdf_url, contract_id=job.contract_id)
+        )
+        if job.pdf_path:
+            self.pin_pdf(job)
+            return 'preflight'
+        return 'api'
+    
+    def pin_pdf(self, job):
+        """Keep the job's cached PDF from being evicted while later stages read it"""
+        if job.pinned_path != job.pdf_path:
+            self.unpin_pdf(job)
+            get_pdf_cache().pin(job.pdf_path)
+            job.pinned_path = job.pdf_path
+    
+    def unpin_pdf(self, job):
+        if job.pinned_path:
+            get_pdf_cache().unpin(job.pinned_path)
+            job.pinned_path = None
+    
+    async def feed(self, contracts):
+        """Claim each contract and put it on its first stage (see first_stage)
+        
+        Claims happen as the queues drain, so a process only holds leases on
+        the few contracts it is actually working on. A claim or routing error
+        (sqlite busy, PDF cache lookup) fails that contract, not the feed.
+        """
+        for idx, (contract_id, pdf_url, gcs_path) in enumerate(contracts, 1):
+            job = ContractJob(idx, contract_id, pdf_url, gcs_path)
+            try:
+                if not await self.claim(contract_id):
+                    self.finish(job, {'status': 'skipped'})
+                    continue
+                stage = await self.first_stage(job)
+            except Exception as e:
+                self.finish_failure(job, f"Feed error: {e}")
+                continue
+            await self.queues[stage].put(job)
+    
+    def feed_done(self, task):
+        """Stop the run if the feed task died - otherwise all_done never fires"""
+        if not task.cancelled() and task.exception():
+            self.feed_error = task.exception()
+            print(f"[ERROR] Contract feed crashed: {self.feed_error!r}")
+            self.all_done.set()
+    
+    def print_stage_queues(self):
+        """Queue depth / back-pressure per stage"""
+        print("Stage queues (items, max/mean depth, producers blocked, consumers idle):")
+        for name, queue in self.queues.items():
+            stats = queue.stats()
+            print(f"  {name:<10} {stats['items']:>6} items  depth max {stats['max_depth']}/{stats['maxsize']} "
+                  f"mean {stats['mean_depth']:<6} blocked {stats['put_wait']:.1f}s  idle {stats['get_wait']:.1f}s")
+    
+    def changed_contracts(self, rows):
+        """Contracts whose input fingerprint no longer matches the stored one
+        
+        Downloaded PDFs are revalidated with conditional GETs (only replaced
+        ones are fetched again); GCS inputs compare by path and object
+        generation (one metadata request each).
+        
+        Args:
+            rows: input_fingerprint.fingerprint_rows() output
+        
+        Returns:
+            list: [(id, original_pdf_url, gcs_pdf_path)] that need a new run
+        """
+        downloader = get_downloader()
+        
+        def changed(row):
+            contract_id, pdf_url, gcs_path, stored, stored_sha256 = row
+            if stored is None:
+                # No successful fingerprinted run: new, pending, failed or processed before fingerprints existed
+                return True
+            if stored_sha256 is None:
+                gcs_uri = to_gcs_uri(gcs_path)
+                generation = object_generation(gcs_uri, self.credentials) if gcs_uri else None
+                if generation is None:
+                    return True
+                return self.fingerprint(pdf_url, gcs_path, generation=generation) != stored
+            try:
+                downloader.download(pdf_url, contract_id=contract_id, revalidate=True)
+            except DownloadError:
+                return True
+            pdf_sha256 = get_pdf_cache().lookup_hash(url=pdf_url)
+            return self.fingerprint(pdf_url, gcs_path, pdf_sha256) != stored
+        
+        with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='fingerprint') as pool:
+            flags = list(pool.map(changed, rows))
+        return [row[:3] for row, is_changed in zip(rows, flags) if is_changed]
+    
+    def get_pending_contracts(self, limit=None, resume=True, changed_only=False):
+        """Return [(id, original_pdf_url, gcs_pdf_path)] to process
         
-        # Get contracts to process
-        conn = sqlite3.connect(self.db_path)
+        changed_only selects every contract whose input fingerprint changed
+        (see changed_contracts) instead of the pending / failed ones.
+        """
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        if resume:
+        if changed_only:
+            rows = fingerprint_rows(conn)
+            print(f"Checking input fingerprints of {len(rows)} contracts...")
+            changed = self.changed_contracts(rows)
+            print(f"[OK] {len(changed)} contracts changed\n")
+        elif resume:
             cursor.execute("""
                 SELECT id, original_pdf_url, gcs_pdf_path 
                 FROM contracts 
@@ -378,12 +692,43 @@ class AsyncExtractionPipeline:
                 ORDER BY id
             """)
         
-        contracts = cursor.fetchall()
+        contracts = changed if changed_only else cursor.fetchall()
+        
+        # Page counts from earlier preflights - GCS routing and the cost order use them
+        self.page_counts = known_page_counts(conn)
+        
+        if self.order != ORDER_ID:
+            # Predicted cost from page counts (sizes where unknown) and past runs per hospital
+            by_id = {contract[0]: contract for contract in contracts}
+            ordered = order_by_cost(conn, by_id, PHASE1, self.order, extra_sizes=get_pdf_cache().sizes_by_contract(),
+                                    page_counts=self.page_counts)
+            contracts = [by_id[contract_id] for contract_id in ordered]
         conn.close()
         
         if limit:
             contracts = contracts[:limit]
         
+        return contracts
+    
+    async def run_async(self, limit=None, resume=True, changed_only=False):
+        """Run async extraction pipeline"""
+        print("="*80)
+        print(f"ASYNC PIPELINE - {self.num_workers} INITIAL WORKERS (max {self.max_workers})")
+        print("="*80 + "\n")
+        
+        # Setup
+        self.setup_database()
+        self.load_csv_data()
+        
+        # Load credentials
+        try:
+            self.credentials = create_creds()
+            print("[OK] Google credentials loaded\n")
+        except Exception as e:
+            print(f"[ERROR] Failed to load credentials: {e}")
+            return
+        
+        contracts = self.get_pending_contracts(limit, resume, changed_only)
         total = len(contracts)
         
         if total == 0:
@@ -391,31 +736,64 @@ class AsyncExtractionPipeline:
             self.print_summary()
             return
         
-        print(f"Processing {total} contracts with {self.num_workers} workers\n")
+        print(f"Processing {total} contracts: {self.download_workers} download, {self.prepare_workers} prepare, "
+              f"{self.num_workers} API (adaptive up to {self.max_workers}), {self.store_workers} store workers\n")
         print("="*80 + "\n")
         
-        # Create queue
-        queue = asyncio.Queue()
-        
-        # Add contracts to queue
-        for idx, (contract_id, pdf_url, gcs_path) in enumerate(contracts, 1):
-            await queue.put((idx, contract_id, pdf_url, gcs_path))
+        self.total = total
+        self.remaining = total
+        self.all_done = asyncio.Event()
         
-        # Add poison pills
-        for _ in range(self.num_workers):
-            await queue.put(None)
+        # One bounded input queue and one pool per stage - no stage can starve another
+        self.stage_queue('download', self.download_workers)
+        self.stage_queue('preflight', self.prepare_workers)
+        self.stage_queue('prepare', self.prepare_workers)
+        self.stage_queue('api', self.max_workers)
+        self.stage_queue('store', self.store_workers)
+        self.io_pool = ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='download')
+        self.cpu_pool = ProcessPoolExecutor(max_workers=self.prepare_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self.filter_pool = ThreadPoolExecutor(max_workers=self.store_workers, thread_name_prefix='filter')
         
-        # Start workers
+        # Start writer and stages
         start_time = time.time()
+        self.writer.start()
+        self.open_leases(resume and not changed_only)
+        
+        # One pooled keep-alive session shared by the API stage; the AIMD
+        # controller decides how many calls are in flight at once
+        client = AsyncLayoutParserClient(
+            self.credentials,
+            max_connections=max(self.max_workers, 10),
+            on_throttle=self.controller.record_throttle,
+            rate_limiter=get_rate_limiter()
+        )
+        async with client as self.docai_client:
+            self.feed_error = None
+            feed_task = asyncio.create_task(self.feed(contracts))
+            feed_task.add_done_callback(self.feed_done)
+            tasks = [feed_task]
+            tasks += [asyncio.create_task(self.download_stage()) for _ in range(self.download_workers)]
+            tasks += [asyncio.create_task(self.preflight_stage()) for _ in range(self.prepare_workers)]
+            tasks += [asyncio.create_task(self.prepare_stage()) for _ in range(self.prepare_workers)]
+            tasks += [asyncio.create_task(self.api_stage()) for _ in range(self.max_workers)]
+            tasks += [asyncio.create_task(self.store_stage()) for _ in range(self.store_workers)]
+            
+            # Wait until every contract has succeeded or failed
+            await self.all_done.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for pool in (self.io_pool, self.cpu_pool, self.filter_pool):
+            pool.shutdown(wait=False)
         
-        workers = [
-            asyncio.create_task(self.worker(queue, i+1, total))
-            for i in range(self.num_workers)
-        ]
+        # Flush remaining batched writes (lease releases included)
+        await asyncio.get_event_loop().run_in_executor(None, self.writer.close)
+        self.close_leases()
         
-        # Wait for completion
-        await queue.join()
-        await asyncio.gather(*workers)
+        if self.feed_error:
+            raise self.feed_error
         
         elapsed = time.time() - start_time
         
@@ -425,14 +803,35 @@ class AsyncExtractionPipeline:
         print("="*80)
         print(f"Time elapsed: {elapsed/60:.1f} minutes")
         print(f"Average: {elapsed/total:.1f} seconds per contract")
-        print(f"Workers: {self.num_workers}")
+        controller_stats = self.controller.summary()
+        print(f"Concurrency: settled at {controller_stats['limit']} "
+              f"(started {self.num_workers}, peak {controller_stats['peak_limit']}, "
+              f"{controller_stats['backoffs']} backoffs, {controller_stats['throttle_events']} throttles)")
+        self.print_writer_stats()
+        self.print_stage_queues()
+        cache_stats = get_response_cache().stats()
+        print(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['stores']} responses stored")
+        download_stats = get_downloader().stats()
+        print(f"Downloads: {download_stats['downloads']} fetched ({download_stats['mb_downloaded']} MB, "
+              f"{download_stats['resumes']} resumed), {download_stats['cache_hits']} cache hits")
+        for name, bucket_stats in get_rate_limiter().stats().items():
+            print(f"Quota {name}: {bucket_stats['rate_per_minute']:.0f}/min, waited {bucket_stats['total_wait']:.1f}s")
         print("="*80 + "\n")
         
         self.print_summary()
     
+    def print_writer_stats(self):
+        """Print DB writer totals - failed writes were dropped, so call them out"""
+        writer_stats = self.writer.stats()
+        print(f"DB writes: {writer_stats['statements']} statements in {writer_stats['transactions']} transactions "
+              f"({writer_stats['write_seconds']:.1f}s), {writer_stats['errors']} failed")
+        if writer_stats['errors']:
+            print(f"[WARNING] {writer_stats['errors']} DB writes failed and were not saved (see the log above)")
+    
     def get_processing_stats(self):
         """Get current processing statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path, readonly=True)
         cursor = conn.cursor()
         
         cursor.execute("SELECT COUNT(*) FROM contracts WHERE extraction_status = 'success'")
@@ -444,10 +843,14 @@ class AsyncExtractionPipeline:
         cursor.execute("SELECT COUNT(*) FROM contracts WHERE extraction_status = 'pending'")
         pending = cursor.fetchone()[0]
         
-        cursor.execute("SELECT SUM(num_tables), SUM(num_rows) FROM contracts WHERE extraction_status = 'success'")
+        cursor.execute("""
+            SELECT SUM(num_tables), SUM(num_rows), SUM(table_cell_count) FROM contracts
+            WHERE extraction_status = 'success'
+        """)
         totals = cursor.fetchone()
         total_tables = totals[0] or 0
         total_rows = totals[1] or 0
+        total_cells = totals[2] or 0
         
         conn.close()
         
@@ -456,7 +859,8 @@ class AsyncExtractionPipeline:
             'failed': failed,
             'pending': pending,
             'total_tables': total_tables,
-            'total_rows': total_rows
+            'total_rows': total_rows,
+            'total_cells': total_cells
         }
     
     def print_summary(self):
@@ -471,10 +875,188 @@ class AsyncExtractionPipeline:
         print(f"Pending:       {stats['pending']}")
         print(f"\nTotal tables:  {stats['total_tables']}")
         print(f"Total rows:    {stats['total_rows']}")
+        print(f"Total cells:   {stats['total_cells']}")
+        
+        conn = connect(self.db_path, readonly=True)
+        preflight = metadata_summary(conn, MAX_PAGES)
+        if preflight['checked']:
+            print(f"\nPreflight:     {preflight['checked']} PDFs checked, {preflight['not_pdf']} not PDFs, "
+                  f"{preflight['password_protected']} password-protected, {preflight['over_limit']} over "
+                  f"{MAX_PAGES} pages, {preflight['no_text_layer']} without a text layer")
+        print_stage_breakdown(conn, PHASE1, PHASE1_STAGES)
+        conn.close()
+        
         print("="*80)
         print(f"\nDatabase: {self.db_path}")
         print("="*80)
 
+class BatchExtractionPipeline(AsyncExtractionPipeline):
+    """Phase 1 engine using Document AI batchProcess (long-running operations)
+    
+    Same database, status and resume semantics as AsyncExtractionPipeline, but
+    contracts are submitted by GCS URI in groups and the operations are polled,
+    so there are no per-request quotas or 120s sync timeouts.
+    """
+    
+    def __init__(self, db_path=DB_PATH, csv_path=CSV_PATH, batch_size=100, max_operations=5, poll_interval=15,
+                 raw_json_store='pack', order=ORDER_ID):
+        super().__init__(db_path, csv_path, raw_json_store=raw_json_store, order=order)
+        self.batch_size = batch_size
+        self.max_operations = max_operations
+        self.poll_interval = poll_interval
+        self.batch_client = None
+    
+    async def wait_for_operation(self, operation_name):
+        """Poll an operation without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        while True:
+            operation = await loop.run_in_executor(None, self.batch_client.get_operation, operation_name)
+            if operation.get('done'):
+                if 'error' in operation:
+                    raise Exception(f"Batch operation failed: {operation['error'].get('message', operation['error'])}")
+                return operation
+            await asyncio.sleep(self.poll_interval)
+    
+    async def process_batch(self, batch, batch_num, num_batches, slots):
+        """Submit one group of contracts, wait for it and store every result
+        
+        Returns:
+            tuple: (succeeded, failed)
+        """
+        # Contracts may share a gcs_path - each URI is submitted once and its status fans out
+        uri_to_contracts = {}
+        for contract_id, _, gcs_path in batch:
+            uri_to_contracts.setdefault(to_gcs_uri(gcs_path), []).append(contract_id)
+        inputs = {contract_id: (pdf_url, gcs_path) for contract_id, pdf_url, gcs_path in batch}
+        loop = asyncio.get_event_loop()
+        # Contracts whose success update committed (filled on the writer thread)
+        saved = []
+        
+        async with slots:
+            try:
+                # Generations of the objects Document AI is about to read (see input_fingerprint)
+                generations = await asyncio.gather(*[
+                    loop.run_in_executor(None, object_generation, gcs_uri, self.credentials) for gcs_uri in uri_to_contracts
+                ])
+                generations = dict(zip(uri_to_contracts, generations))
+                operation_name = await loop.run_in_executor(None, self.batch_client.submit, list(uri_to_contracts))
+                print(f"[Batch {batch_num}/{num_batches}] Submitted {len(batch)} contracts: {operation_name.rsplit('/', 1)[-1]}")
+                operation = await self.wait_for_operation(operation_name)
+            except Exception as e:
+                print(f"[Batch {batch_num}/{num_batches}] [FAILED] {str(e)[:80]}")
+                for contract_id, _, _ in batch:
+                    self.save_failure(contract_id, str(e))
+                return 0, len(batch)
+        
+        for status in self.batch_client.individual_statuses(operation):
+            gcs_uri = status.get('inputGcsSource')
+            contract_ids = uri_to_contracts.pop(gcs_uri, None)
+            if not contract_ids:
+                continue
+            
+            error = status.get('status', {})
+            if error.get('code'):
+                for contract_id in contract_ids:
+                    self.save_failure(contract_id, error.get('message', f"Batch status {error['code']}"))
+                continue
+            
+            try:
+                raw_api_response = await loop.run_in_executor(
+                    None, self.batch_client.read_output, status['outputGcsDestination']
+                )
+                tables = await loop.run_in_executor(None, build_tables, raw_api_response)
+            except Exception as e:
+                for contract_id in contract_ids:
+                    self.save_failure(contract_id, str(e))
+                continue
+            
+            for contract_id in contract_ids:
+                try:
+                    fingerprint = self.fingerprint(*inputs[contract_id], generation=generations[gcs_uri])
+                    self.save_success(contract_id, tables, raw_api_response, fingerprint=fingerprint,
+                                      on_saved=lambda result, contract_id=contract_id: saved.append(contract_id))
+                except Exception as e:
+                    self.save_failure(contract_id, str(e))
+        
+        # Documents the operation didn't report on
+        for contract_ids in uri_to_contracts.values():
+            for contract_id in contract_ids:
+                self.save_failure(contract_id, "Missing from batch results")
+        
+        # Count successes once their deferred writes have committed (or failed)
+        await loop.run_in_executor(None, self.writer.flush)
+        succeeded = len(saved)
+        failed = len(batch) - succeeded
+        print(f"[Batch {batch_num}/{num_batches}] [OK] {succeeded} succeeded, {failed} failed")
+        return succeeded, failed
+    
+    async def run_async(self, limit=None, resume=True, changed_only=False):
+        """Run the batch extraction pipeline"""
+        print("="*80)
+        print(f"BATCH PIPELINE - {self.batch_size} CONTRACTS PER OPERATION (max {self.max_operations} running)")
+        print("="*80 + "\n")
+        
+        self.setup_database()
+        self.load_csv_data()
+        
+        try:
+            self.credentials = create_creds()
+            print("[OK] Google credentials loaded\n")
+        except Exception as e:
+            print(f"[ERROR] Failed to load credentials: {e}")
+            return
+        
+        self.batch_client = BatchLayoutParserClient(self.credentials, poll_interval=self.poll_interval)
+        contracts = self.get_pending_contracts(limit, resume, changed_only)
+        
+        # Operations run for minutes - claim the whole selection up front
+        self.open_leases(resume and not changed_only)
+        contracts = [c for c in contracts if await self.claim(c[0])]
+        
+        if not contracts:
+            print("[OK] No contracts to process\n")
+            self.close_leases()
+            self.print_summary()
+            return
+        
+        # batchProcess only reads from Cloud Storage
+        batchable = [c for c in contracts if to_gcs_uri(c[2])]
+        skipped = [c for c in contracts if not to_gcs_uri(c[2])]
+        
+        batches = [batchable[i:i + self.batch_size] for i in range(0, len(batchable), self.batch_size)]
+        print(f"Processing {len(batchable)} contracts in {len(batches)} batches")
+        if skipped:
+            print(f"[WARNING] {len(skipped)} contracts have no GCS path - run them with --engine online")
+        print("="*80 + "\n")
+        
+        start_time = time.time()
+        self.writer.start()
+        
+        for contract_id, _, _ in skipped:
+            self.save_failure(contract_id, "No GCS path for batch processing")
+        
+        slots = asyncio.Semaphore(self.max_operations)
+        results = await asyncio.gather(*[
+            self.process_batch(batch, i + 1, len(batches), slots)
+            for i, batch in enumerate(batches)
+        ])
+        
+        await asyncio.get_event_loop().run_in_executor(None, self.writer.close)
+        self.close_leases()
+        
+        elapsed = time.time() - start_time
+        succeeded = sum(r[0] for r in results)
+        
+        print("\n" + "="*80)
+        print("PROCESSING COMPLETE")
+        print("="*80)
+        print(f"Time elapsed: {elapsed/60:.1f} minutes")
+        print(f"Batch results: {succeeded} succeeded, {len(contracts) - succeeded} failed")
+        self.print_writer_stats()
+        print("="*80 + "\n")
+        
+        self.print_summary()
+
 def main():
     """Main entry point"""
     import argparse
@@ -482,12 +1064,55 @@ def main():
     parser = argparse.ArgumentParser(description='Async table extraction pipeline')
     parser.add_argument('--limit', type=int, help='Limit number of contracts')
     parser.add_argument('--no-resume', action='store_true', help='Process all (ignore existing)')
-    parser.add_argument('--workers', type=int, default=5, help='Number of concurrent workers (default: 5)')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='Process only contracts whose inputs changed (PDF, URL, page selection, processor version)')
+    parser.add_argument('--workers', type=int, default=5, help='Initial number of concurrent workers (default: 5)')
+    parser.add_argument('--max-workers', type=int, default=50, help='Upper bound for adaptive concurrency (default: 50)')
+    parser.add_argument('--fixed-workers', action='store_true', help='Disable adaptive concurrency (always use --workers)')
+    parser.add_argument('--page-selection', choices=['screen', 'trim', 'split'], default='screen',
+                        help='Pages sent to Document AI: screen = detected table pages (default), '
+                             'trim = last 30 pages, split = every page in concurrent chunks')
+    parser.add_argument('--shard-pages', type=int, default=30,
+                        help='Pages per chunk with --page-selection split (max 30, default: 30)')
+    parser.add_argument('--engine', choices=['online', 'batch'], default='online',
+                        help='online = one :process request per contract (default), '
+                             'batch = Document AI batchProcess operations (GCS inputs)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Contracts per batch operation (default: 100)')
+    parser.add_argument('--max-operations', type=int, default=5, help='Batch operations running at once (default: 5)')
+    parser.add_argument('--raw-json-store', choices=['pack', 'db'], default='pack',
+                        help='Where raw responses go: pack (data/response_packs, DB keeps a pointer) or db (inline)')
+    parser.add_argument('--download-workers', type=int, default=8, help='Download stage threads (default: 8)')
+    parser.add_argument('--prepare-workers', type=int, help='Page selection / encoding processes (default: CPU count)')
+    parser.add_argument('--store-workers', type=int, default=2, help='Filter / store stage threads (default: 2)')
+    parser.add_argument('--queue-depth', type=int, help='Max items waiting per stage (default: 2x the stage workers)')
+    parser.add_argument('--order', choices=ORDERS, default=ORDER_ID,
+                        help='Queue order: id (default), lpt = longest predicted first (shortest makespan), '
+                             'spt = shortest predicted first (quick smoke runs)')
     parser.add_argument('--stats', action='store_true', help='Show statistics only')
     
     args = parser.parse_args()
     
-    pipeline = AsyncExtractionPipeline(num_workers=args.workers)
+    if args.engine == 'batch':
+        pipeline = BatchExtractionPipeline(
+            batch_size=args.batch_size,
+            max_operations=args.max_operations,
+            raw_json_store=args.raw_json_store,
+            order=args.order
+        )
+    else:
+        pipeline = AsyncExtractionPipeline(
+            num_workers=args.workers,
+            max_workers=args.max_workers,
+            adaptive=not args.fixed_workers,
+            page_selection=args.page_selection,
+            shard_pages=args.shard_pages,
+            raw_json_store=args.raw_json_store,
+            order=args.order,
+            download_workers=args.download_workers,
+            prepare_workers=args.prepare_workers,
+            store_workers=args.store_workers,
+            queue_depth=args.queue_depth
+        )
     
     if args.stats:
         pipeline.setup_database()
@@ -495,7 +1120,8 @@ def main():
     else:
         asyncio.run(pipeline.run_async(
             limit=args.limit,
-            resume=not args.no_resume
+            resume=not args.no_resume,
+            changed_only=args.changed_only
         ))
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ Supports: OpenAI (GPT-5), Cerebras (Llama 4)
 """
 import os
 
+from rate_limiter import get_rate_limiter, LLM_REQUESTS, LLM_TOKENS
+
 # Try to load dotenv (optional)
 try:
     from dotenv import load_dotenv
@@ -24,19 +26,30 @@ try:
 except ImportError:
     HAS_CEREBRAS = False
 
+# Output tokens charged against the TPM quota when no max_tokens is given
+# (OpenAI counts the requested output budget, not just the prompt)
+DEFAULT_OUTPUT_RESERVE = 4096
+
+def estimate_tokens(prompt, system_prompt=None, max_tokens=None):
+    """Tokens a call reserves against the TPM quota (~4 chars per token)"""
+    prompt_tokens = (len(prompt) + len(system_prompt or '')) // 4
+    return prompt_tokens + (max_tokens or DEFAULT_OUTPUT_RESERVE)
+
 class LLMCaller:
     """Generic LLM caller supporting OpenAI and Cerebras"""
     
-    def __init__(self, model="gpt-5-2025-08-07", api_key_env="OPENAI_API_KEY"):
+    def __init__(self, model="gpt-5-2025-08-07", api_key_env="OPENAI_API_KEY", rate_limiter=None):
         """
         Initialize LLM caller
         
         Args:
             model: Model identifier (e.g., "gpt-5-2025-08-07", "llama-4-scout-17b-16e-instruct")
             api_key_env: Environment variable name for API key
+            rate_limiter: RateLimiter to charge (default: shared process-wide limiter)
         """
         self.model = model
         self.api_key_env = api_key_env
+        self.rate_limiter = rate_limiter or get_rate_limiter()
         self.client = None
         self.provider = None
         self._setup_client()
@@ -59,8 +72,10 @@ class LLMCaller:
                     "Run: pip install openai"
                 )
             self.provider = "openai"
-            self.client = OpenAI(api_key=api_key)
-            print(f"[OK] OpenAI client initialized (model: {self.model})")
+            # OPENAI_BASE_URL points the client at a compatible server (e.g. standins/openai_server.py)
+            base_url = os.getenv("OPENAI_BASE_URL")
+            self.client = OpenAI(api_key=api_key, base_url=base_url or None)
+            print(f"[OK] OpenAI client initialized (model: {self.model}{', ' + base_url if base_url else ''})")
             
         elif "CEREBRAS" in self.api_key_env or "llama" in self.model.lower():
             if not HAS_CEREBRAS:
@@ -77,7 +92,7 @@ class LLMCaller:
                 "Please use OPENAI_API_KEY or CEREBRAS_API_KEY"
             )
     
-    def call(self, prompt, system_prompt=None, temperature=0.1, max_tokens=None):
+    def call(self, prompt, system_prompt=None, temperature=0.1, max_tokens=None, call_info=None):
         """
         Call LLM with prompt
         
@@ -86,6 +101,8 @@ class LLMCaller:
             system_prompt: Optional system prompt
             temperature: Sampling temperature (0.0-1.0)
             max_tokens: Maximum output tokens (None = use model default)
+            call_info: Optional dict, filled with 'http_status' and 'retries'
+                (SDK-level retries; OpenAI only)
         
         Returns:
             str: LLM response text
@@ -98,6 +115,12 @@ class LLMCaller:
             if max_tokens:
                 print(f"[DEBUG]   Max tokens: {max_tokens:,}")
             
+            # Charge shared quotas (requests/min and estimated prompt + output tokens/min)
+            self.rate_limiter.acquire(LLM_REQUESTS)
+            waited = self.rate_limiter.acquire(LLM_TOKENS, estimate_tokens(prompt, system_prompt, max_tokens))
+            if waited:
+                print(f"[DEBUG]   Waited {waited:.1f}s for token quota")
+            
             messages = []
             
             if system_prompt:
@@ -118,13 +141,22 @@ class LLMCaller:
                 kwargs["max_tokens"] = max_tokens
             
             # Call appropriate provider
-            response = self.client.chat.completions.create(**kwargs)
+            if self.provider == "openai":
+                raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+                if call_info is not None:
+                    call_info['http_status'] = raw.status_code
+                    call_info['retries'] = raw.retries_taken
+                response = raw.parse()
+            else:
+                response = self.client.chat.completions.create(**kwargs)
             result = response.choices[0].message.content
             
             print(f"[DEBUG] {self.provider.upper()} response received: {len(result):,} chars")
             return result
             
         except Exception as e:
+            if call_info is not None and getattr(e, 'status_code', None):
+                call_info['http_status'] = e.status_code
             print(f"\n{'='*80}")
             print(f"[ERROR] {self.provider.upper()} API CALL FAILED")
             print(f"{'='*80}")
@@ -0,0 +1,14 @@
+"""
+Parsing of CSV cell values for the contracts table
+read_csv runs with dtype=str, so every cell arrives as a string - including
+what pandas or a spreadsheet wrote for a numeric column with blanks
+('2016.0', '', ' ').
+"""
+
+def parse_year(value):
+    """Year as int, or None for blank / unparseable values ('2016', '2016.0', ' 2016 ')"""
+    value = (value or '').strip()
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):
+        return None
@@ -0,0 +1,51 @@
+"""
+Shared SQLite connection factory for data/hospital_tables.db
+Every script opens the database through connect() so they all run in WAL
+mode with the same pragmas and can work on the same file concurrently
+"""
+import os
+import sqlite3
+from pathlib import Path
+
+# Absolute path so scripts work from any working directory
+DB_PATH = str(Path(__file__).parent.parent / "data" / "hospital_tables.db")
+
+# Pragmas applied to every connection
+BUSY_TIMEOUT_MS = 30000              # Wait up to 30s for a lock instead of "database is locked"
+SYNCHRONOUS = "NORMAL"               # Safe with WAL, one fsync per checkpoint instead of per commit
+CACHE_SIZE_KB = 64 * 1024            # 64 MB page cache
+MMAP_SIZE = 256 * 1024 * 1024        # 256 MB memory-mapped reads
+
+# WAL needs shared memory, so every process must be on the same machine. When
+# several machines share the file over a network volume set this to DELETE.
+JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+
+def connect(db_path=DB_PATH, readonly=False, check_same_thread=True):
+    """Open a tuned SQLite connection
+
+    Args:
+        db_path: Database path (default: data/hospital_tables.db)
+        readonly: Open read-only (readers never block writers in WAL mode)
+        check_same_thread: Passed to sqlite3.connect
+
+    Returns:
+        sqlite3.Connection
+    """
+    if readonly:
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=check_same_thread)
+    else:
+        conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=check_same_thread)
+
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    if not readonly:
+        # journal_mode is persistent - stored in the file once set
+        conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    return conn
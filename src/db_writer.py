@@ -0,0 +1,202 @@
+"""
+Single-writer batched SQLite persistence stage
+One dedicated thread owns the write connection and groups statements into
+one transaction per batch_size rows or flush_interval seconds
+"""
+import sqlite3
+import queue
+import threading
+import time
+
+from db_connection import connect
+
+_STOP = object()
+
+class BatchedDBWriter:
+    """Dedicated writer thread fed by a queue
+
+    Workers call submit(sql, params) and return immediately. `params` may be
+    a callable, which is evaluated on the writer thread - use it to keep
+    expensive serialization (e.g. json.dumps of a multi-MB response) off the
+    event loop. If it raises, or the statement can't be written, the statement
+    is dropped and its on_error callback (if any) gets the exception.
+
+    Usage:
+        writer = BatchedDBWriter(db_path).start()
+        writer.submit("UPDATE contracts SET ... WHERE id = ?", (...))
+        writer.close()  # flushes everything still queued
+    """
+
+    def __init__(self, db_path, batch_size=50, flush_interval=0.5):
+        """
+        Args:
+            db_path: SQLite database path
+            batch_size: Max statements per transaction
+            flush_interval: Max seconds a statement waits before its batch commits
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = None
+
+        # Stats
+        self.statements = 0
+        self.transactions = 0
+        self.errors = 0
+        self.write_seconds = 0.0
+
+    def start(self):
+        """Start the writer thread"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self.thread.start()
+        return self
+
+    def submit(self, sql, params=(), on_commit=None, on_error=None):
+        """Queue one statement
+
+        Args:
+            sql: SQL statement
+            params: Params tuple, or a callable returning it (run on the writer thread)
+            on_commit: Optional callback(seconds) run on the writer thread once
+                the statement is committed, with the time since submit
+            on_error: Optional callback(exception) run on the writer thread if
+                the callable params raise or the write fails (nothing is written)
+        """
+        self.queue.put((sql, params, on_commit, on_error, time.perf_counter()))
+
+    def flush(self):
+        """Block until everything submitted so far is committed"""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Flush pending statements and stop the writer thread"""
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        """Return writer statistics"""
+        return {
+            'statements': self.statements,
+            'transactions': self.transactions,
+            'errors': self.errors,
+            'write_seconds': round(self.write_seconds, 3)
+        }
+
+    def _run(self):
+        """Writer loop: collect a batch, write it in one transaction"""
+        conn = connect(self.db_path)
+        running = True
+
+        while running:
+            batch = []
+            waiters = []
+
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+
+        # Statements queued by on_commit callbacks of the final batch (which may queue more)
+        while True:
+            leftover = []
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not _STOP:
+                    leftover.append(item)
+            if not leftover:
+                break
+            self._write_batch(conn, leftover)
+        for waiter in waiters:
+            waiter.set()
+
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        """Write a batch in one transaction, falling back to per-statement on error
+
+        A statement that can't be built or written is dropped and its
+        on_error callback gets the exception; the writer thread keeps going.
+        """
+        started = time.time()
+        statements = []
+        for sql, params, on_commit, on_error, submitted in batch:
+            try:
+                statements.append((sql, params() if callable(params) else params, on_commit, on_error, submitted))
+            except Exception as e:
+                print(f"[ERROR] Could not build DB write parameters: {e}")
+                self._failed(on_error, e)
+
+        committed = []
+        try:
+            with conn:
+                for sql, params, _, _, _ in statements:
+                    conn.execute(sql, params)
+            self.transactions += 1
+            self.statements += len(statements)
+            committed = statements
+        except Exception as e:
+            # sqlite3.Error, or a binding error (OverflowError, unsupported type)
+            print(f"[WARNING] Batch write failed ({e}), retrying statements one by one")
+            for statement in statements:
+                sql, params, _, on_error, _ = statement
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    self.transactions += 1
+                    self.statements += 1
+                    committed.append(statement)
+                except Exception as e2:
+                    print(f"[ERROR] DB write failed: {e2}")
+                    self._failed(on_error, e2)
+
+        self.write_seconds += time.time() - started
+
+        now = time.perf_counter()
+        for _, _, on_commit, _, submitted in committed:
+            if on_commit:
+                try:
+                    on_commit(now - submitted)
+                except Exception as e:
+                    print(f"[ERROR] DB commit callback failed: {e}")
+
+    def _failed(self, on_error, error):
+        """Count a dropped statement and hand the error to its callback"""
+        self.errors += 1
+        if on_error:
+            try:
+                on_error(error)
+            except Exception as e:
+                print(f"[ERROR] DB error callback failed: {e}")
@@ -0,0 +1,117 @@
+"""
+Adaptive AIMD concurrency controller for Document AI workers
+Grows in-flight requests while latency stays healthy, halves on 429s/timeouts
+"""
+import asyncio
+import time
+from collections import deque
+from statistics import median
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease limit on in-flight requests
+
+    Workers call `await acquire()` before a request and `release(latency)`
+    after it. Every full window of healthy completions (one per slot) raises
+    the limit by `increase`. A 429 or timeout reported through
+    `record_throttle()` multiplies the limit by `decrease_factor`, at most
+    once per `cooldown` seconds so one burst counts as a single signal.
+    """
+
+    def __init__(self, initial=5, min_limit=1, max_limit=50, increase=1, decrease_factor=0.5,
+                 latency_tolerance=2.0, latency_window=20, cooldown=5.0):
+        """
+        Args:
+            initial: Starting concurrency limit
+            min_limit: Lowest limit the controller backs off to
+            max_limit: Highest limit the controller grows to
+            increase: Slots added per healthy window
+            decrease_factor: Multiplier applied on a throttle signal
+            latency_tolerance: Latency is healthy while the recent median stays
+                below tolerance x the best median seen so far
+            latency_window: Number of recent latencies in the rolling median
+            cooldown: Seconds between two multiplicative decreases
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.backoffs = 0
+        self.throttle_events = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.best_median = None
+        self.healthy_in_window = 0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait until a slot below the current limit is free"""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, latency=None, throttled=False):
+        """Free a slot and feed the outcome back into the limit
+
+        Args:
+            latency: Request duration in seconds (None if unknown)
+            throttled: True if the request ended in a 429 or timeout
+        """
+        async with self.condition:
+            self.in_flight -= 1
+
+            if throttled:
+                self._decrease()
+            elif latency is not None:
+                self.latencies.append(latency)
+                if self._latency_healthy():
+                    self.healthy_in_window += 1
+                    if self.healthy_in_window >= self.limit:
+                        self.healthy_in_window = 0
+                        self.limit = min(self.max_limit, self.limit + self.increase)
+                        self.peak_limit = max(self.peak_limit, self.limit)
+                else:
+                    self.healthy_in_window = 0
+
+            self.condition.notify_all()
+
+    def record_throttle(self):
+        """Report a 429 or timeout seen mid-request (e.g. before a retry)"""
+        self.throttle_events += 1
+        self._decrease()
+
+    def _decrease(self):
+        """Multiplicative decrease, rate-limited by the cooldown"""
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.backoffs += 1
+        self.healthy_in_window = 0
+        self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+
+    def _latency_healthy(self):
+        """Compare the rolling median latency against the best seen so far"""
+        if len(self.latencies) < min(5, self.latencies.maxlen):
+            return True
+
+        current = median(self.latencies)
+        if self.best_median is None or current < self.best_median:
+            self.best_median = current
+
+        return current <= self.best_median * self.latency_tolerance
+
+    def summary(self):
+        """Return the settled limit and controller statistics"""
+        return {
+            'limit': self.limit,
+            'peak_limit': self.peak_limit,
+            'backoffs': self.backoffs,
+            'throttle_events': self.throttle_events,
+            'median_latency': median(self.latencies) if self.latencies else None
+        }
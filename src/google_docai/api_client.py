@@ -2,13 +2,62 @@
 API client for Google Document AI Layout Parser
 Handles authentication and API calls
 """
+import os
 import base64
 import requests
 import time
-from google.auth.transport.requests import Request
 
-# Document AI endpoint (Layout Parser)
-ENDPOINT_URL = "https://eu-documentai.googleapis.com/v1/projects/988857320354/locations/eu/processors/92b16a912417ec56:process"
+from token_provider import get_token_provider
+
+# Document AI endpoint (Layout Parser) - DOCAI_BASE_URL points it at a local stand-in server
+DOCAI_BASE_URL = os.getenv("DOCAI_BASE_URL", "https://eu-documentai.googleapis.com").rstrip('/')
+PROCESSOR_NAME = "projects/988857320354/locations/eu/processors/92b16a912417ec56"
+
+# Optional processor version pin (default: the processor's default version) - part of the response cache key
+PROCESSOR_VERSION = os.getenv("DOCAI_PROCESSOR_VERSION", "")
+PROCESSOR_PATH = f"{PROCESSOR_NAME}/processorVersions/{PROCESSOR_VERSION}" if PROCESSOR_VERSION else PROCESSOR_NAME
+
+ENDPOINT_URL = f"{DOCAI_BASE_URL}/v1/{PROCESSOR_PATH}:process"
+BATCH_ENDPOINT_URL = f"{DOCAI_BASE_URL}/v1/{PROCESSOR_PATH}:batchProcess"
+
+def build_request_body(pdf_path_or_gcs_uri, use_gcs=False, verbose=False):
+    """Build the :process request body for a local PDF or GCS URI
+
+    Args:
+        pdf_path_or_gcs_uri: Path to local PDF file or GCS URI (gs://bucket/path)
+        use_gcs: If True, treat input as GCS URI instead of local file
+        verbose: Print progress
+
+    Returns:
+        dict: Request body (gcsDocument or rawDocument)
+    """
+    if use_gcs:
+        # Direct GCS URI - no download needed!
+        if verbose:
+            print(f"  Using GCS URI: {pdf_path_or_gcs_uri[:60]}...")
+
+        return {
+            'gcsDocument': {
+                'gcsUri': pdf_path_or_gcs_uri,
+                'mimeType': 'application/pdf'
+            }
+        }
+
+    # Local file - read and encode to base64
+    with open(pdf_path_or_gcs_uri, 'rb') as f:
+        pdf_content = f.read()
+
+    if verbose:
+        print(f"  PDF size: {len(pdf_content) / 1024:.2f} KB")
+
+    pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
+
+    return {
+        'rawDocument': {
+            'content': pdf_base64,
+            'mimeType': 'application/pdf'
+        }
+    }
 
 def call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose=True, use_gcs=False):
     """Call Document AI Layout Parser API
@@ -20,15 +69,16 @@ def call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose=True, use_gcs=F
         use_gcs: If True, treat input as GCS URI instead of local file
 
     Returns:
-        dict: API response JSON
+        dict: API response JSON (from the response cache if this exact request succeeded before)
     """
+    from response_cache import get_response_cache
+
     try:
         if verbose:
             print(f"Calling Document AI Layout Parser...")
 
-        # Get access token
-        credentials.refresh(Request())
-        access_token = credentials.token
+        # Get access token (cached until close to expiry)
+        access_token = get_token_provider(credentials).get_token()
 
         # Prepare request headers
         headers = {
@@ -37,33 +87,16 @@ def call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose=True, use_gcs=F
         }
 
         # Prepare request body based on source
-        if use_gcs:
-            # Direct GCS URI - no download needed!
-            if verbose:
-                print(f"  Using GCS URI: {pdf_path_or_gcs_uri[:60]}...")
-            
-            body = {
-                'gcsDocument': {
-                    'gcsUri': pdf_path_or_gcs_uri,
-                    'mimeType': 'application/pdf'
-                }
-            }
-        else:
-            # Local file - read and encode to base64
-            with open(pdf_path_or_gcs_uri, 'rb') as f:
-                pdf_content = f.read()
+        body = build_request_body(pdf_path_or_gcs_uri, use_gcs=use_gcs, verbose=verbose)
 
+        # Same bytes, processor and pages as an earlier successful call - no API call needed
+        cache = get_response_cache()
+        cache_key = cache.key(body)
+        result = cache.get(cache_key)
+        if result is not None:
             if verbose:
-                print(f"  PDF size: {len(pdf_content) / 1024:.2f} KB")
-
-            pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
-            
-            body = {
-                'rawDocument': {
-                    'content': pdf_base64,
-                    'mimeType': 'application/pdf'
-                }
-            }
+                print(f"  [OK] Response cache hit")
+            return result
 
         if verbose:
             print(f"  Sending request to Document AI...")
@@ -86,6 +119,7 @@ def call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose=True, use_gcs=F
                         print(f"  [OK] API call successful")
 
                     result = response.json()
+                    cache.put(cache_key, result)
 
                     # Count pages
                     document = result.get('document', {})
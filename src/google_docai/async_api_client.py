@@ -0,0 +1,202 @@
+"""
+Async API client for Google Document AI Layout Parser
+One pooled keep-alive HTTP session shared by every pipeline worker
+"""
+import sys
+import time
+import asyncio
+import httpx
+from pathlib import Path
+from contextlib import nullcontext
+
+# Shared modules (rate_limiter) live one level up in src/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import api_client
+from api_client import build_request_body
+from rate_limiter import DOCAI_REQUESTS, DOCAI_BYTES
+from token_provider import get_token_provider
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+class AsyncLayoutParserClient:
+    """Async Document AI client with a pooled keep-alive session
+
+    Usage:
+        async with AsyncLayoutParserClient(credentials) as client:
+            response = await client.call_layout_parser(pdf_path)
+    """
+
+    def __init__(self, credentials, max_connections=64, timeout=120, http2=True, max_retries=3, retry_delay=2,
+                 on_throttle=None, rate_limiter=None):
+        """
+        Args:
+            credentials: Google credentials (access token cached by the shared TokenProvider)
+            max_connections: Max concurrent connections in the pool
+            timeout: Per-request timeout in seconds
+            http2: Use HTTP/2 when the h2 package is installed
+            max_retries: Attempts per request (429s and timeouts are retried)
+            retry_delay: Base backoff delay in seconds
+            on_throttle: Optional callback invoked on every 429 or timeout
+                (e.g. AIMDController.record_throttle)
+            rate_limiter: Optional shared RateLimiter charged per attempt
+                (docai_requests) and per payload byte (docai_bytes)
+        """
+        self.credentials = credentials
+        self.tokens = get_token_provider(credentials)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.http2 = http2 and HAS_HTTP2
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.on_throttle = on_throttle
+        self.rate_limiter = rate_limiter
+        self.session = None
+
+    async def open(self):
+        """Open the pooled HTTP session"""
+        if self.session is None:
+            self.session = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout, connect=30),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=120
+                )
+            )
+        return self
+
+    async def close(self):
+        """Close the pooled HTTP session"""
+        if self.session is not None:
+            await self.session.aclose()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def get_access_token(self):
+        """Cached access token (refreshed off the event loop only near expiry)"""
+        return await self.tokens.get_token_async()
+
+    async def call_layout_parser(self, pdf_path_or_gcs_uri, verbose=False, use_gcs=False, timer=None):
+        """Call Document AI Layout Parser API
+
+        Args:
+            pdf_path_or_gcs_uri: Path to local PDF file or GCS URI (gs://bucket/path)
+            verbose: Print progress
+            use_gcs: If True, treat input as GCS URI instead of local file
+            timer: Optional StageTimer - records 'encode' and 'docai' (payload
+                size, retries, last HTTP status)
+
+        Returns:
+            dict: API response JSON
+
+        Raises:
+            Exception: On API errors (message includes the API error text,
+                e.g. PAGE_LIMIT_EXCEEDED) or when retries are exhausted
+        """
+        loop = asyncio.get_running_loop()
+
+        # Reading + base64 of large PDFs stays off the event loop
+        started = time.perf_counter()
+        body = await loop.run_in_executor(
+            None, lambda: build_request_body(pdf_path_or_gcs_uri, use_gcs=use_gcs, verbose=verbose)
+        )
+
+        if timer:
+            timer.add('encode', time.perf_counter() - started, payload_bytes=self.payload_bytes(body))
+
+        return await self.process_body(body, verbose=verbose, timer=timer)
+
+    @staticmethod
+    def payload_bytes(body):
+        """Size of the inline document in a request body (0 for GCS inputs)"""
+        return len(body['rawDocument']['content']) if 'rawDocument' in body else 0
+
+    async def process_body(self, body, verbose=False, timer=None):
+        """Send an already built request body (see api_client.build_request_body
+        and request_prep.prepare_request)
+
+        Phase 1 checks the response cache before it gets here (see response_cache).
+
+        Args:
+            body: :process request body
+            verbose: Print progress
+            timer: Optional StageTimer - records 'docai' (payload size,
+                retries, last HTTP status)
+
+        Returns:
+            dict: API response JSON
+        """
+        await self.open()
+
+        access_token = await self.get_access_token()
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json'
+        }
+
+        payload_bytes = self.payload_bytes(body)
+        with (timer.stage('docai', payload_bytes=payload_bytes) if timer else nullcontext({})) as meta:
+            return await self._post(body, headers, payload_bytes, verbose, meta)
+
+    async def _post(self, body, headers, payload_bytes, verbose, meta):
+        """POST with 429 / timeout retries; meta gets the retry count and last HTTP status"""
+        if verbose:
+            print(f"  Sending request to Document AI...")
+
+        for attempt in range(self.max_retries):
+            meta['retries'] = attempt
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(DOCAI_REQUESTS)
+                await self.rate_limiter.acquire_async(DOCAI_BYTES, payload_bytes)
+
+            try:
+                response = await self.session.post(api_client.ENDPOINT_URL, headers=headers, json=body)
+            except httpx.TimeoutException:
+                if self.on_throttle:
+                    self.on_throttle()
+                if attempt < self.max_retries - 1:
+                    if verbose:
+                        print(f"  Timeout, retrying...")
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                raise Exception("Request timed out after retries")
+
+            meta['http_status'] = response.status_code
+            if response.status_code == 200:
+                if verbose:
+                    print(f"  [OK] API call successful")
+                return response.json()
+
+            if response.status_code == 401 and attempt < self.max_retries - 1:
+                # Token revoked or expired early - drop it and retry with a new one
+                self.tokens.invalidate(headers['Authorization'][len('Bearer '):])
+                headers['Authorization'] = f'Bearer {await self.get_access_token()}'
+                continue
+
+            if response.status_code == 429:
+                if self.on_throttle:
+                    self.on_throttle()
+                # Rate limit - retry with backoff
+                if attempt < self.max_retries - 1:
+                    wait_time = self.retry_delay * (2 ** attempt)
+                    if verbose:
+                        print(f"  Rate limit hit, retrying in {wait_time}s...")
+                    await asyncio.sleep(wait_time)
+                    continue
+                raise Exception(f"Rate limit exceeded after {self.max_retries} retries")
+
+            raise Exception(f"API error {response.status_code}: {response.text}")
+
+        raise Exception("Failed after all retries")
@@ -0,0 +1,229 @@
+"""
+Document AI batchProcess (long-running operation) client
+Submits groups of GCS documents, polls the operation and reads the output
+JSON shards back from Cloud Storage
+"""
+import os
+import time
+import uuid
+import requests
+from urllib.parse import urlparse, unquote, quote
+
+import api_client
+from token_provider import get_token_provider
+
+# Cloud Storage JSON API - GCS_API_URL points it at a local stand-in server
+GCS_API_URL = os.getenv("GCS_API_URL", "https://storage.googleapis.com").rstrip('/')
+
+# Where Document AI writes batch results (one sub-folder per batch)
+BATCH_OUTPUT_URI = os.getenv("DOCAI_BATCH_OUTPUT_URI", "gs://hospital-agreements/docai-batch-output/")
+
+def to_gcs_uri(path):
+    """Convert a GCS path from the CSV to a gs:// URI
+
+    Args:
+        path: gs://bucket/object or https://storage.cloud.google.com/bucket/object
+            (also storage.googleapis.com)
+
+    Returns:
+        str: gs:// URI or None if the path is not in Cloud Storage
+    """
+    if not path or not isinstance(path, str):
+        return None
+    if path.startswith('gs://'):
+        return path
+
+    parsed = urlparse(path)
+    if parsed.netloc not in ('storage.cloud.google.com', 'storage.googleapis.com'):
+        return None
+
+    object_path = unquote(parsed.path.lstrip('/'))
+    if '/' not in object_path:
+        return None
+    return f"gs://{object_path}"
+
+def split_gcs_uri(gcs_uri):
+    """Split gs://bucket/prefix into (bucket, prefix)"""
+    without_scheme = gcs_uri[len('gs://'):]
+    bucket, _, prefix = without_scheme.partition('/')
+    return bucket, prefix
+
+def object_generation(gcs_uri, credentials, timeout=30):
+    """Generation of a Cloud Storage object (changes whenever the object is overwritten)
+
+    Args:
+        gcs_uri: gs://bucket/object
+        credentials: Google credentials (access token cached by the shared TokenProvider)
+
+    Returns:
+        str: Generation or None if the object's metadata can't be read
+    """
+    bucket, name = split_gcs_uri(gcs_uri)
+    url = f"{GCS_API_URL}/storage/v1/b/{bucket}/o/{quote(name, safe='')}"
+    try:
+        response = requests.get(url, headers={'Authorization': f'Bearer {get_token_provider(credentials).get_token()}'},
+                                params={'fields': 'generation'}, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json().get('generation')
+
+class BatchLayoutParserClient:
+    """Document AI batchProcess client
+
+    Usage:
+        client = BatchLayoutParserClient(credentials)
+        operation_name = client.submit(gcs_uris)
+        operation = client.wait(operation_name)
+        for status in client.individual_statuses(operation):
+            response = client.read_output(status['outputGcsDestination'])
+    """
+
+    def __init__(self, credentials, output_uri=BATCH_OUTPUT_URI, timeout=60, poll_interval=15):
+        """
+        Args:
+            credentials: Google credentials (access token cached by the shared TokenProvider)
+            output_uri: gs:// folder for batch results
+            timeout: Per-request timeout in seconds
+            poll_interval: Seconds between operation polls
+        """
+        self.credentials = credentials
+        self.tokens = get_token_provider(credentials)
+        self.output_uri = output_uri if output_uri.endswith('/') else output_uri + '/'
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.session = requests.Session()
+
+    def _headers(self):
+        """Auth headers with a cached access token"""
+        return {
+            'Authorization': f'Bearer {self.tokens.get_token()}',
+            'Content-Type': 'application/json'
+        }
+
+    def _get(self, url, **kwargs):
+        """GET with auth, raising on HTTP errors"""
+        response = self.session.get(url, headers=self._headers(), timeout=self.timeout, **kwargs)
+        if response.status_code != 200:
+            raise Exception(f"API error {response.status_code}: {response.text[:500]}")
+        return response
+
+    def submit(self, gcs_uris):
+        """Submit a batchProcess request
+
+        Args:
+            gcs_uris: gs:// URIs of the PDFs to process
+
+        Returns:
+            str: Operation name (projects/.../operations/...)
+        """
+        body = {
+            'inputDocuments': {
+                'gcsDocuments': {
+                    'documents': [{'gcsUri': uri, 'mimeType': 'application/pdf'} for uri in gcs_uris]
+                }
+            },
+            'documentOutputConfig': {
+                'gcsOutputConfig': {
+                    'gcsUri': f"{self.output_uri}{uuid.uuid4().hex}/"
+                }
+            }
+        }
+
+        response = self.session.post(api_client.BATCH_ENDPOINT_URL, headers=self._headers(),
+                                     json=body, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"API error {response.status_code}: {response.text[:500]}")
+
+        return response.json()['name']
+
+    def get_operation(self, operation_name):
+        """Fetch the current state of an operation"""
+        return self._get(f"{api_client.DOCAI_BASE_URL}/v1/{operation_name}").json()
+
+    def wait(self, operation_name, max_wait=6 * 3600, verbose=False):
+        """Poll an operation until it is done
+
+        Returns:
+            dict: Finished operation
+
+        Raises:
+            Exception: If the operation failed as a whole or max_wait expired
+        """
+        deadline = time.time() + max_wait
+
+        while True:
+            operation = self.get_operation(operation_name)
+            if operation.get('done'):
+                if 'error' in operation:
+                    raise Exception(f"Batch operation failed: {operation['error'].get('message', operation['error'])}")
+                return operation
+
+            if time.time() > deadline:
+                raise Exception(f"Batch operation still running after {max_wait}s")
+
+            if verbose:
+                state = operation.get('metadata', {}).get('state', 'RUNNING')
+                print(f"  [INFO] {operation_name.rsplit('/', 1)[-1]}: {state}")
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def individual_statuses(operation):
+        """Per-document results of a finished operation
+
+        Returns:
+            list: [{inputGcsSource, status, outputGcsDestination}]
+        """
+        return operation.get('metadata', {}).get('individualProcessStatuses', [])
+
+    def list_objects(self, gcs_uri):
+        """List object names under a gs:// prefix"""
+        bucket, prefix = split_gcs_uri(gcs_uri)
+        url = f"{GCS_API_URL}/storage/v1/b/{bucket}/o"
+        names = []
+        page_token = None
+
+        while True:
+            params = {'prefix': prefix}
+            if page_token:
+                params['pageToken'] = page_token
+            listing = self._get(url, params=params).json()
+            names.extend(item['name'] for item in listing.get('items', []))
+            page_token = listing.get('nextPageToken')
+            if not page_token:
+                return bucket, names
+
+    def read_output(self, output_gcs_uri):
+        """Read and merge the output JSON shards of one document
+
+        Args:
+            output_gcs_uri: outputGcsDestination from individual_statuses
+
+        Returns:
+            dict: {"document": {...}} - same shape as the :process response
+        """
+        bucket, names = self.list_objects(output_gcs_uri.rstrip('/') + '/')
+        shards = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            url = f"{GCS_API_URL}/storage/v1/b/{bucket}/o/{quote(name, safe='')}"
+            shards.append(self._get(url, params={'alt': 'media'}).json())
+
+        if not shards:
+            raise Exception(f"No output shards under {output_gcs_uri}")
+
+        # Large documents are written as several shards - rejoin in order
+        shards.sort(key=lambda shard: int(shard.get('shardInfo', {}).get('shardIndex', 0)))
+        blocks = []
+        for shard in shards:
+            blocks.extend(shard.get('documentLayout', {}).get('blocks', []))
+
+        return {
+            "document": {
+                "documentLayout": {
+                    "blocks": blocks
+                }
+            }
+        }
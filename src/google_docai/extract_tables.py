@@ -5,27 +5,47 @@ Orchestrates: API call → filter → transform → final JSON
 import os
 import sys
 import json
-import requests
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from google.oauth2 import service_account
 import pandas as pd
 
-# Add current directory to path
+# Add current directory and src/ (shared modules) to path
 sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from api_client import call_layout_parser
 from filter_tables import filter_table_blocks, count_tables
+from page_screening import remap_page_spans
+from pdf_split import split_pdf, cleanup_shards, merge_responses
 from transform_to_json import transform_all_tables
+from pdf_downloader import get_downloader, DownloadError
 
 load_dotenv()
 
+class StaticTokenCredentials:
+    """Fixed bearer token for local stand-in servers (refresh is a no-op)"""
+
+    def __init__(self, token):
+        self.token = token
+
+    def refresh(self, request):
+        pass
+
 def create_creds():
-    """Create Google credentials from saved OAuth token"""
+    """Create Google credentials from saved OAuth token
+
+    If DOCAI_STATIC_TOKEN is set (local stand-in servers), a fixed token is
+    used instead and no Google account is needed.
+    """
     from google.oauth2.credentials import Credentials
     from pathlib import Path
 
+    static_token = os.getenv("DOCAI_STATIC_TOKEN")
+    if static_token:
+        return StaticTokenCredentials(static_token)
+
     # Load saved OAuth credentials
     creds_path = Path.home() / '.google_docai_credentials.json'
 
@@ -42,32 +62,31 @@ def create_creds():
 
     return credentials
 
-def download_pdf(url, verbose=True):
-    """Download PDF from URL
+def download_pdf(url, verbose=True, contract_id=None):
+    """Download PDF from URL (streamed and resumable, through the shared PDF cache)
 
     Args:
         url: PDF URL
         verbose: Print progress
+        contract_id: Optional contract id alias for the cache
 
     Returns:
-        str: Path to downloaded PDF or None
+        str: Path to the cached PDF or None. The file is shared by every
+            stage - do not delete or modify it.
     """
+    downloader = get_downloader()
     try:
         if verbose:
             print(f"Downloading PDF...")
-        temp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        temp.write(r.content)
-        temp.flush()
+        pdf_path = downloader.download(url, contract_id=contract_id, verbose=verbose)
         if verbose:
-            print(f"  [OK] Downloaded\n")
-        return temp.name
-    except Exception as e:
+            print(f"  [OK] Ready\n")
+        return pdf_path
+    except DownloadError as e:
         print(f"  [ERROR] Download error: {e}\n")
         return None
 
-def extract_tables_from_pdf(pdf_path_or_gcs_uri, credentials, verbose=True, save_intermediate=False, use_gcs=False, return_raw=False):
+def extract_tables_from_pdf(pdf_path_or_gcs_uri, credentials, verbose=True, save_intermediate=False, use_gcs=False, return_raw=False, page_map=None, shard_pages=None):
     """Extract tables from PDF using Document AI pipeline
 
     Args:
@@ -77,6 +96,9 @@ def extract_tables_from_pdf(pdf_path_or_gcs_uri, credentials, verbose=True, save
         save_intermediate: Save intermediate JSON files
         use_gcs: If True, treat input as GCS URI (much faster!)
         return_raw: If True, return tuple (tables, raw_api_response)
+        page_map: Original page numbers of a screened sub-PDF (see page_screening)
+        shard_pages: If set, split a local PDF into chunks of this many pages,
+            process them concurrently and merge the responses (see pdf_split)
 
     Returns:
         list: Array of extracted tables in final format
@@ -89,12 +111,18 @@ def extract_tables_from_pdf(pdf_path_or_gcs_uri, credentials, verbose=True, save
             print("STEP 1: Calling Document AI Layout Parser")
             print("="*80 + "\n")
 
-        api_response = call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose, use_gcs=use_gcs)
+        if shard_pages and not use_gcs:
+            api_response = call_layout_parser_sharded(pdf_path_or_gcs_uri, credentials, shard_pages, verbose)
+        else:
+            api_response = call_layout_parser(pdf_path_or_gcs_uri, credentials, verbose, use_gcs=use_gcs)
 
         if not api_response:
             print("[ERROR] API call failed")
             return []
 
+        if page_map:
+            remap_page_spans(api_response, page_map)
+
         if save_intermediate:
             with open('debug_api_response.json', 'w', encoding='utf-8') as f:
                 json.dump(api_response, f, indent=2, ensure_ascii=False)
@@ -148,6 +176,62 @@ def extract_tables_from_pdf(pdf_path_or_gcs_uri, credentials, verbose=True, save
         traceback.print_exc()
         return []
 
+def call_layout_parser_sharded(pdf_path, credentials, shard_pages=30, verbose=True):
+    """Call Document AI on page-range chunks of a PDF concurrently and merge the results
+
+    Args:
+        pdf_path: Local PDF path
+        credentials: Google credentials
+        shard_pages: Pages per chunk (<= 30)
+        verbose: Print progress
+
+    Returns:
+        dict: Merged API response or None if any chunk failed
+    """
+    shards = split_pdf(pdf_path, shard_pages)
+    try:
+        if len(shards) == 1:
+            return call_layout_parser(pdf_path, credentials, verbose)
+
+        if verbose:
+            print(f"  Processing {len(shards)} chunks of up to {shard_pages} pages concurrently\n")
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            responses = list(executor.map(
+                lambda shard: call_layout_parser(shard[0], credentials, False), shards
+            ))
+
+        if not all(responses):
+            return None
+
+        return merge_responses([(response, first_page) for response, (_, first_page) in zip(responses, shards)])
+    finally:
+        cleanup_shards(shards, pdf_path)
+
+def build_tables(api_response, page_map=None):
+    """Filter tableBlocks from an API response and transform them to final format
+
+    Args:
+        api_response: Full Document AI response dict
+        page_map: Original page numbers of a screened sub-PDF (pageSpans are
+            rewritten in place)
+
+    Returns:
+        list: Array of extracted tables in final format
+
+    Raises:
+        Exception: If no tables are detected in the document
+    """
+    if page_map:
+        remap_page_spans(api_response, page_map)
+
+    filtered_response = filter_table_blocks(api_response)
+
+    if count_tables(filtered_response) == 0:
+        raise Exception("No tables detected in document")
+
+    return transform_all_tables(filtered_response)
+
 def main():
     """Test extraction on first contract"""
     print("="*80)
@@ -175,7 +259,7 @@ def main():
     print(f"URL: {pdf_url}\n")
 
     # Download PDF
-    pdf_path = download_pdf(pdf_url)
+    pdf_path = download_pdf(pdf_url, contract_id=contract_id)
     if not pdf_path:
         return
 
@@ -208,9 +292,6 @@ def main():
 
     print(f"[OK] Saved to: {output_path}")
 
-    # Cleanup
-    Path(pdf_path).unlink(missing_ok=True)
-
     print(f"\n{'='*80}")
     print("SUMMARY")
     print(f"{'='*80}")
@@ -0,0 +1,80 @@
+"""
+Input fingerprints for incremental re-processing (--changed-only)
+Every Phase 1 result stores a fingerprint of what it was computed from: the
+PDF (SHA-256 of the downloaded file, or the gs:// URI and object generation
+when Document AI read it from Cloud Storage), the PDF URL, the page selection policy and the
+Document AI processor version. A refreshed CSV, a PDF replaced behind the
+same URL, a new screening / trimming version or a processor upgrade all
+change the fingerprint, and only those contracts are re-run.
+
+Phase 2 keeps the fingerprint its result was built from
+(llm_input_fingerprint) and re-runs contracts whose Phase 1 input changed.
+"""
+import hashlib
+
+import api_client
+from response_cache import endpoint_processor
+
+# Columns added to contracts (name, type)
+FINGERPRINT_COLUMNS = (
+    ('input_fingerprint', 'TEXT'),
+    ('input_pdf_sha256', 'TEXT'),      # NULL when Document AI read the PDF from GCS
+    ('llm_input_fingerprint', 'TEXT'), # input_fingerprint the Phase 2 result was built from
+)
+
+# Policy of GCS inputs: Document AI gets the whole document, no page selection
+GCS_POLICY = "gcs"
+
+def ensure_fingerprint_columns(conn):
+    """Add the fingerprint columns to an existing contracts table"""
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(contracts)").fetchall()]
+    for name, column_type in FINGERPRINT_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE contracts ADD COLUMN {name} {column_type}")
+    conn.commit()
+
+def processor_version(endpoint_url=None):
+    """'processor id/version' of the :process endpoint (api_client.ENDPOINT_URL)"""
+    return '/'.join(endpoint_processor(endpoint_url or api_client.ENDPOINT_URL))
+
+def gcs_document(gcs_uri, generation):
+    """Fingerprint document of a GCS input - the URI alone says nothing about the
+    object's content, its generation changes whenever it is overwritten
+
+    Args:
+        generation: batch_client.object_generation() (None when unknown - never matches)
+    """
+    return f"{gcs_uri}#{generation or ''}"
+
+def input_fingerprint(document, pdf_url, policy, processor=None):
+    """Fingerprint of a Phase 1 input
+
+    Args:
+        document: PDF SHA-256, or gcs_document() for GCS inputs
+        pdf_url: original_pdf_url
+        policy: Page selection policy (e.g. 'screen:30:v1') or GCS_POLICY
+        processor: processor_version() (default: the configured endpoint)
+
+    Returns:
+        str: Hex SHA-256
+    """
+    parts = (document or '', pdf_url or '', policy, processor or processor_version())
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def fingerprint_rows(conn):
+    """Contracts with the fingerprint of their last successful Phase 1 run
+
+    A failed run keeps the fingerprint of the success before it on the row,
+    so only successful rows report one - everything else (new, pending,
+    failed) comes back with None and always counts as changed.
+
+    Returns:
+        list: [(id, original_pdf_url, gcs_pdf_path, input_fingerprint, input_pdf_sha256)]
+    """
+    return conn.execute("""
+        SELECT id, original_pdf_url, gcs_pdf_path,
+               CASE WHEN extraction_status = 'success' THEN input_fingerprint END,
+               input_pdf_sha256
+        FROM contracts
+        ORDER BY id
+    """).fetchall()
@@ -0,0 +1,182 @@
+"""
+Local table-page pre-screening before Document AI
+Scores every page of a PDF from its text layer (digit / € density, rows of
+numbers) and its content stream (ruling-line operators), builds a sub-PDF of
+the candidate pages only, and maps sub-PDF page numbers back to the original
+"""
+import re
+import tempfile
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+# Layout Parser online processing limit
+MAX_PAGES = 30
+
+# Thresholds for a page to count as a table candidate
+MIN_RULING_OPS = 40         # Line / rectangle drawing operators (table borders)
+MIN_NUMERIC_ROWS = 3        # Text lines with 2+ numeric tokens
+MIN_DIGIT_RATIO = 0.12      # Digits / non-space characters
+MIN_CURRENCY_MARKS = 2      # € / EUR occurrences
+MIN_TEXT_CHARS = 20         # Below this the page has no usable text layer (scanned)
+
+RULING_OP_PATTERN = re.compile(rb'\s(?:re|l)\s')
+NUMBER_PATTERN = re.compile(r'\d[\d.,]*')
+CURRENCY_PATTERN = re.compile(r'€|\bEUR\b')
+
+def score_page(page):
+    """Score one PDF page for table likelihood
+
+    Args:
+        page: PyPDF2 PageObject
+
+    Returns:
+        dict: {ruling_ops, numeric_rows, digit_ratio, currency_marks, has_text, score}
+    """
+    try:
+        text = page.extract_text() or ''
+    except Exception:
+        text = ''
+
+    try:
+        contents = page.get_contents()
+        data = contents.get_data() if contents is not None else b''
+    except Exception:
+        data = b''
+
+    chars = [c for c in text if not c.isspace()]
+    digits = sum(c.isdigit() for c in chars)
+    digit_ratio = digits / len(chars) if chars else 0.0
+    numeric_rows = sum(1 for line in text.splitlines() if len(NUMBER_PATTERN.findall(line)) >= 2)
+    currency_marks = len(CURRENCY_PATTERN.findall(text))
+    ruling_ops = len(RULING_OP_PATTERN.findall(data))
+    has_text = len(chars) >= MIN_TEXT_CHARS
+
+    score = (
+        min(ruling_ops / MIN_RULING_OPS, 2.0)
+        + min(numeric_rows / MIN_NUMERIC_ROWS, 2.0)
+        + min(digit_ratio / MIN_DIGIT_RATIO, 2.0)
+        + min(currency_marks / MIN_CURRENCY_MARKS, 2.0)
+    )
+
+    return {
+        'ruling_ops': ruling_ops,
+        'numeric_rows': numeric_rows,
+        'digit_ratio': round(digit_ratio, 3),
+        'currency_marks': currency_marks,
+        'has_text': has_text,
+        'score': round(score, 3)
+    }
+
+def is_candidate(page_score):
+    """True if a scored page may contain a table
+
+    Pages without a text layer (scans) are always candidates - we can't
+    judge them locally, Document AI OCRs them.
+    """
+    if not page_score['has_text']:
+        return True
+    return (
+        page_score['ruling_ops'] >= MIN_RULING_OPS
+        or page_score['numeric_rows'] >= MIN_NUMERIC_ROWS
+        or page_score['digit_ratio'] >= MIN_DIGIT_RATIO
+        or page_score['currency_marks'] >= MIN_CURRENCY_MARKS
+    )
+
+def screen_pages(pdf_path, max_pages=MAX_PAGES):
+    """Select the pages of a PDF worth sending to Document AI
+
+    Args:
+        pdf_path: Local PDF path
+        max_pages: Max pages to select (highest scores win, scans first,
+            later pages break ties)
+
+    Returns:
+        tuple: (selected 1-based page numbers in document order, total pages)
+    """
+    reader = PdfReader(pdf_path)
+    num_pages = len(reader.pages)
+
+    scores = [score_page(page) for page in reader.pages]
+    candidates = [i + 1 for i, s in enumerate(scores) if is_candidate(s)]
+
+    if len(candidates) > max_pages:
+        # Scanned pages rank above everything (unknown), then by score;
+        # ties go to later pages, where contract tables usually sit (same
+        # as trim_pdf's last-30 fallback)
+        ranked = sorted(
+            candidates,
+            key=lambda n: (scores[n - 1]['has_text'], -scores[n - 1]['score'], -n)
+        )
+        candidates = sorted(ranked[:max_pages])
+
+    return candidates, num_pages
+
+def write_sub_pdf(pdf_path, pages):
+    """Write a PDF containing only the given 1-based pages
+
+    Returns:
+        str: Path to a temp PDF (caller deletes it)
+    """
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for page_num in pages:
+        writer.add_page(reader.pages[page_num - 1])
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='_screened.pdf') as f:
+        writer.write(f)
+        return f.name
+
+def remap_page_spans(obj, page_map):
+    """Rewrite pageSpan page numbers from sub-PDF pages to original pages (in place)
+
+    Args:
+        obj: Document AI response (or any nested part of it)
+        page_map: List where page_map[i] is the original page of sub-PDF page i + 1
+    """
+    if isinstance(obj, dict):
+        span = obj.get('pageSpan')
+        if isinstance(span, dict):
+            for key in ('pageStart', 'pageEnd'):
+                page = span.get(key)
+                if isinstance(page, int) and 1 <= page <= len(page_map):
+                    span[key] = page_map[page - 1]
+        for value in obj.values():
+            remap_page_spans(value, page_map)
+    elif isinstance(obj, list):
+        for item in obj:
+            remap_page_spans(item, page_map)
+    return obj
+
+def prepare_screened_pdf(pdf_path, max_pages=MAX_PAGES, verbose=False):
+    """Build the sub-PDF of candidate table pages for one document
+
+    Args:
+        pdf_path: Local PDF path (not modified)
+        max_pages: Max pages to send
+        verbose: Print the selection
+
+    Returns:
+        tuple: (path_to_send, page_map). page_map is None when the original
+            file is sent unchanged (every page selected); otherwise path_to_send
+            is a temp file the caller deletes.
+    """
+    if not HAS_PYPDF2:
+        return pdf_path, None
+
+    pages, num_pages = screen_pages(pdf_path, max_pages)
+
+    if not pages:
+        # Nothing looks like a table - keep the last max_pages (old trim behaviour)
+        pages = list(range(max(1, num_pages - max_pages + 1), num_pages + 1))
+
+    if verbose:
+        print(f"    [INFO] Screening kept {len(pages)}/{num_pages} pages: {pages}")
+
+    if len(pages) == num_pages:
+        return pdf_path, None
+
+    return write_sub_pdf(pdf_path, pages), pages
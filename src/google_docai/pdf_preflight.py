@@ -0,0 +1,165 @@
+"""
+PDF preflight checks and the pdf_metadata index
+Every PDF is inspected once before any Document AI call: %PDF magic bytes,
+byte size, page count, encryption and whether it has a text layer. Results
+are kept in the pdf_metadata table (one row per contract) and drive Phase 1
+routing - a GCS input known to be over the page limit is downloaded and
+page-selected up front instead of failing with PAGE_LIMIT_EXCEEDED first,
+and HTML error pages or password-protected files fail here instead of being
+base64'd and sent to Document AI.
+"""
+import re
+import time
+from pathlib import Path
+
+from page_screening import MIN_TEXT_CHARS
+from pdf_cache import sha256_file
+
+try:
+    from PyPDF2 import PdfReader
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+# Readers accept the %PDF- header anywhere in the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+MAGIC_WINDOW = 1024
+
+# Pages checked for a text layer (scans have none on any page)
+TEXT_SAMPLE_PAGES = 3
+
+PASSWORD_ERROR = "PDF is password-protected"
+
+HTML_PATTERN = re.compile(rb'<\s*(?:!doctype|html|head|body)', re.IGNORECASE)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS pdf_metadata (
+        contract_id TEXT PRIMARY KEY,
+        pdf_url TEXT,
+        pdf_sha256 TEXT,
+        byte_size INTEGER,
+        is_pdf INTEGER,
+        page_count INTEGER,
+        encrypted INTEGER,
+        has_text_layer INTEGER,
+        error TEXT,
+        checked_at REAL
+    )
+"""
+
+METADATA_COLUMNS = ('contract_id', 'pdf_url', 'pdf_sha256', 'byte_size', 'is_pdf', 'page_count',
+                    'encrypted', 'has_text_layer', 'error', 'checked_at')
+
+UPSERT_METADATA_SQL = f"""
+    INSERT INTO pdf_metadata ({', '.join(METADATA_COLUMNS)})
+    VALUES ({', '.join('?' * len(METADATA_COLUMNS))})
+    ON CONFLICT(contract_id) DO UPDATE SET
+        {', '.join(f'{column} = excluded.{column}' for column in METADATA_COLUMNS[1:])}
+"""
+
+def setup_pdf_metadata(conn):
+    """Create the pdf_metadata table"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.commit()
+
+def describe_non_pdf(head):
+    """Short description of a file that doesn't start like a PDF"""
+    if not head:
+        return "empty file"
+    if HTML_PATTERN.search(head):
+        return "HTML page"
+    return f"starts with {head[:16]!r}"
+
+def page_has_text(page):
+    """True if a PyPDF2 page has a usable text layer"""
+    try:
+        text = page.extract_text() or ''
+    except Exception:
+        return False
+    return sum(not c.isspace() for c in text) >= MIN_TEXT_CHARS
+
+def inspect_pdf(pdf_path):
+    """Preflight one PDF (CPU-bound - run it in a worker process)
+
+    Args:
+        pdf_path: Local PDF path (not modified)
+
+    Returns:
+        dict: pdf_sha256, byte_size, is_pdf, page_count, encrypted,
+            has_text_layer (None when unknown) and error - the reason the
+            file must not be sent to Document AI, or None
+    """
+    path = Path(pdf_path)
+    metadata = {
+        'pdf_sha256': sha256_file(path),
+        'byte_size': path.stat().st_size,
+        'is_pdf': False,
+        'page_count': None,
+        'encrypted': None,
+        'has_text_layer': None,
+        'error': None,
+    }
+
+    with open(path, 'rb') as f:
+        head = f.read(MAGIC_WINDOW)
+    if PDF_MAGIC not in head:
+        metadata['error'] = f"Not a PDF ({describe_non_pdf(head)})"
+        return metadata
+    metadata['is_pdf'] = True
+
+    if not HAS_PYPDF2:
+        return metadata
+
+    try:
+        reader = PdfReader(str(path))
+        metadata['encrypted'] = bool(reader.is_encrypted)
+        if reader.is_encrypted and not reader.decrypt(''):
+            metadata['error'] = PASSWORD_ERROR
+            return metadata
+        metadata['page_count'] = len(reader.pages)
+        metadata['has_text_layer'] = any(
+            page_has_text(reader.pages[i]) for i in range(min(TEXT_SAMPLE_PAGES, metadata['page_count']))
+        )
+    except Exception:
+        # Damaged or unusual structure - PyPDF2 gives up, Document AI may not
+        pass
+
+    return metadata
+
+def metadata_params(contract_id, pdf_url, metadata):
+    """Parameters for UPSERT_METADATA_SQL"""
+    return (
+        contract_id, pdf_url, metadata['pdf_sha256'], metadata['byte_size'], metadata['is_pdf'],
+        metadata['page_count'], metadata['encrypted'], metadata['has_text_layer'], metadata['error'], time.time()
+    )
+
+def known_page_counts(conn):
+    """Page counts of contracts whose PDF URL hasn't changed since their preflight
+
+    Returns:
+        dict: {contract_id: page_count}
+    """
+    rows = conn.execute("""
+        SELECT m.contract_id, m.page_count
+        FROM pdf_metadata m JOIN contracts c ON c.id = m.contract_id
+        WHERE m.page_count IS NOT NULL AND m.pdf_url IS c.original_pdf_url
+    """).fetchall()
+    return dict(rows)
+
+def metadata_summary(conn, max_pages):
+    """Counts over pdf_metadata for run summaries
+
+    Returns:
+        dict: checked, not_pdf, password_protected, no_text_layer, over_limit (page_count > max_pages)
+    """
+    row = conn.execute("""
+        SELECT COUNT(*), SUM(NOT is_pdf), SUM(error = ?), SUM(has_text_layer = 0), SUM(page_count > ?)
+        FROM pdf_metadata
+    """, (PASSWORD_ERROR, max_pages)).fetchone()
+    return {
+        'checked': row[0],
+        'not_pdf': row[1] or 0,
+        'password_protected': row[2] or 0,
+        'no_text_layer': row[3] or 0,
+        'over_limit': row[4] or 0,
+    }
@@ -0,0 +1,119 @@
+"""
+Page-range sharding for PDFs over the Layout Parser page limit
+Splits a PDF into chunks, and merges the per-chunk Document AI responses back
+into one response with pageSpan and blockId values offset to the full document
+"""
+import tempfile
+from pathlib import Path
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+# Layout Parser online processing limit
+MAX_SHARD_PAGES = 30
+
+def split_pdf(pdf_path, shard_pages=MAX_SHARD_PAGES):
+    """Split a PDF into chunks of at most shard_pages pages
+
+    Args:
+        pdf_path: Local PDF path (not modified)
+        shard_pages: Pages per chunk (<= 30)
+
+    Returns:
+        list: [(chunk_path, first_page)] with 1-based first_page. A single
+            chunk is the original file itself; otherwise chunks are temp
+            files the caller deletes (see cleanup_shards).
+    """
+    if not HAS_PYPDF2:
+        raise Exception("PyPDF2 is required to split PDFs")
+
+    shard_pages = max(1, min(shard_pages, MAX_SHARD_PAGES))
+    reader = PdfReader(pdf_path)
+    num_pages = len(reader.pages)
+
+    if num_pages <= shard_pages:
+        return [(str(pdf_path), 1)]
+
+    shards = []
+    for start in range(0, num_pages, shard_pages):
+        writer = PdfWriter()
+        for page_num in range(start, min(start + shard_pages, num_pages)):
+            writer.add_page(reader.pages[page_num])
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f'_p{start + 1}.pdf') as f:
+            writer.write(f)
+            shards.append((f.name, start + 1))
+
+    return shards
+
+def cleanup_shards(shards, pdf_path):
+    """Delete the temp chunk files created by split_pdf"""
+    for chunk_path, _ in shards:
+        if chunk_path != str(pdf_path):
+            Path(chunk_path).unlink(missing_ok=True)
+
+def _get_blocks(api_response):
+    """Top-level blocks of a response (Layout Parser or OCR format)"""
+    document = api_response.get('document', api_response)
+    return document.get('documentLayout', {}).get('blocks', [])
+
+def _offset_blocks(obj, page_offset, id_offset):
+    """Shift pageSpan and numeric blockId values in place
+
+    Returns:
+        int: Highest (shifted) blockId seen
+    """
+    max_id = 0
+
+    if isinstance(obj, dict):
+        span = obj.get('pageSpan')
+        if isinstance(span, dict):
+            for key in ('pageStart', 'pageEnd'):
+                if isinstance(span.get(key), int):
+                    span[key] += page_offset
+
+        block_id = obj.get('blockId')
+        if isinstance(block_id, str) and block_id.isdigit():
+            shifted = int(block_id) + id_offset
+            obj['blockId'] = str(shifted)
+            max_id = shifted
+
+        for key, value in obj.items():
+            if key != 'pageSpan':
+                max_id = max(max_id, _offset_blocks(value, page_offset, id_offset))
+
+    elif isinstance(obj, list):
+        for item in obj:
+            max_id = max(max_id, _offset_blocks(item, page_offset, id_offset))
+
+    return max_id
+
+def merge_responses(shard_responses):
+    """Merge per-chunk responses into one full-document response
+
+    Args:
+        shard_responses: [(api_response, first_page)] in document order
+
+    Returns:
+        dict: {"document": {"documentLayout": {"blocks": [...]}}} - the
+            Layout Parser format filter_table_blocks already reads
+    """
+    merged_blocks = []
+    id_offset = 0
+
+    for api_response, first_page in shard_responses:
+        blocks = _get_blocks(api_response)
+        max_id = _offset_blocks(blocks, first_page - 1, id_offset)
+        id_offset = max(id_offset, max_id)
+        merged_blocks.extend(blocks)
+
+    return {
+        "document": {
+            "documentLayout": {
+                "blocks": merged_blocks
+            }
+        }
+    }
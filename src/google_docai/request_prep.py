@@ -0,0 +1,122 @@
+"""
+CPU-bound Document AI request preparation for the staged Phase 1 pipeline
+Page selection (screening, trimming or splitting) and base64 encoding run
+here, in worker processes, so PyPDF2 and the encoder never hold the event
+loop or the download threads. Arguments and results are plain picklable
+values; temp files (sub-PDFs, chunks) are deleted before returning.
+"""
+import time
+import tempfile
+from pathlib import Path
+
+from api_client import build_request_body
+from page_screening import prepare_screened_pdf
+from pdf_split import split_pdf, cleanup_shards
+from pdf_cache import sha256_file
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+# Layout Parser online processing limit
+MAX_PAGES = 30
+
+# Bump whenever screening, trimming or splitting changes what is sent - part of
+# the input fingerprint, so --changed-only re-runs every downloaded PDF
+PAGE_SELECTION_VERSION = 1
+
+def trim_pdf(pdf_path, max_pages=MAX_PAGES, verbose=False):
+    """Remove pages from start to keep exactly max_pages
+
+    Returns:
+        str: pdf_path unchanged, or a temp file the caller deletes
+    """
+    if not HAS_PYPDF2:
+        return pdf_path
+
+    try:
+        reader = PdfReader(pdf_path)
+        num_pages = len(reader.pages)
+
+        if num_pages <= max_pages:
+            return pdf_path
+
+        # Calculate how many pages to remove from start
+        pages_to_remove = num_pages - max_pages
+
+        if verbose:
+            print(f"    [INFO] Trimming {num_pages} pages → {max_pages} (removing first {pages_to_remove})")
+
+        writer = PdfWriter()
+        for page_num in range(pages_to_remove, num_pages):
+            writer.add_page(reader.pages[page_num])
+
+        # Write to a private temp file - pdf_path lives in the shared PDF cache
+        with tempfile.NamedTemporaryFile(delete=False, suffix='_trimmed.pdf') as f:
+            writer.write(f)
+            return f.name
+
+    except Exception:
+        return pdf_path
+
+def select_pages(pdf_path, page_selection='screen', max_pages=MAX_PAGES):
+    """Pick the pages to send to Document AI
+
+    Args:
+        page_selection: 'screen' (table pages), 'trim' (last max_pages) or
+            'split' (every page, chunked later)
+
+    Returns:
+        tuple: (path_to_send, page_map) - page_map maps sub-PDF pages back
+            to original pages, None if pages keep their numbering
+    """
+    if page_selection == 'split':
+        # Whole document goes through, split into chunks at encode time
+        return pdf_path, None
+    if page_selection == 'trim':
+        return trim_pdf(pdf_path, max_pages), None
+
+    try:
+        return prepare_screened_pdf(pdf_path, max_pages)
+    except Exception:
+        # Unreadable for PyPDF2 - let Document AI decide
+        return trim_pdf(pdf_path, max_pages), None
+
+def prepare_request(pdf_path, page_selection='screen', max_pages=MAX_PAGES, shard_pages=None, pdf_sha256=None):
+    """Select pages, split into chunks if requested and build the request bodies
+
+    Args:
+        pdf_path: Local PDF (not modified - it lives in the shared PDF cache)
+        page_selection: See select_pages
+        max_pages: Max pages per request
+        shard_pages: With page_selection 'split', pages per chunk
+        pdf_sha256: SHA-256 of pdf_path if already known (preflight), else hashed here
+
+    Returns:
+        dict: bodies ([(request body, first page)], one per chunk), page_map,
+            pdf_sha256, pdf_bytes, payload_bytes, trim_seconds, encode_seconds
+    """
+    started = time.perf_counter()
+    path, page_map = select_pages(pdf_path, page_selection, max_pages)
+    shards = split_pdf(path, shard_pages) if shard_pages else [(str(path), 1)]
+    trim_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        bodies = [(build_request_body(chunk_path), first_page) for chunk_path, first_page in shards]
+    finally:
+        cleanup_shards(shards, path)
+        if str(path) != str(pdf_path):
+            Path(path).unlink(missing_ok=True)
+
+    return {
+        'bodies': bodies,
+        'page_map': page_map,
+        'pdf_sha256': pdf_sha256 or sha256_file(pdf_path),
+        'pdf_bytes': Path(pdf_path).stat().st_size,
+        'payload_bytes': sum(len(body['rawDocument']['content']) for body, _ in bodies),
+        'trim_seconds': trim_seconds,
+        'encode_seconds': time.perf_counter() - started,
+    }
@@ -0,0 +1,177 @@
+"""
+Document AI response cache
+Successful :process responses are kept in the response pack archive under a
+key derived from what was actually sent: the SHA-256 of the document bytes,
+the processor id and version taken from ENDPOINT_URL and the page range of
+the request. Re-runs (--no-resume, backfills, identical documents) are
+answered from the packs in milliseconds instead of paying for another call.
+
+Phase 1 caches the final response of a contract (chunks merged, pages mapped
+back) under response_key() and links the entry to the raw_json blob it has
+just packed, so the cache costs an index record rather than a second copy.
+
+GCS inputs are never cached: a gs:// URI says nothing about the object's
+content, and a PDF re-uploaded under the same name must be processed again.
+
+Set DOCAI_RESPONSE_CACHE=0 to always call the API. Pin DOCAI_PROCESSOR_VERSION
+so a new default processor version can't be hidden behind cached responses.
+"""
+import os
+import re
+import sys
+import hashlib
+import threading
+from pathlib import Path
+
+# Shared modules (json_codec, response_pack) live one level up in src/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json_codec
+from response_pack import get_pack_writer, get_pack_reader
+
+import api_client
+
+RESPONSE_CACHE_ENABLED = os.getenv("DOCAI_RESPONSE_CACHE", "1") != "0"
+
+# Pack index keys of cached responses (contract ids never start with this)
+KEY_PREFIX = "docai-response:"
+
+def endpoint_processor(endpoint_url):
+    """(processor id, processor version) of a :process endpoint ('default' if not pinned)"""
+    processor = re.search(r'/processors/([^/:]+)', endpoint_url)
+    version = re.search(r'/processorVersions/([^/:]+)', endpoint_url)
+    return (processor.group(1) if processor else endpoint_url,
+            version.group(1) if version else 'default')
+
+def page_range(first_page=1, page_map=None):
+    """Page range of a request for the cache key
+
+    Args:
+        first_page: First original page of the chunk (split requests)
+        page_map: Original page numbers of a screened sub-PDF
+
+    Returns:
+        str: e.g. '3,4,9' (screened pages) or '31-' (chunk starting at page 31)
+    """
+    if page_map:
+        return ','.join(str(page) for page in page_map)
+    return f"{first_page}-"
+
+def document_sha256(body):
+    """SHA-256 of the inline document a request body sends (None for GCS inputs)"""
+    if 'rawDocument' not in body:
+        return None
+    return hashlib.sha256(body['rawDocument']['content'].encode('ascii')).hexdigest()
+
+class ResponseCache:
+    """Document AI responses keyed by request content, processor and page range
+
+    Usage:
+        cache = get_response_cache()
+        key = cache.key(body, page_range(first_page, page_map))
+        response = cache.get(key)
+        if response is None:
+            response = ...  # call the API
+            cache.put(key, response)
+
+    Phase 1 (one or more request bodies per contract):
+        key = cache.response_key([cache.key(body, pages) for body, pages in requests])
+        response = cache.get(key)                   # final, page-mapped response
+        ...
+        cache.link(key, raw_json_pointer)           # after packing raw_json
+
+    A None key (GCS input, cache disabled) makes get / put / link no-ops.
+    get / put decode and compress whole responses - call them off the event loop.
+    """
+
+    def __init__(self, endpoint_url=None, enabled=RESPONSE_CACHE_ENABLED):
+        """
+        Args:
+            endpoint_url: :process endpoint (default: api_client.ENDPOINT_URL)
+            enabled: False turns get / put into no-ops
+        """
+        self.processor_id, self.processor_version = endpoint_processor(endpoint_url or api_client.ENDPOINT_URL)
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def key(self, body, pages=None):
+        """Cache key of a request body
+
+        Args:
+            body: :process request body (api_client.build_request_body)
+            pages: page_range() of the request (None = whole document)
+
+        Returns:
+            str: Hex key, or None if the request can't be cached (disabled, GCS input)
+        """
+        document = document_sha256(body)
+        if not self.enabled or document is None:
+            return None
+        parts = (self.processor_id, self.processor_version, pages or page_range(), document)
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def response_key(self, request_keys):
+        """Key of the final response of a contract built from several requests (chunks)
+
+        Returns:
+            str: Hex key, or None if any request can't be cached
+        """
+        if not request_keys or None in request_keys:
+            return None
+        return hashlib.sha256('\0'.join(('response',) + tuple(request_keys)).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached response for a key, or None"""
+        if key is None:
+            return None
+        view = get_pack_reader().get(KEY_PREFIX + key)
+        with self.lock:
+            if view is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if view is None else json_codec.loads(view)
+
+    def put(self, key, response):
+        """Store a successful response"""
+        if key is None:
+            return
+        get_pack_writer().append(KEY_PREFIX + key, json_codec.dumps(response))
+        with self.lock:
+            self.stores += 1
+
+    def link(self, key, raw_json):
+        """Cache the response a contract just stored as raw_json
+
+        Args:
+            key: Cache key
+            raw_json: Stored column value - a pack pointer is linked (no bytes
+                written), an inline blob (--raw-json-store db) is appended
+        """
+        if key is None:
+            return
+        if json_codec.is_pack_pointer(raw_json):
+            get_pack_writer().link(KEY_PREFIX + key, raw_json)
+        else:
+            get_pack_writer().append(KEY_PREFIX + key, raw_json)
+        with self.lock:
+            self.stores += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores}
+
+_shared_lock = threading.Lock()
+_shared_cache = None
+
+def get_response_cache():
+    """Return the process-wide ResponseCache"""
+    global _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+
+    return _shared_cache
@@ -0,0 +1,53 @@
+"""
+Materialized tableBlocks for the table_blocks_json column
+Phase 1 filters the tableBlocks out of each Document AI response once, at
+ingest, so Phase 2, exports and analytics read a compact JSON instead of
+re-parsing the full response. Bump TABLE_BLOCKS_VERSION whenever the
+filtering changes - rows with an older version are recomputed by
+database_scripts/backfill_table_blocks.py.
+"""
+import json
+
+from filter_tables import filter_table_blocks
+
+TABLE_BLOCKS_VERSION = 1
+
+# Columns added to contracts (name, type)
+TABLE_BLOCKS_COLUMNS = (
+    ('table_blocks_json', 'BLOB'),
+    ('table_blocks_version', 'INTEGER'),
+    ('table_block_count', 'INTEGER'),
+    ('table_cell_count', 'INTEGER'),
+)
+
+def ensure_table_blocks_columns(conn):
+    """Add the table_blocks columns to an existing contracts table"""
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(contracts)").fetchall()]
+    for name, column_type in TABLE_BLOCKS_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE contracts ADD COLUMN {name} {column_type}")
+    conn.commit()
+
+def count_cells(filtered_response):
+    """Number of cells across all header and body rows"""
+    cells = 0
+    for block in filtered_response.get('documentLayout', {}).get('blocks', []):
+        table = block.get('tableBlock', {})
+        for row in table.get('headerRows', []) + table.get('bodyRows', []):
+            cells += len(row.get('cells', []))
+    return cells
+
+def materialize_table_blocks(api_response):
+    """Filter an API response down to its tableBlocks
+
+    Args:
+        api_response: Full Document AI response dict
+
+    Returns:
+        tuple: (table_blocks_json, num_blocks, num_cells) where
+            table_blocks_json is the compact filter_table_blocks() output
+            (the input format the extraction prompt expects)
+    """
+    filtered = filter_table_blocks(api_response)
+    num_blocks = len(filtered['documentLayout']['blocks'])
+    return json.dumps(filtered, ensure_ascii=False), num_blocks, count_cells(filtered)
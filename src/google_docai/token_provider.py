@@ -0,0 +1,191 @@
+"""
+Cached OAuth access tokens for the Document AI clients
+The access token is reused until it is close to expiry instead of calling
+credentials.refresh() before every request. A refresh runs under a lock
+(one token request at a time, however many workers need it) and the result
+is shared with other processes through a small token cache file, so a
+second pipeline process picks the token up without its own round trip.
+"""
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# fcntl serializes refreshes across processes (not available on Windows - per process there)
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Shared token cache file (next to the saved OAuth credentials)
+TOKEN_CACHE_PATH = Path(os.getenv("DOCAI_TOKEN_CACHE", Path.home() / ".google_docai_token_cache.json"))
+
+# Refresh this long before the token expires (covers slow requests and clock skew)
+REFRESH_MARGIN_SECONDS = 300
+
+def _request():
+    from google.auth.transport.requests import Request
+    return Request()
+
+class TokenProvider:
+    """Access token cache shared by every worker (threads, coroutines, processes)
+
+    Usage:
+        tokens = get_token_provider(credentials)
+        token = tokens.get_token()               # blocking callers
+        token = await tokens.get_token_async()   # event loop callers
+        tokens.invalidate(token)                 # after a 401
+    """
+
+    def __init__(self, credentials, cache_path=TOKEN_CACHE_PATH, refresh_margin=REFRESH_MARGIN_SECONDS):
+        """
+        Args:
+            credentials: Google credentials (anything with refresh(), token and expiry)
+            cache_path: Token cache file shared between processes (None = per process only)
+            refresh_margin: Seconds before expiry a token stops being handed out
+        """
+        self.credentials = credentials
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.lock = threading.Lock()
+        self.token = None
+        self.expiry = None  # Naive UTC like google.auth; None = never expires
+        self.refreshes = 0
+        self.shared_hits = 0
+
+    @property
+    def cache_key(self):
+        """Identifies the account in the shared cache file"""
+        identity = getattr(self.credentials, 'refresh_token', None) or getattr(self.credentials, 'client_id', None)
+        return hashlib.sha256(str(identity).encode('utf-8')).hexdigest()[:16]
+
+    def _valid(self, token, expiry):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return bool(token) and (expiry is None or expiry - self.refresh_margin > now)
+
+    def current(self):
+        """Cached token if it is still fresh, else None (never blocks)"""
+        token, expiry = self.token, self.expiry
+        return token if self._valid(token, expiry) else None
+
+    def get_token(self):
+        """Return a fresh access token, refreshing it if needed (thread-safe)"""
+        token = self.current()
+        if token:
+            return token
+
+        with self.lock:
+            # Another thread may have refreshed while we waited
+            token = self.current()
+            if token:
+                return token
+
+            # Static credentials (local stand-ins) never expire - nothing to refresh or share
+            if not hasattr(self.credentials, 'expiry'):
+                self.credentials.refresh(_request())
+                self.token, self.expiry = self.credentials.token, None
+                return self.token
+
+            if self.cache_path is None:
+                self._refresh()
+                return self.token
+
+            with self._file_lock():
+                if self._load_shared():
+                    self.shared_hits += 1
+                else:
+                    self._refresh()
+                    self._save_shared()
+            return self.token
+
+    async def get_token_async(self):
+        """get_token() for the event loop: cached tokens return immediately,
+        refreshes run off the loop (concurrent callers share one refresh)"""
+        token = self.current()
+        if token:
+            return token
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_token)
+
+    def invalidate(self, token):
+        """Drop a token the API rejected (401) so the next call refreshes"""
+        with self.lock:
+            if self.token == token:
+                self.token, self.expiry = None, None
+            if self.cache_path is None:
+                return
+            # Same lock as the refresh, so a token another process just saved isn't removed
+            with self._file_lock():
+                try:
+                    if json.loads(self.cache_path.read_text()).get('token') == token:
+                        self.cache_path.unlink()
+                except (OSError, ValueError):
+                    pass
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the token cache file across processes (caller holds self.lock)"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path.with_suffix('.lock'), 'a+b') as lock_file:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """One round trip to the token endpoint (caller holds the lock)"""
+        self.credentials.refresh(_request())
+        self.token, self.expiry = self.credentials.token, self.credentials.expiry
+        self.refreshes += 1
+
+    def _load_shared(self):
+        """Adopt a fresh token another process left in the cache file"""
+        try:
+            cached = json.loads(self.cache_path.read_text())
+            if cached.get('key') != self.cache_key:
+                return False
+            token, expiry = cached['token'], datetime.fromisoformat(cached['expiry'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        if not self._valid(token, expiry):
+            return False
+        self.token, self.expiry = token, expiry
+        # Keep the credentials object consistent for code that reads it directly
+        self.credentials.token, self.credentials.expiry = token, expiry
+        return True
+
+    def _save_shared(self):
+        """Write the token atomically, readable by the owner only"""
+        if self.expiry is None:
+            return
+        # Created 0600 - the bearer token is never readable by anyone else, not even briefly
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'key': self.cache_key, 'token': self.token, 'expiry': self.expiry.isoformat()}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def stats(self):
+        return {'refreshes': self.refreshes, 'shared_hits': self.shared_hits}
+
+_shared_lock = threading.Lock()
+_providers = {}
+
+def get_token_provider(credentials):
+    """Return the process-wide TokenProvider for a credentials object"""
+    with _shared_lock:
+        provider = _providers.get(id(credentials))
+        if provider is None or provider.credentials is not credentials:
+            provider = TokenProvider(credentials)
+            _providers[id(credentials)] = provider
+
+    return provider
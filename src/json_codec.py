@@ -0,0 +1,120 @@
+"""
+Compressed storage codec for the large JSON columns
+raw_json, extracted_tables, llm_extracted_tables, aistudio_json and
+table_blocks_json are stored as BLOBs: a one-byte format tag followed by the compressed UTF-8
+JSON. Legacy TEXT values (not migrated yet) decode unchanged, so readers
+work on old and new databases alike.
+
+Every script reads and writes these columns through dumps() / loads()
+(or encode() / decode() for text that is already JSON). raw_json may also
+hold a pointer into the response pack archive (see response_pack.py),
+which decode() resolves transparently.
+"""
+import os
+import gzip
+import json
+import threading
+
+# zstd is optional (pip install zstandard) - gzip is the fallback
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Columns that go through the codec
+JSON_COLUMNS = ('raw_json', 'extracted_tables', 'llm_extracted_tables', 'aistudio_json', 'table_blocks_json')
+
+# Format tags (first byte of the BLOB)
+TAG_ZSTD = b'Z'
+TAG_GZIP = b'G'
+TAG_PLAIN = b'J'  # Uncompressed UTF-8 (JSON_CODEC=none)
+TAG_PACK = b'P'   # Pointer to an encoded blob in a response pack
+
+ZSTD_LEVEL = 9
+GZIP_LEVEL = 6
+
+# Codec for new writes: zstd, gzip or none
+CODEC = os.getenv("JSON_CODEC", "zstd" if HAS_ZSTD else "gzip")
+
+class CodecError(Exception):
+    """Stored value can't be decoded"""
+
+# zstd (de)compressor objects are not thread-safe - one per thread
+_local = threading.local()
+
+def _zstd_compressor():
+    if not hasattr(_local, 'compressor'):
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+def _zstd_decompressor():
+    if not hasattr(_local, 'decompressor'):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+def encode(text, codec=None):
+    """Compress a JSON string for storage
+
+    Args:
+        text: JSON text (None passes through)
+        codec: 'zstd', 'gzip' or 'none' (default: JSON_CODEC / best available)
+
+    Returns:
+        bytes: Tagged BLOB
+    """
+    if text is None:
+        return None
+    codec = codec or CODEC
+    data = text.encode('utf-8')
+
+    if codec == 'zstd':
+        if not HAS_ZSTD:
+            raise CodecError("zstd codec requested but zstandard is not installed (pip install zstandard)")
+        return TAG_ZSTD + _zstd_compressor().compress(data)
+    if codec == 'gzip':
+        return TAG_GZIP + gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == 'none':
+        return TAG_PLAIN + data
+    raise CodecError(f"Unknown codec: {codec}")
+
+def decode(value):
+    """JSON text of a stored value (tagged BLOB, pack pointer or legacy TEXT)"""
+    if value is None or isinstance(value, str):
+        return value
+
+    # memoryview keeps pack (mmap) reads zero-copy up to decompression
+    value = memoryview(value)
+    tag, payload = bytes(value[:1]), value[1:]
+
+    if tag == TAG_ZSTD:
+        if not HAS_ZSTD:
+            raise CodecError("Value is zstd-compressed but zstandard is not installed (pip install zstandard)")
+        return _zstd_decompressor().decompress(payload).decode('utf-8')
+    if tag == TAG_GZIP:
+        return gzip.decompress(payload).decode('utf-8')
+    if tag == TAG_PLAIN:
+        return str(payload, 'utf-8')
+    if tag == TAG_PACK:
+        from response_pack import get_pack_reader
+        return decode(get_pack_reader().resolve(payload))
+    raise CodecError(f"Unknown format tag {tag!r}")
+
+def dumps(obj, codec=None):
+    """json.dumps (UTF-8, compact) + encode"""
+    if obj is None:
+        return None
+    return encode(json.dumps(obj, ensure_ascii=False), codec)
+
+def loads(value):
+    """decode + json.loads (None passes through)"""
+    text = decode(value)
+    return None if text is None else json.loads(text)
+
+def is_encoded(value):
+    """True if a stored value is already a tagged BLOB"""
+    return isinstance(value, (bytes, memoryview))
+
+def is_pack_pointer(value):
+    """True if a stored value points into the response pack archive"""
+    return is_encoded(value) and bytes(value[:1]) == TAG_PACK
@@ -0,0 +1,298 @@
+"""
+Content-addressed local PDF cache shared by every stage
+Files are stored by SHA-256 under data/pdf_cache/objects/, with an index
+mapping URLs and contract ids to hashes, a size cap and LRU eviction
+"""
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+from db_connection import connect
+
+CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", Path(__file__).parent.parent / "data" / "pdf_cache"))
+MAX_CACHE_BYTES = int(float(os.getenv("PDF_CACHE_MAX_MB", 5 * 1024)) * 1024 * 1024)
+
+# Files used this recently are never evicted - other processes may still be
+# reading a path they just looked up (pins only cover this process)
+EVICT_GRACE_SECONDS = float(os.getenv("PDF_CACHE_GRACE_SECONDS", 600))
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PDFCache:
+    """Content-addressed PDF store with URL / contract id aliases
+
+    Usage:
+        cache = get_pdf_cache()
+        path = cache.lookup(url=pdf_url, contract_id=contract_id)
+        if not path:
+            path = cache.add_file(downloaded_path, url=pdf_url, contract_id=contract_id)
+
+    Paths returned by the cache are shared - never delete or modify them.
+    Pin a path (pin / unpin) while a job still reads it, so eviction skips it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, grace_seconds=EVICT_GRACE_SECONDS):
+        """
+        Args:
+            cache_dir: Root directory of the cache
+            max_bytes: Size cap; least recently used files are evicted above it
+            grace_seconds: Files used within this window are never evicted
+        """
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.db"
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self.lock = threading.Lock()
+        self.pins = {}  # sha256 -> number of in-flight users in this process
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS aliases (
+                    key TEXT PRIMARY KEY,
+                    sha256 TEXT,
+                    url TEXT,
+                    updated_at REAL
+                )
+            """)
+            # Source URL of an alias (indexes from before it was recorded have none)
+            if 'url' not in [col[1] for col in conn.execute("PRAGMA table_info(aliases)").fetchall()]:
+                conn.execute("ALTER TABLE aliases ADD COLUMN url TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Open the index database for one transaction"""
+        conn = connect(self.index_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _keys(url=None, contract_id=None):
+        """Alias keys for a URL and/or contract id"""
+        keys = []
+        if contract_id:
+            keys.append(f"contract:{contract_id}")
+        if url:
+            keys.append(f"url:{url}")
+        return keys
+
+    def path_for(self, sha256):
+        """Storage path for a hash"""
+        return self.objects_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def hash_of(self, path):
+        """SHA-256 of a cached path (None if the path isn't in this cache)"""
+        path = Path(path)
+        if path.suffix == '.pdf' and path.parent.parent == self.objects_dir:
+            return path.stem
+        return None
+
+    def pin(self, path):
+        """Protect a cached path from eviction until unpin (calls nest)"""
+        sha256 = self.hash_of(path)
+        if sha256:
+            with self.lock:
+                self.pins[sha256] = self.pins.get(sha256, 0) + 1
+
+    def unpin(self, path):
+        """Drop one pin taken by pin()"""
+        sha256 = self.hash_of(path)
+        with self.lock:
+            count = self.pins.get(sha256, 0) - 1
+            if count > 0:
+                self.pins[sha256] = count
+            else:
+                self.pins.pop(sha256, None)
+
+    def lookup(self, url=None, contract_id=None):
+        """Find a cached PDF by URL or contract id (see lookup_hash)
+
+        Returns:
+            str: Path to the cached PDF or None
+        """
+        sha256 = self.lookup_hash(url=url, contract_id=contract_id)
+        return str(self.path_for(sha256)) if sha256 else None
+
+    def lookup_hash(self, url=None, contract_id=None):
+        """Find the SHA-256 of a cached PDF by URL or contract id (touches LRU)
+
+        The URL wins: a contract alias is only used when no URL is given or it
+        was stored for that same URL, so a contract whose URL changed in the
+        CSV never gets its old PDF back.
+        """
+        with self.lock, self._connect() as conn:
+            sha256 = None
+            if url:
+                row = conn.execute("SELECT sha256 FROM aliases WHERE key = ?", (f"url:{url}",)).fetchone()
+                if row and self.path_for(row[0]).exists():
+                    sha256 = row[0]
+            if sha256 is None and contract_id:
+                row = conn.execute("SELECT sha256, url FROM aliases WHERE key = ?", (f"contract:{contract_id}",)).fetchone()
+                if row and (url is None or row[1] == url) and self.path_for(row[0]).exists():
+                    sha256 = row[0]
+            if sha256:
+                conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+            return sha256
+
+    def get_validators(self, url):
+        """Return (etag, last_modified) stored for a URL (for conditional GET)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT etag, last_modified FROM validators WHERE url = ?", (url,)).fetchone()
+        return row if row else (None, None)
+
+    def set_validators(self, url, etag=None, last_modified=None):
+        """Store ETag / Last-Modified for a URL"""
+        if not (etag or last_modified):
+            return
+        with self.lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO validators (url, etag, last_modified) VALUES (?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified
+            """, (url, etag, last_modified))
+
+    def forget(self, url=None, contract_id=None):
+        """Drop the url / contract id aliases (and URL validators) so the next download fetches afresh
+
+        The file itself stays until eviction - other aliases may point to it.
+        """
+        with self.lock, self._connect() as conn:
+            for key in self._keys(url, contract_id):
+                conn.execute("DELETE FROM aliases WHERE key = ?", (key,))
+            if url:
+                conn.execute("DELETE FROM validators WHERE url = ?", (url,))
+
+    def add_file(self, src_path, url=None, contract_id=None, move=True):
+        """Store a file in the cache and alias it to url / contract id
+
+        Args:
+            src_path: File to add
+            url: Source URL alias
+            contract_id: Contract id alias
+            move: Move the file into the cache instead of copying it
+
+        Returns:
+            str: Path to the cached PDF
+        """
+        sha256 = sha256_file(src_path)
+        dest = self.path_for(sha256)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if dest.exists():
+            if move:
+                Path(src_path).unlink(missing_ok=True)
+        else:
+            # Stage next to the destination so the final rename is atomic
+            fd, staging = tempfile.mkstemp(dir=dest.parent, suffix='.part')
+            os.close(fd)
+            if move:
+                shutil.move(str(src_path), staging)
+            else:
+                shutil.copyfile(src_path, staging)
+            os.replace(staging, dest)
+
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO blobs (sha256, size, created_at, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access
+            """, (sha256, dest.stat().st_size, now, now))
+            for key in self._keys(url, contract_id):
+                conn.execute("""
+                    INSERT INTO aliases (key, sha256, url, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        sha256 = excluded.sha256, url = excluded.url, updated_at = excluded.updated_at
+                """, (key, sha256, url, now))
+
+        self.evict(keep=sha256)
+        return str(dest)
+
+    def add_bytes(self, data, url=None, contract_id=None):
+        """Store PDF bytes in the cache (see add_file)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return self.add_file(tmp_path, url=url, contract_id=contract_id, move=True)
+
+    def sizes_by_contract(self):
+        """Size in bytes of every cached PDF with a contract id alias"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT a.key, b.size FROM aliases a JOIN blobs b ON b.sha256 = a.sha256
+                WHERE a.key LIKE 'contract:%'
+            """).fetchall()
+        return {key[len("contract:"):]: size for key, size in rows}
+
+    def total_bytes(self):
+        """Total size of cached files"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, keep=None):
+        """Evict least recently used files until the cache fits max_bytes
+
+        Pinned files, `keep` and files used within grace_seconds are skipped,
+        so the cache can stay over the cap while they are in use.
+        """
+        with self.lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            evicted = 0
+            cutoff = time.time() - self.grace_seconds
+            rows = conn.execute("SELECT sha256, size, last_access FROM blobs ORDER BY last_access").fetchall()
+            for sha256, size, last_access in rows:
+                if total <= self.max_bytes:
+                    break
+                if sha256 == keep or sha256 in self.pins or last_access > cutoff:
+                    continue
+                self.path_for(sha256).unlink(missing_ok=True)
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                conn.execute("DELETE FROM aliases WHERE sha256 = ?", (sha256,))
+                total -= size
+                evicted += 1
+
+            return evicted
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Return the process-wide PDFCache"""
+    global _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PDFCache()
+
+    return _shared_cache
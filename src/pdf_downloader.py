@@ -0,0 +1,247 @@
+"""
+Streaming, resumable PDF download engine
+Persistent session and concurrency cap per host, chunked streaming to disk,
+Range-based resume after dropped connections and conditional GET revalidation.
+Completed downloads go straight into the shared PDF cache.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pdf_cache import get_pdf_cache
+
+PER_HOST_LIMIT = int(os.getenv("PDF_DOWNLOADS_PER_HOST", 8))
+CHUNK_SIZE = 256 * 1024
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60  # Between chunks, not for the whole body
+MAX_ATTEMPTS = 5
+
+class DownloadError(Exception):
+    """Raised when a PDF cannot be downloaded after all attempts"""
+
+class PDFDownloader:
+    """Per-host pooled, resumable PDF downloader backed by the PDF cache
+
+    Usage:
+        downloader = get_downloader()
+        path = downloader.download(url, contract_id=contract_id)
+        path = await downloader.download_async(url, contract_id=contract_id)
+    """
+
+    def __init__(self, cache=None, per_host_limit=PER_HOST_LIMIT, chunk_size=CHUNK_SIZE,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_attempts=MAX_ATTEMPTS):
+        """
+        Args:
+            cache: PDFCache (default: shared cache)
+            per_host_limit: Max concurrent downloads per host
+            chunk_size: Streaming chunk size in bytes
+            timeout: (connect, read) timeout in seconds
+            max_attempts: Attempts per download (each resumes where the last stopped)
+        """
+        self.cache = cache or get_pdf_cache()
+        self.per_host_limit = per_host_limit
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.partial_dir = self.cache.cache_dir / "partial"
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+
+        self.sessions = {}
+        self.host_slots = {}
+        self.url_locks = {}
+        self.lock = threading.Lock()
+
+        # Stats
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.downloads = 0
+        self.resumes = 0
+        self.bytes_downloaded = 0
+
+    def _host(self, url):
+        """Return (session, semaphore) for the URL's host"""
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_limit)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self.sessions[host], self.host_slots[host]
+
+    def _partial_paths(self, url):
+        """Partial download file and its metadata file for a URL"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.partial_dir / f"{key}.part", self.partial_dir / f"{key}.json"
+
+    def download(self, url, contract_id=None, revalidate=False, verbose=False):
+        """Return a cached PDF path, downloading (or revalidating) it if needed
+
+        Args:
+            url: PDF URL
+            contract_id: Optional contract id alias for the cache
+            revalidate: Send a conditional GET even when the URL is cached
+            verbose: Print progress
+
+        Returns:
+            str: Path to the cached PDF (shared - do not delete)
+
+        Raises:
+            DownloadError: If the download fails after all attempts
+        """
+        cached_path = self.cache.lookup(url=url, contract_id=contract_id)
+        if cached_path and not revalidate:
+            self.cache_hits += 1
+            return cached_path
+
+        session, slot = self._host(url)
+        with self._url_lock(url), slot:
+            # Another worker may have fetched it while we waited
+            if not cached_path:
+                cached_path = self.cache.lookup(url=url, contract_id=contract_id)
+                if cached_path:
+                    self.cache_hits += 1
+                    return cached_path
+
+            conditional = self._conditional_headers(url) if cached_path else {}
+            part_path = self._fetch(session, url, conditional, verbose)
+
+            if part_path is None:
+                self.not_modified += 1
+                if verbose:
+                    print(f"  [OK] Not modified: {url[:60]}")
+                return cached_path
+
+            self.downloads += 1
+            return self.cache.add_file(part_path, url=url, contract_id=contract_id)
+
+    async def download_async(self, url, contract_id=None, revalidate=False, verbose=False):
+        """Async wrapper - runs the download in the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.download(url, contract_id=contract_id, revalidate=revalidate, verbose=verbose)
+        )
+
+    def _url_lock(self, url):
+        """Lock serializing downloads of the same URL (they share a partial file)"""
+        with self.lock:
+            return self.url_locks.setdefault(url, threading.Lock())
+
+    def _conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers from the stored validators"""
+        etag, last_modified = self.cache.get_validators(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _fetch(self, session, url, conditional=None, verbose=False):
+        """Stream a URL to its partial file, resuming with Range on failures
+
+        Args:
+            session: Host session
+            url: PDF URL
+            conditional: Conditional GET headers (revalidating a cached copy)
+            verbose: Print progress
+
+        Returns:
+            Path: Completed partial file (moved into the cache by the caller),
+                or None if the server answered 304 Not Modified
+        """
+        part_path, meta_path = self._partial_paths(url)
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        last_error = None
+
+        for attempt in range(self.max_attempts):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            headers = dict(conditional or {})
+            if offset:
+                headers['Range'] = f"bytes={offset}-"
+                # Only resume if the file hasn't changed since the first bytes
+                validator = meta.get('etag') or meta.get('last_modified')
+                if validator:
+                    headers['If-Range'] = validator
+
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 304:
+                        return None
+                    if response.status_code == 416:
+                        # Partial file already complete (or stale) - start over
+                        part_path.unlink(missing_ok=True)
+                        continue
+                    response.raise_for_status()
+
+                    if response.status_code == 206:
+                        self.resumes += 1
+                        mode = 'ab'
+                        if verbose:
+                            print(f"  [INFO] Resuming at {offset / 1024:.0f} KB")
+                    else:
+                        mode = 'wb'
+                        meta = {
+                            'etag': response.headers.get('ETag'),
+                            'last_modified': response.headers.get('Last-Modified')
+                        }
+                        meta_path.write_text(json.dumps(meta))
+
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            self.bytes_downloaded += len(chunk)
+
+                self.cache.set_validators(url, meta.get('etag'), meta.get('last_modified'))
+                meta_path.unlink(missing_ok=True)
+                return part_path
+
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                last_error = e
+                if verbose:
+                    print(f"  [WARNING] Download interrupted ({type(e).__name__}), attempt {attempt + 1}/{self.max_attempts}")
+                time.sleep(min(2 ** attempt, 30))
+            except requests.HTTPError as e:
+                part_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                raise DownloadError(f"HTTP error downloading {url}: {e}")
+            except requests.RequestException as e:
+                # Bad URL, redirect loop, undecodable body - retrying won't help
+                part_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                raise DownloadError(f"Error downloading {url}: {type(e).__name__}: {e}")
+
+        raise DownloadError(f"Download failed after {self.max_attempts} attempts: {last_error}")
+
+    def stats(self):
+        """Return download statistics"""
+        return {
+            'cache_hits': self.cache_hits,
+            'not_modified': self.not_modified,
+            'downloads': self.downloads,
+            'resumes': self.resumes,
+            'mb_downloaded': round(self.bytes_downloaded / (1024 * 1024), 1)
+        }
+
+_shared_downloader = None
+_shared_lock = threading.Lock()
+
+def get_downloader():
+    """Return the process-wide PDFDownloader"""
+    global _shared_downloader
+
+    with _shared_lock:
+        if _shared_downloader is None:
+            _shared_downloader = PDFDownloader()
+
+    return _shared_downloader
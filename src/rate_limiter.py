@@ -0,0 +1,124 @@
+"""
+Shared token-bucket rate limiter for API quotas
+Named buckets (requests/min, tokens/min, bytes/min) shared by every worker in a process
+"""
+import os
+import time
+import asyncio
+import threading
+
+# Bucket names used by the pipelines
+DOCAI_REQUESTS = "docai_requests"
+DOCAI_BYTES = "docai_bytes"
+LLM_REQUESTS = "llm_requests"
+LLM_TOKENS = "llm_tokens"
+
+# Default quotas per minute (override with env vars, 0 disables a bucket)
+DEFAULT_QUOTAS = {
+    DOCAI_REQUESTS: ("DOCAI_REQUESTS_PER_MINUTE", 120),
+    DOCAI_BYTES: ("DOCAI_BYTES_PER_MINUTE", 0),
+    LLM_REQUESTS: ("OPENAI_REQUESTS_PER_MINUTE", 500),
+    LLM_TOKENS: ("OPENAI_TOKENS_PER_MINUTE", 500000),
+}
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute
+
+    Acquiring reserves tokens immediately (the balance may go negative) and
+    returns how long the caller must wait, so concurrent callers are served
+    in arrival order and a request larger than the bucket still gets through.
+    """
+
+    def __init__(self, name, rate_per_minute, capacity=None):
+        """
+        Args:
+            name: Bucket name (for logging)
+            rate_per_minute: Tokens added per minute
+            capacity: Max burst size (default: one minute of quota)
+        """
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def reserve(self, amount=1):
+        """Reserve tokens and return the number of seconds to wait before using them"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.total_wait += wait
+            return wait
+
+    def acquire(self, amount=1):
+        """Blocking acquire (for executor threads)"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, amount=1):
+        """Async acquire (for event-loop coroutines)"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+class RateLimiter:
+    """Registry of named token buckets
+
+    Acquiring from a bucket that was never configured is a no-op, so callers
+    can always charge every quota they consume.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def configure(self, name, rate_per_minute, capacity=None):
+        """Create or replace a named bucket (rate 0 or None removes it)"""
+        with self.lock:
+            if not rate_per_minute:
+                self.buckets.pop(name, None)
+                return None
+            bucket = TokenBucket(name, rate_per_minute, capacity)
+            self.buckets[name] = bucket
+            return bucket
+
+    def acquire(self, name, amount=1):
+        """Blocking acquire from a named bucket"""
+        bucket = self.buckets.get(name)
+        return bucket.acquire(amount) if bucket else 0.0
+
+    async def acquire_async(self, name, amount=1):
+        """Async acquire from a named bucket"""
+        bucket = self.buckets.get(name)
+        return await bucket.acquire_async(amount) if bucket else 0.0
+
+    def stats(self):
+        """Return configured rates and total seconds spent waiting per bucket"""
+        return {
+            name: {'rate_per_minute': bucket.rate * 60, 'total_wait': round(bucket.total_wait, 2)}
+            for name, bucket in self.buckets.items()
+        }
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the process-wide RateLimiter, configured from env on first use"""
+    global _shared_limiter
+
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+            for name, (env_var, default) in DEFAULT_QUOTAS.items():
+                _shared_limiter.configure(name, float(os.getenv(env_var, default)))
+
+    return _shared_limiter
@@ -0,0 +1,273 @@
+"""
+Append-only pack archive for raw Document AI responses
+Responses (json_codec blobs) are appended to data/response_packs/raw_json-NNN.pack
+with a fixed-width index next to each pack (raw_json-NNN.idx). The database
+keeps only a small pointer (json_codec TAG_PACK) in contracts.raw_json.
+
+Readers mmap the packs: a pointer or contract id resolves to a memoryview of
+the blob without copying, and every process reading the same pack shares the
+OS page cache. Packs roll over at PACK_MAX_MB, so backups only need to copy
+the newest pack plus the (small) database.
+"""
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from pathlib import Path
+
+# fcntl locks appends across processes (not available on Windows - single writer there)
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+PACK_DIR = Path(os.getenv("RESPONSE_PACK_DIR", Path(__file__).parent.parent / "data" / "response_packs"))
+PACK_MAX_BYTES = int(float(os.getenv("PACK_MAX_MB", 2048)) * 1024 * 1024)
+PACK_PREFIX = "raw_json"
+
+# Index record: contract key (sha256(contract_id)[:16]), content sha256, offset, length, reserved
+INDEX_RECORD = struct.Struct('<16s32sQI4x')
+
+# Pointer stored in the database (after the json_codec tag): pack number, offset, length, content sha256
+POINTER = struct.Struct('<IQI32s')
+
+class PackError(Exception):
+    """Pointer or pack file is invalid"""
+
+def contract_key(contract_id):
+    """Fixed-width index key for a contract id"""
+    return hashlib.sha256(contract_id.encode('utf-8')).digest()[:16]
+
+def pack_path(pack_dir, number):
+    return Path(pack_dir) / f"{PACK_PREFIX}-{number:03d}.pack"
+
+def index_path(pack_dir, number):
+    return Path(pack_dir) / f"{PACK_PREFIX}-{number:03d}.idx"
+
+def pack_numbers(pack_dir):
+    """Existing pack numbers, oldest first"""
+    numbers = []
+    for path in Path(pack_dir).glob(f"{PACK_PREFIX}-*.pack"):
+        try:
+            numbers.append(int(path.stem.rsplit('-', 1)[1]))
+        except ValueError:
+            continue
+    return sorted(numbers)
+
+def read_index(pack_dir, number, start=0):
+    """Index records of one pack as (key, sha256, offset, length) tuples
+
+    Args:
+        start: First record to read (skip records already seen)
+    """
+    path = index_path(pack_dir, number)
+    if not path.exists():
+        return []
+    with open(path, 'rb') as f:
+        f.seek(start * INDEX_RECORD.size)
+        data = f.read()
+    # A torn trailing record (crash mid-append) is ignored
+    usable = len(data) - len(data) % INDEX_RECORD.size
+    return list(INDEX_RECORD.iter_unpack(data[:usable]))
+
+class ResponsePackWriter:
+    """Appends blobs to the current pack and returns database pointers
+
+    Identical content (same sha256) is stored once. Appends are serialized
+    by a thread lock and, across processes, by an fcntl lock on the pack dir.
+    """
+
+    def __init__(self, pack_dir=PACK_DIR, max_bytes=PACK_MAX_BYTES):
+        self.pack_dir = Path(pack_dir)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        self.known = {}  # content sha256 -> pointer
+        self.indexed_packs = {}  # pack number -> index records already loaded
+
+    def _lock_file(self):
+        return open(self.pack_dir / ".lock", 'a+b')
+
+    def _refresh_known(self):
+        """Load index records appended since the last look (possibly by other processes)"""
+        for number in pack_numbers(self.pack_dir):
+            records = read_index(self.pack_dir, number, start=self.indexed_packs.get(number, 0))
+            for _, sha, offset, length in records:
+                self.known[sha] = POINTER.pack(number, offset, length, sha)
+            self.indexed_packs[number] = self.indexed_packs.get(number, 0) + len(records)
+
+    def append(self, contract_id, blob):
+        """Store a blob for a contract
+
+        Args:
+            contract_id: Contract the blob belongs to (index key)
+            blob: Bytes to store (a json_codec encoded value)
+
+        Returns:
+            bytes: Pointer for the database (json_codec.TAG_PACK + POINTER)
+        """
+        from json_codec import TAG_PACK
+
+        blob = bytes(blob)
+        sha = hashlib.sha256(blob).digest()
+        key = contract_key(contract_id)
+
+        with self.lock, self._lock_file() as lock_file:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_known()
+
+                if sha in self.known:
+                    number, offset, length, _ = POINTER.unpack(self.known[sha])
+                else:
+                    numbers = pack_numbers(self.pack_dir)
+                    number = numbers[-1] if numbers else 0
+                    if pack_path(self.pack_dir, number).exists() and \
+                            pack_path(self.pack_dir, number).stat().st_size + len(blob) > self.max_bytes:
+                        number += 1
+
+                    with open(pack_path(self.pack_dir, number), 'ab') as f:
+                        offset = f.tell()
+                        f.write(blob)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    length = len(blob)
+                    self.known[sha] = POINTER.pack(number, offset, length, sha)
+
+                # Index the contract -> blob mapping even when the content was deduplicated
+                with open(index_path(self.pack_dir, number), 'ab') as f:
+                    f.write(INDEX_RECORD.pack(key, sha, offset, length))
+                self.indexed_packs[number] = self.indexed_packs.get(number, 0) + 1
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        return TAG_PACK + self.known[sha]
+
+    def link(self, contract_id, pointer):
+        """Index a blob that is already stored under another key (no bytes written)
+
+        Args:
+            contract_id: Index key
+            pointer: Pointer returned by append (json_codec.TAG_PACK + POINTER)
+        """
+        number, offset, length, sha = POINTER.unpack(bytes(pointer)[1:])
+        key = contract_key(contract_id)
+
+        with self.lock, self._lock_file() as lock_file:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_known()
+                with open(index_path(self.pack_dir, number), 'ab') as f:
+                    f.write(INDEX_RECORD.pack(key, sha, offset, length))
+                self.indexed_packs[number] = self.indexed_packs.get(number, 0) + 1
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class ResponsePackReader:
+    """Zero-copy reads from the packs through mmap
+
+    Usage:
+        reader = get_pack_reader()
+        view = reader.get('contract-id')        # memoryview of the json_codec blob
+        raw = json_codec.loads(view)
+    """
+
+    def __init__(self, pack_dir=PACK_DIR):
+        self.pack_dir = Path(pack_dir)
+        self.lock = threading.Lock()
+        self.maps = {}  # pack number -> mmap
+        self.by_contract = {}  # contract key -> (pack number, offset, length)
+        self.indexed_packs = {}
+
+    def _map(self, number, end):
+        """mmap of a pack covering at least `end` bytes (remapped as the pack grows)"""
+        with self.lock:
+            mapped = self.maps.get(number)
+            if mapped is None or len(mapped) < end:
+                path = pack_path(self.pack_dir, number)
+                if not path.exists():
+                    raise PackError(f"Pack not found: {path}")
+                with open(path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if len(mapped) < end:
+                    raise PackError(f"{path.name} is shorter than the pointer ({len(mapped)} < {end} bytes)")
+                # Old maps stay alive while views on them exist - just drop our reference
+                self.maps[number] = mapped
+            return mapped
+
+    def view(self, number, offset, length):
+        """memoryview of one blob"""
+        return memoryview(self._map(number, offset + length))[offset:offset + length]
+
+    def resolve(self, pointer):
+        """memoryview of the blob a database pointer (without the tag) refers to"""
+        if len(pointer) != POINTER.size:
+            raise PackError(f"Invalid pack pointer ({len(pointer)} bytes)")
+        number, offset, length, _ = POINTER.unpack(pointer)
+        return self.view(number, offset, length)
+
+    def _refresh_index(self):
+        for number in pack_numbers(self.pack_dir):
+            records = read_index(self.pack_dir, number, start=self.indexed_packs.get(number, 0))
+            for key, _, offset, length in records:
+                self.by_contract[key] = (number, offset, length)  # Latest write wins
+            self.indexed_packs[number] = self.indexed_packs.get(number, 0) + len(records)
+
+    def get(self, contract_id):
+        """memoryview of the latest blob stored for a contract, or None"""
+        key = contract_key(contract_id)
+        with self.lock:
+            location = self.by_contract.get(key)
+            if location is None:
+                self._refresh_index()
+                location = self.by_contract.get(key)
+        if location is None:
+            return None
+        return self.view(*location)
+
+    def verify(self):
+        """Check every indexed blob against its content hash
+
+        Returns:
+            tuple: (blobs checked, list of bad (pack number, offset) pairs)
+        """
+        checked, bad = 0, []
+        for number in pack_numbers(self.pack_dir):
+            for _, sha, offset, length in read_index(self.pack_dir, number):
+                checked += 1
+                try:
+                    if hashlib.sha256(self.view(number, offset, length)).digest() != sha:
+                        bad.append((number, offset))
+                except PackError:
+                    bad.append((number, offset))
+        return checked, bad
+
+_shared_lock = threading.Lock()
+_shared_writer = None
+_shared_reader = None
+
+def get_pack_writer():
+    """Return the process-wide ResponsePackWriter"""
+    global _shared_writer
+
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = ResponsePackWriter()
+
+    return _shared_writer
+
+def get_pack_reader():
+    """Return the process-wide ResponsePackReader"""
+    global _shared_reader
+
+    with _shared_lock:
+        if _shared_reader is None:
+            _shared_reader = ResponsePackReader()
+
+    return _shared_reader
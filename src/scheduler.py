@@ -0,0 +1,155 @@
+"""
+Cost-based ordering of the work queue (--order)
+Contracts are ranked by predicted cost so the slowest ones start first
+(longest-processing-time-first, shortest run tail) or last (shortest first,
+quick smoke runs). 'id' keeps the old ORDER BY id behaviour.
+
+Phase 1 is driven by page count (pdf_metadata, see pdf_preflight) - pages
+are what Document AI spends its time on. Contracts without a known page count
+fall back to size features (PDF bytes, stored response / tableBlocks sizes).
+Either is scaled to its median, so both kinds of contracts still compare, and
+multiplied by how slow past runs of the same hospital were (stage_timings
+totals relative to the global average).
+"""
+from statistics import mean, median
+
+from json_codec import is_pack_pointer
+from response_pack import POINTER
+from stage_timer import PHASE1
+
+ORDER_ID = "id"
+ORDER_LPT = "lpt"  # Longest predicted first - minimizes makespan
+ORDER_SPT = "spt"  # Shortest predicted first - quick smoke runs
+ORDERS = (ORDER_ID, ORDER_LPT, ORDER_SPT)
+
+# Size features stored on contracts, per phase
+FEATURES = {
+    'phase1': ('response_bytes',),
+    'phase2': ('table_cells', 'table_blocks_bytes'),
+}
+
+# Stored raw_json that is a pack pointer (json_codec.TAG_PACK + POINTER)
+POINTER_VALUE_BYTES = 1 + POINTER.size
+
+def stored_size(raw_json):
+    """Bytes of a stored response (the blob length for pack pointers)"""
+    if raw_json is None:
+        return None
+    if is_pack_pointer(raw_json) and len(raw_json) == POINTER_VALUE_BYTES:
+        return POINTER.unpack(bytes(raw_json[1:]))[2]
+    return len(raw_json)
+
+def contract_features(conn, phase):
+    """Size features of every contract: {id: (hospital_name, [feature values])}
+
+    Phase 1 uses the stored response size (reprocessing), Phase 2 the
+    tableBlocks cell count and size. Unknown values are None.
+    """
+    features = {}
+    if phase == PHASE1:
+        rows = conn.execute("""
+            SELECT id, hospital_name, CASE WHEN length(raw_json) = ? THEN raw_json END, length(raw_json)
+            FROM contracts
+        """, (POINTER_VALUE_BYTES,))
+        for contract_id, hospital, pointer, length in rows:
+            features[contract_id] = (hospital, [stored_size(pointer) if pointer else length])
+    else:
+        rows = conn.execute("SELECT id, hospital_name, table_cell_count, length(table_blocks_json) FROM contracts")
+        for contract_id, hospital, cells, length in rows:
+            features[contract_id] = (hospital, [cells, length])
+    return features
+
+def pdf_sizes(conn, phase):
+    """PDF bytes per contract from past download / preflight / trim stages"""
+    return dict(conn.execute("""
+        SELECT contract_id, MAX(payload_bytes) FROM stage_timings
+        WHERE phase = ? AND stage IN ('download', 'preflight', 'trim') AND payload_bytes IS NOT NULL
+        GROUP BY contract_id
+    """, (phase,)).fetchall())
+
+def hospital_factors(conn, phase):
+    """How slow each hospital's runs were relative to the average run
+
+    Returns:
+        dict: {hospital_name: mean run seconds / global mean run seconds}
+    """
+    runs = conn.execute("""
+        SELECT c.hospital_name, SUM(t.seconds) FROM stage_timings t
+        JOIN contracts c ON c.id = t.contract_id
+        WHERE t.phase = ?
+        GROUP BY t.contract_id, t.recorded_at
+    """, (phase,)).fetchall()
+    if not runs:
+        return {}
+
+    by_hospital = {}
+    for hospital, seconds in runs:
+        by_hospital.setdefault(hospital, []).append(seconds)
+    overall = mean(seconds for _, seconds in runs) or 1.0
+    return {hospital: mean(durations) / overall for hospital, durations in by_hospital.items()}
+
+def predict_costs(conn, contract_ids, phase, extra_sizes=None, page_counts=None):
+    """Relative predicted cost per contract (1.0 = typical contract)
+
+    Args:
+        conn: Connection to the pipeline database
+        contract_ids: Contracts to score
+        phase: 'phase1' or 'phase2' (stage_timer.PHASE1 / PHASE2)
+        extra_sizes: Optional {id: bytes} feature (e.g. cached PDF sizes)
+        page_counts: Optional {id: pages} (pdf_preflight.known_page_counts) -
+            the main feature where known, sizes are the fallback
+
+    Returns:
+        dict: {contract_id: cost}
+    """
+    features = contract_features(conn, phase)
+    sizes = [pdf_sizes(conn, phase)] if phase == PHASE1 else []
+    if extra_sizes:
+        sizes.append(extra_sizes)
+    factors = hospital_factors(conn, phase)
+
+    # Feature vectors (None = unknown) for the contracts being scored
+    unknown = (None, [None] * len(FEATURES[phase]))
+    vectors = {}
+    for contract_id in contract_ids:
+        _, values = features.get(contract_id, unknown)
+        vectors[contract_id] = values + [size.get(contract_id) for size in sizes]
+
+    # Median of each feature over the contracts that have it
+    medians = []
+    for i in range(len(FEATURES[phase]) + len(sizes)):
+        known = [v[i] for v in vectors.values() if v[i]]
+        medians.append(median(known) if known else None)
+
+    page_counts = page_counts or {}
+    known_pages = [page_counts[contract_id] for contract_id in vectors if page_counts.get(contract_id)]
+    median_pages = median(known_pages) if known_pages else None
+
+    costs = {}
+    for contract_id, values in vectors.items():
+        pages = page_counts.get(contract_id)
+        if pages and median_pages:
+            base = pages / median_pages
+        else:
+            relative = [value / medians[i] for i, value in enumerate(values) if value and medians[i]]
+            base = mean(relative) if relative else 1.0
+        hospital = features.get(contract_id, unknown)[0]
+        costs[contract_id] = base * factors.get(hospital, 1.0)
+    return costs
+
+def order_by_cost(conn, contract_ids, phase, order, extra_sizes=None, page_counts=None):
+    """Contract ids in the requested order
+
+    Args:
+        order: 'id' (unchanged), 'lpt' (longest first) or 'spt' (shortest first)
+        extra_sizes, page_counts: See predict_costs
+
+    Returns:
+        list: Reordered ids (ties keep their input order)
+    """
+    contract_ids = list(contract_ids)
+    if order == ORDER_ID:
+        return contract_ids
+
+    costs = predict_costs(conn, contract_ids, phase, extra_sizes, page_counts)
+    return sorted(contract_ids, key=costs.get, reverse=(order == ORDER_LPT))
@@ -0,0 +1,70 @@
+"""
+Bounded asyncio queue with depth and back-pressure metrics
+Connects the stages of a staged pipeline: a full queue blocks its producers
+(back-pressure instead of unbounded buffering), and the stats show which
+stage is the bottleneck - a queue that is always full feeds a slow stage,
+one that is always empty starves its consumers.
+"""
+import time
+import asyncio
+
+class StageQueue(asyncio.Queue):
+    """asyncio.Queue that records depth, wait and throughput statistics
+
+    Usage:
+        queue = StageQueue('prepare', maxsize=8)
+        await queue.put(job)
+        job = await queue.get()
+        queue.stats()  # {'items': ..., 'max_depth': ..., 'mean_depth': ..., ...}
+    """
+
+    def __init__(self, name, maxsize=0):
+        super().__init__(maxsize)
+        self.name = name
+        self.items = 0
+        self.max_depth = 0
+        self.put_wait = 0.0  # Producer seconds blocked on a full queue
+        self.get_wait = 0.0  # Consumer seconds idle on an empty queue
+        self.started = time.perf_counter()
+        self._depth_seconds = 0.0
+        self._last_change = self.started
+
+    def _track_depth(self):
+        now = time.perf_counter()
+        self._depth_seconds += self.qsize() * (now - self._last_change)
+        self._last_change = now
+
+    # asyncio.Queue storage hooks - called for every put / get
+    def _put(self, item):
+        self._track_depth()
+        super()._put(item)
+        self.items += 1
+        self.max_depth = max(self.max_depth, self.qsize())
+
+    def _get(self):
+        self._track_depth()
+        return super()._get()
+
+    async def put(self, item):
+        started = time.perf_counter()
+        await super().put(item)
+        self.put_wait += time.perf_counter() - started
+
+    async def get(self):
+        started = time.perf_counter()
+        item = await super().get()
+        self.get_wait += time.perf_counter() - started
+        return item
+
+    def stats(self):
+        """Queue statistics since creation"""
+        self._track_depth()
+        elapsed = time.perf_counter() - self.started
+        return {
+            'items': self.items,
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': round(self._depth_seconds / elapsed, 2) if elapsed else 0.0,
+            'put_wait': round(self.put_wait, 2),
+            'get_wait': round(self.get_wait, 2),
+        }
@@ -0,0 +1,138 @@
+"""
+Per-stage timing instrumentation persisted in the stage_timings table
+One StageTimer per contract run records wall time for every stage plus
+payload sizes, retry counts and HTTP status codes
+"""
+import time
+from datetime import datetime
+from contextlib import contextmanager
+
+PHASE1 = "phase1"
+PHASE2 = "phase2"
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS stage_timings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        contract_id TEXT,
+        phase TEXT,
+        stage TEXT,
+        seconds REAL,
+        payload_bytes INTEGER,
+        retries INTEGER,
+        http_status INTEGER,
+        recorded_at TEXT
+    )
+"""
+
+INSERT_SQL = """
+    INSERT INTO stage_timings (contract_id, phase, stage, seconds, payload_bytes, retries, http_status, recorded_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def setup_stage_timings(conn):
+    """Create the stage_timings table and its index"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_phase_stage ON stage_timings (phase, stage)")
+    conn.commit()
+
+class StageTimer:
+    """Wall time per stage for one contract run
+
+    Usage:
+        timer = StageTimer(contract_id, PHASE1)
+        with timer.stage('download'):
+            ...
+        timer.add('docai', seconds, payload_bytes=n, retries=1, http_status=200)
+        timer.flush(writer)  # queue the rows on the BatchedDBWriter
+    """
+
+    def __init__(self, contract_id, phase):
+        self.contract_id = contract_id
+        self.phase = phase
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **meta):
+        """Time a block (works around awaits too); meta is updated by the block via the yielded dict"""
+        started = time.perf_counter()
+        try:
+            yield meta
+        finally:
+            self.add(name, time.perf_counter() - started, **meta)
+
+    def add(self, name, seconds, payload_bytes=None, retries=None, http_status=None):
+        """Record one stage"""
+        self.records.append((name, seconds, payload_bytes, retries, http_status))
+
+    def total(self, name):
+        """Total seconds recorded for a stage"""
+        return sum(seconds for stage, seconds, *_ in self.records if stage == name)
+
+    def rows(self):
+        """Rows for INSERT_SQL"""
+        recorded_at = datetime.now().isoformat()
+        return [
+            (self.contract_id, self.phase, name, round(seconds, 4), payload_bytes, retries, http_status, recorded_at)
+            for name, seconds, payload_bytes, retries, http_status in self.records
+        ]
+
+    def flush(self, writer):
+        """Queue every recorded stage on a BatchedDBWriter and clear the timer"""
+        for row in self.rows():
+            writer.submit(INSERT_SQL, row)
+        self.records = []
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * p / 100 + 0.5) - 1))]
+
+def stage_percentiles(conn, phase):
+    """p50 / p95 / p99 seconds and totals per stage for a phase
+
+    Returns:
+        dict: {stage: {count, p50, p95, p99, total, retries}} or {} if the
+            table doesn't exist yet
+    """
+    try:
+        rows = conn.execute("""
+            SELECT stage, seconds, COALESCE(retries, 0) FROM stage_timings
+            WHERE phase = ? ORDER BY stage, seconds
+        """, (phase,)).fetchall()
+    except Exception:
+        return {}
+
+    by_stage = {}
+    for stage, seconds, retries in rows:
+        entry = by_stage.setdefault(stage, {'values': [], 'retries': 0})
+        entry['values'].append(seconds)
+        entry['retries'] += retries
+
+    return {
+        stage: {
+            'count': len(entry['values']),
+            'p50': round(percentile(entry['values'], 50), 3),
+            'p95': round(percentile(entry['values'], 95), 3),
+            'p99': round(percentile(entry['values'], 99), 3),
+            'total': round(sum(entry['values']), 1),
+            'retries': entry['retries']
+        }
+        for stage, entry in by_stage.items()
+    }
+
+def print_stage_breakdown(conn, phase, stage_order=()):
+    """Print the percentile table for a phase (stages in stage_order first)"""
+    stats = stage_percentiles(conn, phase)
+    if not stats:
+        return
+
+    stages = [s for s in stage_order if s in stats] + sorted(s for s in stats if s not in stage_order)
+    grand_total = sum(entry['total'] for entry in stats.values()) or 1
+
+    print(f"\nStage timings ({phase}, seconds):")
+    print(f"  {'stage':<14}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'total':>10}{'share':>8}{'retries':>9}")
+    for stage in stages:
+        entry = stats[stage]
+        print(f"  {stage:<14}{entry['count']:>7}{entry['p50']:>9.3f}{entry['p95']:>9.3f}{entry['p99']:>9.3f}"
+              f"{entry['total']:>10.1f}{entry['total'] / grand_total * 100:>7.1f}%{entry['retries']:>9}")
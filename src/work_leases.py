@@ -0,0 +1,226 @@
+"""
+Lease-based work claiming in the work_leases table
+Lets several Phase 1, Phase 2 or AI Studio processes - on one machine or on
+several sharing the database file - split the backlog without processing a
+contract twice. A process claims a contract atomically before working on it,
+a heartbeat thread keeps its leases alive, and leases of a process that died
+simply expire and are claimed by the next process that gets there. A
+finished contract keeps its row as a done marker, so processes of the same
+run never pick it up again - whatever its status or the pending condition.
+"""
+import os
+import time
+import uuid
+import socket
+import threading
+
+from db_connection import connect
+
+# Tasks (one lease namespace each)
+TASK_PHASE1 = "phase1"
+TASK_PHASE2 = "phase2"
+TASK_AISTUDIO = "aistudio"
+
+LEASE_SECONDS = float(os.getenv("WORK_LEASE_SECONDS", 300))
+
+# Shared run id - set it on every process of a multi-node run. Without it a
+# process treats contracts finished since it started as done by its run.
+RUN_ID = os.getenv("WORK_RUN_ID")
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS work_leases (
+        task TEXT,
+        contract_id TEXT,
+        claimed_by TEXT,
+        claimed_at REAL,
+        heartbeat_at REAL,
+        lease_expires_at REAL,
+        attempts INTEGER DEFAULT 1,
+        run_id TEXT,
+        done_at REAL,
+        PRIMARY KEY (task, contract_id)
+    )
+"""
+
+# Columns added after the first release of the table
+LEASE_COLUMNS = (
+    ('run_id', 'TEXT'),
+    ('done_at', 'REAL'),    # Set when the contract finished (the row stays as a done marker)
+)
+
+# One statement, so the pending check and the claim are atomic. An existing
+# lease is only taken over once it has expired, and a done marker only by
+# another run that started after the contract finished (last ? = start time).
+CLAIM_SQL = """
+    INSERT INTO work_leases (task, contract_id, claimed_by, claimed_at, heartbeat_at, lease_expires_at, run_id)
+    SELECT ?, ?, ?, ?, ?, ?, ?
+    WHERE EXISTS (SELECT 1 FROM contracts WHERE id = ? AND ({pending}))
+    ON CONFLICT(task, contract_id) DO UPDATE SET
+        claimed_by = excluded.claimed_by,
+        claimed_at = excluded.claimed_at,
+        heartbeat_at = excluded.heartbeat_at,
+        lease_expires_at = excluded.lease_expires_at,
+        run_id = excluded.run_id,
+        done_at = NULL,
+        attempts = work_leases.attempts + 1
+    WHERE work_leases.lease_expires_at < excluded.claimed_at
+      AND (work_leases.done_at IS NULL
+           OR (work_leases.run_id IS NOT excluded.run_id AND work_leases.done_at < ?))
+"""
+
+# Releasing marks the lease done (expired, kept as the run's done marker)
+RELEASE_SQL = """
+    UPDATE work_leases SET done_at = ?, lease_expires_at = ?
+    WHERE task = ? AND contract_id = ? AND claimed_by = ?
+"""
+
+def setup_work_leases(conn):
+    """Create the work_leases table (or add its new columns) and its index"""
+    conn.execute(CREATE_TABLE_SQL)
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(work_leases)").fetchall()]
+    for name, column_type in LEASE_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE work_leases ADD COLUMN {name} {column_type}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_work_leases_owner ON work_leases (task, claimed_by)")
+    conn.commit()
+
+def default_owner():
+    """Unique owner id for this process: host:pid:random"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class WorkLeases:
+    """Claims, heartbeats and releases leases for one task
+
+    Usage:
+        leases = WorkLeases(db_path, TASK_PHASE2, pending_sql="llm_extracted_tables IS NULL")
+        leases.start()                          # heartbeat thread
+        if leases.claim(contract_id):
+            ...                                 # process, save the result
+            leases.release(contract_id)         # or writer.submit(RELEASE_SQL, leases.release_params(id))
+        leases.stop()                           # releases whatever is still held
+    """
+
+    def __init__(self, db_path, task, pending_sql=None, owner=None, lease_seconds=LEASE_SECONDS, run_id=None):
+        """
+        Args:
+            db_path: Database path
+            task: Lease namespace (TASK_PHASE1, TASK_PHASE2, TASK_AISTUDIO)
+            pending_sql: Condition on contracts a row must still meet to be
+                claimed (e.g. "llm_extracted_tables IS NULL") - None = any row
+                not finished by this run
+            owner: Owner id (default: host:pid:random)
+            lease_seconds: Lease length; the heartbeat renews it every third of that
+            run_id: Run id shared by cooperating processes (default: WORK_RUN_ID
+                or the owner id)
+        """
+        self.db_path = db_path
+        self.task = task
+        self.owner = owner or default_owner()
+        self.run_id = run_id or RUN_ID or self.owner
+        self.started_at = time.time()
+        self.lease_seconds = lease_seconds
+        self.claim_sql = CLAIM_SQL.format(pending=pending_sql or "1")
+        self.claimed = 0
+        self.skipped = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def claim(self, contract_id):
+        """Claim a contract (blocking - run it off the event loop)
+
+        Returns:
+            bool: True if this process now holds the lease
+        """
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                cursor = conn.execute(self.claim_sql, (
+                    self.task, contract_id, self.owner, now, now, now + self.lease_seconds, self.run_id,
+                    contract_id, self.started_at
+                ))
+            claimed = cursor.rowcount == 1
+        finally:
+            conn.close()
+
+        if claimed:
+            self.claimed += 1
+        else:
+            self.skipped += 1
+        return claimed
+
+    def release_params(self, contract_id):
+        """Parameters for RELEASE_SQL (to release through a BatchedDBWriter, after the result)"""
+        now = time.time()
+        return (now, now, self.task, contract_id, self.owner)
+
+    def release(self, contract_id):
+        """Mark a contract done right away"""
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.execute(RELEASE_SQL, self.release_params(contract_id))
+        finally:
+            conn.close()
+
+    def renew(self):
+        """Extend every lease this process holds
+
+        Returns:
+            int: Leases renewed
+        """
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                cursor = conn.execute("""
+                    UPDATE work_leases SET heartbeat_at = ?, lease_expires_at = ?
+                    WHERE task = ? AND claimed_by = ? AND done_at IS NULL
+                """, (now, now + self.lease_seconds, self.task, self.owner))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _heartbeat(self):
+        while not self.stop_event.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                # A missed beat is fine - the lease still has two thirds left
+                print(f"[WARNING] Lease heartbeat failed: {e}")
+
+    def start(self):
+        """Start the heartbeat thread"""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._heartbeat, name=f"lease-heartbeat-{self.task}", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the heartbeat and drop every lease still held (claimed but not finished)"""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM work_leases WHERE task = ? AND claimed_by = ? AND done_at IS NULL",
+                             (self.task, self.owner))
+        finally:
+            conn.close()
+
+    def stats(self):
+        return {'owner': self.owner, 'claimed': self.claimed, 'skipped': self.skipped}
+
+def lease_summary(conn):
+    """Active and expired leases per task (done markers excluded): {task: (active, expired)}"""
+    now = time.time()
+    summary = {}
+    for task, active, expired in conn.execute("""
+        SELECT task, SUM(lease_expires_at >= ?), SUM(lease_expires_at < ?)
+        FROM work_leases WHERE done_at IS NULL GROUP BY task
+    """, (now, now)):
+        summary[task] = (active or 0, expired or 0)
+    return summary
@@ -0,0 +1,248 @@
+"""
+Local stand-in for the Document AI and Cloud Storage APIs
+Serves :process with canned results from samples/export_*/raw_json.json,
+emulates the batchProcess long-running operation lifecycle (RUNNING →
+SUCCEEDED) with output shards readable through the Cloud Storage JSON API,
+and injects latency, 429 bursts, timeouts and malformed bodies on request.
+
+Usage:
+    python standins/docai_server.py --port 8081 --latency-ms 3000 --latency-sigma 0.5 \\
+        --burst-every 60 --burst-seconds 5 --rate-timeout 0.01
+
+    DOCAI_BASE_URL=http://127.0.0.1:8081 GCS_API_URL=http://127.0.0.1:8081 DOCAI_STATIC_TOKEN=local \\
+        python main_extraction_pipeline_async.py --limit 50
+
+    GET /_stats returns the injected outcome counts.
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import ThreadingHTTPServer
+
+from faults import FaultInjectingHandler, add_fault_arguments, injector_from_args
+
+SAMPLES_DIR = Path(__file__).parent.parent / "samples"
+
+def load_canned_documents(samples_dir=SAMPLES_DIR):
+    """Load every samples/export_*/raw_json.json as a Document dict"""
+    documents = []
+    for path in sorted(Path(samples_dir).glob("export_*/raw_json.json")):
+        with open(path, encoding='utf-8') as f:
+            response = json.load(f)
+        documents.append(response.get('document', response))
+
+    if not documents:
+        raise FileNotFoundError(f"No samples/export_*/raw_json.json found in {samples_dir}")
+    return documents
+
+class DocAIStandIn:
+    """In-memory state of the stand-in: operations and stored GCS objects"""
+
+    def __init__(self, documents, operation_seconds=5.0, failure_rate=0.0):
+        """
+        Args:
+            documents: Canned Document dicts served as results
+            operation_seconds: How long each operation stays RUNNING
+            failure_rate: Fraction of documents reported as failed
+        """
+        self.documents = documents
+        self.operation_seconds = operation_seconds
+        self.failure_rate = failure_rate
+        self.operations = {}
+        self.objects = {}  # (bucket, name) -> dict
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def canned_document(self, key):
+        """Pick a canned document deterministically for an input URI"""
+        index = int(hashlib.sha256(key.encode('utf-8')).hexdigest(), 16) % len(self.documents)
+        return self.documents[index]
+
+    def create_operation(self, body):
+        """Register a batchProcess request and return its operation"""
+        documents = body['inputDocuments']['gcsDocuments']['documents']
+        output_uri = body['documentOutputConfig']['gcsOutputConfig']['gcsUri']
+
+        with self.lock:
+            operation_id = str(self.next_id)
+            self.next_id += 1
+            self.operations[operation_id] = {
+                'name': f"projects/local/locations/eu/operations/{operation_id}",
+                'created': time.time(),
+                'inputs': [doc['gcsUri'] for doc in documents],
+                'output_uri': output_uri if output_uri.endswith('/') else output_uri + '/',
+                'statuses': None
+            }
+            return self.operation_json(operation_id)
+
+    def operation_json(self, operation_id):
+        """Current state of an operation, finishing it once its time is up"""
+        operation = self.operations[operation_id]
+
+        if time.time() - operation['created'] < self.operation_seconds:
+            return {'name': operation['name'], 'done': False, 'metadata': {'state': 'RUNNING'}}
+
+        if operation['statuses'] is None:
+            operation['statuses'] = self.finish_operation(operation_id, operation)
+
+        return {
+            'name': operation['name'],
+            'done': True,
+            'metadata': {
+                'state': 'SUCCEEDED',
+                'individualProcessStatuses': operation['statuses']
+            }
+        }
+
+    def finish_operation(self, operation_id, operation):
+        """Write output shards for every input and return the per-document statuses"""
+        statuses = []
+        for index, gcs_uri in enumerate(operation['inputs']):
+            if random.random() < self.failure_rate:
+                statuses.append({
+                    'inputGcsSource': gcs_uri,
+                    'status': {'code': 3, 'message': 'Injected failure: document could not be processed'}
+                })
+                continue
+
+            destination = f"{operation['output_uri']}{operation_id}/{index}"
+            bucket, _, prefix = destination[len('gs://'):].partition('/')
+            shard = dict(self.canned_document(gcs_uri))
+            shard['shardInfo'] = {'shardIndex': '0', 'shardCount': '1'}
+            self.objects[(bucket, f"{prefix}/{Path(gcs_uri).stem}-0.json")] = shard
+
+            statuses.append({
+                'inputGcsSource': gcs_uri,
+                'status': {},
+                'outputGcsDestination': destination
+            })
+        return statuses
+
+    def list_objects(self, bucket, prefix):
+        """Object names in a bucket under a prefix"""
+        with self.lock:
+            return sorted(name for b, name in self.objects if b == bucket and name.startswith(prefix))
+
+    def get_object(self, bucket, name):
+        """Stored object or None"""
+        with self.lock:
+            return self.objects.get((bucket, name))
+
+class StandInHandler(FaultInjectingHandler):
+    """Routes Document AI and Cloud Storage requests to the shared DocAIStandIn
+
+    Faults are injected on :process and :batchProcess only - operation polls
+    and output reads always succeed.
+    """
+
+    standin = None
+    OPERATION_PATH = re.compile(r'^/v1/projects/[^/]+/locations/[^/]+/operations/([^/]+)$')
+    OBJECTS_PATH = re.compile(r'^/storage/v1/b/([^/]+)/o$')
+    OBJECT_PATH = re.compile(r'^/storage/v1/b/([^/]+)/o/(.+)$')
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            self.send_error_json(400, f"Invalid JSON: {e}", 'INVALID_ARGUMENT')
+            return
+
+        if path.endswith(':process'):
+            document = body.get('rawDocument') or body.get('gcsDocument')
+            if not document:
+                self.send_error_json(400, "rawDocument or gcsDocument is required", 'INVALID_ARGUMENT')
+                return
+            key = document.get('gcsUri') or document.get('content', '')[:4096]
+            self.send_with_faults({
+                'document': self.standin.canned_document(key),
+                'humanReviewStatus': {'state': 'SKIPPED'}
+            })
+            return
+
+        if path.endswith(':batchProcess'):
+            try:
+                body['inputDocuments']['gcsDocuments']['documents']
+                body['documentOutputConfig']['gcsOutputConfig']['gcsUri']
+            except (KeyError, TypeError) as e:
+                self.send_error_json(400, f"Invalid batchProcess request: missing {e}", 'INVALID_ARGUMENT')
+                return
+            # Rejected requests (429 / 500) don't create an operation
+            self.send_with_faults(lambda: self.standin.create_operation(body))
+            return
+
+        self.send_error_json(404, f"Unknown path {path}", 'NOT_FOUND')
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path == '/_stats':
+            self.send_stats()
+            return
+
+        match = self.OPERATION_PATH.match(parsed.path)
+        if match:
+            operation_id = match.group(1)
+            with self.standin.lock:
+                if operation_id not in self.standin.operations:
+                    self.send_error_json(404, 'Operation not found', 'NOT_FOUND')
+                    return
+                payload = self.standin.operation_json(operation_id)
+            self.send_json(200, payload)
+            return
+
+        match = self.OBJECTS_PATH.match(parsed.path)
+        if match:
+            prefix = query.get('prefix', [''])[0]
+            names = self.standin.list_objects(match.group(1), prefix)
+            self.send_json(200, {'items': [{'name': name} for name in names]})
+            return
+
+        match = self.OBJECT_PATH.match(parsed.path)
+        if match:
+            obj = self.standin.get_object(match.group(1), unquote(match.group(2)))
+            if obj is None:
+                self.send_error_json(404, 'No such object', 'NOT_FOUND')
+            else:
+                self.send_json(200, obj)
+            return
+
+        self.send_error_json(404, f"Unknown path {parsed.path}", 'NOT_FOUND')
+
+def serve(host='127.0.0.1', port=8081, operation_seconds=5.0, failure_rate=0.0, faults=None):
+    """Start the stand-in server (blocking)"""
+    StandInHandler.standin = DocAIStandIn(load_canned_documents(), operation_seconds, failure_rate)
+    if faults is not None:
+        StandInHandler.faults = faults
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    print(f"[OK] Document AI stand-in listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Local Document AI / Cloud Storage stand-in server')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8081, help='Port (default: 8081)')
+    parser.add_argument('--operation-seconds', type=float, default=5.0,
+                        help='Seconds each batch operation stays RUNNING (default: 5)')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='Fraction of batch documents reported as failed (default: 0)')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.operation_seconds, args.failure_rate, injector_from_args(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Fault injection shared by the local stand-in servers
+Latency distribution, 429 bursts, hung requests (client timeouts), 500s and
+malformed bodies, all configurable from the command line
+"""
+import json
+import time
+import math
+import random
+import threading
+from http.server import BaseHTTPRequestHandler
+
+OK = "ok"
+RATE_LIMITED = "429"
+SERVER_ERROR = "500"
+TIMEOUT = "timeout"
+MALFORMED = "malformed"
+
+class FaultInjector:
+    """Decides, per request, how long to wait and which fault (if any) to inject
+
+    Latency is lognormal around latency_ms (latency_sigma 0 = fixed). 429s
+    come from a per-request probability and from periodic bursts where every
+    request is rejected, like a quota window running out.
+    """
+
+    def __init__(self, latency_ms=0.0, latency_sigma=0.0, rate_429=0.0, burst_every=0.0, burst_seconds=0.0,
+                 rate_500=0.0, rate_timeout=0.0, hang_seconds=150.0, rate_malformed=0.0, seed=None):
+        """
+        Args:
+            latency_ms: Median response latency
+            latency_sigma: Lognormal sigma (0.5 gives a p99 around 3x the median)
+            rate_429: Probability of a 429 outside bursts
+            burst_every: Start a 429 burst every N seconds (0 = no bursts)
+            burst_seconds: Length of each burst
+            rate_500: Probability of a 500
+            rate_timeout: Probability of hanging for hang_seconds without answering
+            hang_seconds: How long hung requests hang (above the client timeout)
+            rate_malformed: Probability of a 200 with a truncated JSON body
+            seed: Random seed for reproducible runs
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.rate_500 = rate_500
+        self.rate_timeout = rate_timeout
+        self.hang_seconds = hang_seconds
+        self.rate_malformed = rate_malformed
+        self.random = random.Random(seed)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.counts = {OK: 0, RATE_LIMITED: 0, SERVER_ERROR: 0, TIMEOUT: 0, MALFORMED: 0}
+
+    def in_burst(self):
+        """True while a 429 burst is active"""
+        if not self.burst_every or not self.burst_seconds:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_seconds
+
+    def latency(self):
+        """Sample a response latency in seconds"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        with self.lock:
+            return self.latency_ms / 1000 * math.exp(self.random.gauss(0, self.latency_sigma))
+
+    def decide(self):
+        """Pick the outcome of one request"""
+        with self.lock:
+            roll = self.random.random()
+
+            if self.in_burst():
+                outcome = RATE_LIMITED
+            elif roll < self.rate_429:
+                outcome = RATE_LIMITED
+            elif roll < self.rate_429 + self.rate_500:
+                outcome = SERVER_ERROR
+            elif roll < self.rate_429 + self.rate_500 + self.rate_timeout:
+                outcome = TIMEOUT
+            elif roll < self.rate_429 + self.rate_500 + self.rate_timeout + self.rate_malformed:
+                outcome = MALFORMED
+            else:
+                outcome = OK
+
+            self.counts[outcome] += 1
+            return outcome
+
+    def stats(self):
+        """Outcome counts so far"""
+        with self.lock:
+            return dict(self.counts)
+
+def add_fault_arguments(parser):
+    """Add the fault-injection options to an argparse parser"""
+    group = parser.add_argument_group('fault injection')
+    group.add_argument('--latency-ms', type=float, default=0.0, help='Median response latency in ms (default: 0)')
+    group.add_argument('--latency-sigma', type=float, default=0.0,
+                       help='Lognormal latency spread, 0 = fixed (default: 0)')
+    group.add_argument('--rate-429', type=float, default=0.0, help='Probability of a 429 (default: 0)')
+    group.add_argument('--burst-every', type=float, default=0.0,
+                       help='Start a 429 burst every N seconds (default: off)')
+    group.add_argument('--burst-seconds', type=float, default=0.0, help='Length of each 429 burst in seconds')
+    group.add_argument('--rate-500', type=float, default=0.0, help='Probability of a 500 (default: 0)')
+    group.add_argument('--rate-timeout', type=float, default=0.0,
+                       help='Probability of hanging without answering (default: 0)')
+    group.add_argument('--hang-seconds', type=float, default=150.0,
+                       help='How long hung requests hang (default: 150, above the 120s client timeout)')
+    group.add_argument('--rate-malformed', type=float, default=0.0,
+                       help='Probability of a truncated JSON body (default: 0)')
+    group.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+
+def injector_from_args(args):
+    """Build a FaultInjector from parsed add_fault_arguments options"""
+    return FaultInjector(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_429=args.rate_429,
+        burst_every=args.burst_every,
+        burst_seconds=args.burst_seconds,
+        rate_500=args.rate_500,
+        rate_timeout=args.rate_timeout,
+        hang_seconds=args.hang_seconds,
+        rate_malformed=args.rate_malformed,
+        seed=args.seed
+    )
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    """Request handler base with JSON helpers and fault injection
+
+    Subclasses set `faults` (a FaultInjector) and call send_with_faults()
+    for endpoints that should misbehave. GET /_stats returns the counts.
+    """
+
+    faults = FaultInjector()
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_body(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+    def send_error_json(self, status, message, error_status=None):
+        """Google / OpenAI style error body"""
+        self.send_json(status, {'error': {'code': status, 'message': message, 'status': error_status or ''}})
+
+    def send_stats(self):
+        self.send_json(200, self.faults.stats())
+
+    def send_with_faults(self, payload):
+        """Send payload after the injected latency, or inject a fault instead
+
+        payload may be a callable, only evaluated if a body is actually sent.
+        """
+        outcome = self.faults.decide()
+
+        if outcome == TIMEOUT:
+            # Hold the connection past the client timeout, then drop it
+            time.sleep(self.faults.hang_seconds)
+            self.close_connection = True
+            return
+
+        time.sleep(self.faults.latency())
+
+        if outcome == RATE_LIMITED:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            body = json.dumps({'error': {'code': 429, 'message': 'Quota exceeded (injected)',
+                                         'status': 'RESOURCE_EXHAUSTED'}}).encode('utf-8')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif outcome == SERVER_ERROR:
+            self.send_error_json(500, 'Internal error (injected)', 'INTERNAL')
+        elif outcome == MALFORMED:
+            payload = payload() if callable(payload) else payload
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_body(200, body[:max(1, len(body) // 2)])
+        else:
+            self.send_json(200, payload() if callable(payload) else payload)
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the OpenAI-compatible chat completions API
+Answers /v1/chat/completions with canned results from
+samples/export_*/llm_extraction.json and injects latency, 429 bursts,
+timeouts and malformed bodies on request (see faults.py).
+
+Usage:
+    python standins/openai_server.py --port 8082 --latency-ms 20000 --latency-sigma 0.4 --rate-429 0.05
+
+    OPENAI_BASE_URL=http://127.0.0.1:8082/v1 OPENAI_API_KEY=local \\
+        python llm_extract_tables_openai.py --limit 50
+
+    GET /_stats returns the injected outcome counts.
+"""
+import json
+import time
+import uuid
+import hashlib
+import argparse
+from pathlib import Path
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer
+
+from faults import FaultInjectingHandler, add_fault_arguments, injector_from_args
+
+SAMPLES_DIR = Path(__file__).parent.parent / "samples"
+
+def load_canned_completions(samples_dir=SAMPLES_DIR):
+    """Load every samples/export_*/llm_extraction.json as a response text"""
+    completions = []
+    for path in sorted(Path(samples_dir).glob("export_*/llm_extraction.json")):
+        completions.append(path.read_text(encoding='utf-8'))
+
+    if not completions:
+        raise FileNotFoundError(f"No samples/export_*/llm_extraction.json found in {samples_dir}")
+    return completions
+
+class ChatCompletionsHandler(FaultInjectingHandler):
+    """Serves chat completions from the canned samples"""
+
+    completions = []
+
+    def completion(self, body):
+        """Build a chat.completion response for a request body"""
+        messages = body.get('messages', [])
+        prompt = "".join(str(message.get('content', '')) for message in messages)
+
+        # Same prompt → same canned answer, so reruns are reproducible
+        index = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16) % len(self.completions)
+        content = self.completions[index]
+
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'standin'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': len(prompt) // 4,
+                'completion_tokens': len(content) // 4,
+                'total_tokens': (len(prompt) + len(content)) // 4
+            }
+        }
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if not path.endswith('/chat/completions'):
+            self.send_error_json(404, f"Unknown path {path}", 'not_found')
+            return
+
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            self.send_error_json(400, f"Invalid JSON: {e}", 'invalid_request_error')
+            return
+
+        if not body.get('messages'):
+            self.send_error_json(400, "messages is required", 'invalid_request_error')
+            return
+
+        self.send_with_faults(lambda: self.completion(body))
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/_stats':
+            self.send_stats()
+            return
+        self.send_error_json(404, f"Unknown path {self.path}", 'not_found')
+
+def serve(host='127.0.0.1', port=8082, faults=None):
+    """Start the stand-in server (blocking)"""
+    ChatCompletionsHandler.completions = load_canned_completions()
+    if faults is not None:
+        ChatCompletionsHandler.faults = faults
+    server = ThreadingHTTPServer((host, port), ChatCompletionsHandler)
+    print(f"[OK] OpenAI stand-in listening on http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible chat completions stand-in server')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8082, help='Port (default: 8082)')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, injector_from_args(args))
+
+if __name__ == "__main__":
+    main()
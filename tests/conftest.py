@@ -0,0 +1,42 @@
+"""Make the pipeline modules importable the way the scripts do (src/, src/google_docai/, database_scripts/, standins/)"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+for path in (ROOT, ROOT / 'src', ROOT / 'src' / 'google_docai', ROOT / 'database_scripts', ROOT / 'standins'):
+    sys.path.insert(0, str(path))
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Factory writing a small PDF: one page per entry, a list of text lines
+    (Helvetica text layer) or None for a page without text (like a scan)"""
+    from PyPDF2 import PdfWriter, PageObject
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    def make(pages, name='test.pdf'):
+        writer = PdfWriter()
+        for lines in pages:
+            page = PageObject.create_blank_page(width=612, height=792)
+            if lines:
+                stream = DecodedStreamObject()
+                ops = ['BT /F1 10 Tf 50 750 Td 12 TL'] + [f'({line}) Tj T*' for line in lines] + ['ET']
+                stream.set_data('\n'.join(ops).encode('latin-1'))
+                font = DictionaryObject({
+                    NameObject('/Type'): NameObject('/Font'),
+                    NameObject('/Subtype'): NameObject('/Type1'),
+                    NameObject('/BaseFont'): NameObject('/Helvetica'),
+                })
+                page[NameObject('/Contents')] = stream
+                page[NameObject('/Resources')] = DictionaryObject({
+                    NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+                })
+            writer.add_page(page)
+
+        path = tmp_path / name
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return path
+
+    return make
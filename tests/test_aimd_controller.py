@@ -0,0 +1,92 @@
+"""AIMDController limits, additive increase and multiplicative decrease"""
+import asyncio
+
+from aimd_controller import AIMDController
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+def test_acquire_blocks_at_the_limit():
+    async def scenario():
+        controller = AIMDController(initial=2, max_limit=2)
+        await controller.acquire()
+        await controller.acquire()
+
+        third = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        assert not third.done()
+
+        await controller.release(0.1)
+        await asyncio.wait_for(third, timeout=1)
+        assert controller.in_flight == 2
+
+    run(scenario())
+
+def test_healthy_window_increases_limit():
+    async def scenario():
+        controller = AIMDController(initial=2, max_limit=3)
+        for _ in range(2):
+            await controller.acquire()
+            await controller.release(0.1)
+        assert controller.limit == 3
+
+        # Capped at max_limit
+        for _ in range(3):
+            await controller.acquire()
+            await controller.release(0.1)
+        assert controller.limit == 3
+
+    run(scenario())
+
+def test_throttle_halves_limit_once_per_cooldown():
+    async def scenario():
+        controller = AIMDController(initial=8, min_limit=1, cooldown=60)
+        await controller.acquire()
+        await controller.release(throttled=True)
+        assert controller.limit == 4
+
+        # Same burst: within the cooldown, no second decrease
+        controller.record_throttle()
+        assert controller.limit == 4
+        assert controller.summary()['backoffs'] == 1
+
+    run(scenario())
+
+def test_decrease_stops_at_min_limit():
+    controller = AIMDController(initial=3, min_limit=2, cooldown=0)
+    for _ in range(3):
+        controller.record_throttle()
+    assert controller.limit == 2
+
+def test_latency_regression_stops_growth():
+    async def scenario():
+        controller = AIMDController(initial=2, max_limit=50, latency_window=5)
+        for _ in range(5):
+            await controller.acquire()
+            await controller.release(0.1)
+        limit = controller.limit
+
+        # Median latency far above the best seen - no more increases
+        for _ in range(10):
+            await controller.acquire()
+            await controller.release(5.0)
+        assert controller.limit == limit
+
+    run(scenario())
+
+def test_release_wakes_waiters_after_decrease():
+    async def scenario():
+        controller = AIMDController(initial=2, min_limit=1, cooldown=0)
+        await controller.acquire()
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+
+        # Limit drops to 1: the waiter needs both slots back
+        await controller.release(throttled=True)
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        await controller.release(0.1)
+        await asyncio.wait_for(waiter, timeout=1)
+
+    run(scenario())
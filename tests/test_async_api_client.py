@@ -0,0 +1,87 @@
+"""AsyncLayoutParserClient retries, throttle signals and token refresh on 401"""
+import asyncio
+
+import httpx
+import pytest
+
+import token_provider
+from async_api_client import AsyncLayoutParserClient
+
+BODY = {'rawDocument': {'content': 'JVBERi0=', 'mimeType': 'application/pdf'}}
+
+class StaticCredentials:
+    """Credentials without expiry (like the local stand-ins); every refresh is a new token"""
+
+    def __init__(self):
+        self.refreshes = 0
+        self.token = None
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+
+@pytest.fixture(autouse=True)
+def no_google_request(monkeypatch):
+    monkeypatch.setattr(token_provider, '_request', lambda: None)
+
+def call(statuses, **kwargs):
+    """Run process_body against a mock transport answering with `statuses` in turn
+
+    Returns:
+        tuple: (result or raised exception, seen Authorization headers, throttle count)
+    """
+    seen, throttles = [], []
+
+    def handler(request):
+        seen.append(request.headers['Authorization'])
+        status = statuses[min(len(seen), len(statuses)) - 1]
+        return httpx.Response(status, json={'document': {}} if status == 200 else {'error': f'status {status}'})
+
+    async def scenario():
+        client = AsyncLayoutParserClient(StaticCredentials(), retry_delay=0, on_throttle=lambda: throttles.append(1),
+                                         **kwargs)
+        client.tokens.cache_path = None  # Keep the user's token cache file out of it
+        client.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            try:
+                return await client.process_body(BODY)
+            except Exception as e:
+                return e
+
+    return asyncio.run(scenario()), seen, len(throttles)
+
+def test_success_returns_the_response_json():
+    result, seen, throttles = call([200])
+    assert result == {'document': {}}
+    assert seen == ['Bearer token-1'] and throttles == 0
+
+def test_429_is_retried_and_reported():
+    result, seen, throttles = call([429, 429, 200], max_retries=3)
+    assert result == {'document': {}}
+    assert len(seen) == 3 and throttles == 2
+
+def test_429_after_all_retries_raises():
+    result, seen, _ = call([429], max_retries=2)
+    assert isinstance(result, Exception) and 'Rate limit exceeded' in str(result)
+    assert len(seen) == 2
+
+def test_401_refreshes_the_token_once():
+    result, seen, _ = call([401, 200])
+    assert result == {'document': {}}
+    assert seen == ['Bearer token-1', 'Bearer token-2']
+
+def test_api_error_includes_the_response_text():
+    result, seen, _ = call([400])
+    assert isinstance(result, Exception) and 'API error 400' in str(result) and 'status 400' in str(result)
+    assert len(seen) == 1
+
+def test_rate_limiter_is_charged_per_attempt():
+    charged = []
+
+    class Limiter:
+        async def acquire_async(self, name, amount=1):
+            charged.append((name, amount))
+            return 0.0
+
+    call([429, 200], rate_limiter=Limiter())
+    assert charged == [('docai_requests', 1), ('docai_bytes', 8)] * 2
@@ -0,0 +1,95 @@
+"""Batch client URI helpers and the batchProcess round trip against the local stand-in"""
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api_client
+import batch_client
+import token_provider
+from batch_client import BatchLayoutParserClient, to_gcs_uri, split_gcs_uri
+from docai_server import DocAIStandIn, StandInHandler
+
+class StaticCredentials:
+    """Credentials without expiry, like the DOCAI_STATIC_TOKEN setup"""
+
+    token = 'local'
+
+    def refresh(self, request):
+        pass
+
+def layout(*texts):
+    return {'documentLayout': {'blocks': [{'textBlock': {'text': text}} for text in texts]}}
+
+@pytest.fixture
+def standin(monkeypatch):
+    """Stand-in server on a free port with the clients pointed at it"""
+    state = DocAIStandIn([layout('canned')], operation_seconds=0)
+    monkeypatch.setattr(StandInHandler, 'standin', state)
+    monkeypatch.setattr(StandInHandler, 'log_message', lambda *args: None)
+    monkeypatch.setattr(token_provider, '_request', lambda: None)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(api_client, 'DOCAI_BASE_URL', base_url)
+    monkeypatch.setattr(api_client, 'BATCH_ENDPOINT_URL', f"{base_url}/v1/projects/local/locations/eu/processors/p:batchProcess")
+    monkeypatch.setattr(batch_client, 'GCS_API_URL', base_url)
+    yield state
+
+    server.shutdown()
+    server.server_close()
+
+def client():
+    batch = BatchLayoutParserClient(StaticCredentials(), output_uri='gs://out-bucket/batch', poll_interval=0)
+    batch.tokens.cache_path = None
+    return batch
+
+def test_to_gcs_uri():
+    assert to_gcs_uri('gs://bucket/a.pdf') == 'gs://bucket/a.pdf'
+    assert to_gcs_uri('https://storage.cloud.google.com/bucket/dir/a%20b.pdf') == 'gs://bucket/dir/a b.pdf'
+    assert to_gcs_uri('https://storage.googleapis.com/bucket/a.pdf') == 'gs://bucket/a.pdf'
+    assert to_gcs_uri('https://storage.googleapis.com/bucket-only') is None
+    assert to_gcs_uri('https://example.com/bucket/a.pdf') is None
+    assert to_gcs_uri('') is None
+    assert to_gcs_uri(None) is None
+    assert to_gcs_uri(float('nan')) is None  # Empty CSV cell
+
+def test_split_gcs_uri():
+    assert split_gcs_uri('gs://bucket/dir/file.json') == ('bucket', 'dir/file.json')
+    assert split_gcs_uri('gs://bucket') == ('bucket', '')
+
+def test_individual_statuses_of_an_unfinished_operation():
+    assert BatchLayoutParserClient.individual_statuses({'done': False}) == []
+    statuses = [{'inputGcsSource': 'gs://b/a.pdf', 'status': {}}]
+    operation = {'metadata': {'individualProcessStatuses': statuses}}
+    assert BatchLayoutParserClient.individual_statuses(operation) == statuses
+
+def test_submit_wait_and_read_output(standin):
+    batch = client()
+    operation_name = batch.submit(['gs://in/a.pdf', 'gs://in/b.pdf'])
+    operation = batch.wait(operation_name, max_wait=10)
+
+    statuses = batch.individual_statuses(operation)
+    assert [status['inputGcsSource'] for status in statuses] == ['gs://in/a.pdf', 'gs://in/b.pdf']
+    for status in statuses:
+        assert status['outputGcsDestination'].startswith('gs://out-bucket/batch/')
+        response = batch.read_output(status['outputGcsDestination'])
+        assert response == {'document': layout('canned')}
+
+def test_read_output_rejoins_shards_in_order(standin):
+    # Listing order (by name) differs from shard order
+    for index, name in ((2, 'doc-10.json'), (0, 'doc-2.json'), (1, 'doc-5.json')):
+        shard = layout(f"block {index}")
+        shard['shardInfo'] = {'shardIndex': str(index), 'shardCount': '3'}
+        standin.objects[('out-bucket', f"batch/run/0/{name}")] = shard
+
+    response = client().read_output('gs://out-bucket/batch/run/0')
+    texts = [block['textBlock']['text'] for block in response['document']['documentLayout']['blocks']]
+    assert texts == ['block 0', 'block 1', 'block 2']
+
+def test_read_output_without_shards(standin):
+    with pytest.raises(Exception, match='No output shards'):
+        client().read_output('gs://out-bucket/batch/missing/0')
@@ -0,0 +1,44 @@
+"""compress_json_columns: pack pointers stay put, every codec column is migrated"""
+import sqlite3
+
+import json_codec
+from response_pack import ResponsePackWriter
+from compress_json_columns import convert, migrate_column
+
+def pack_pointer(tmp_path):
+    writer = ResponsePackWriter(pack_dir=tmp_path)
+    return writer.append('contract-1', json_codec.dumps({'document': {'text': 'x' * 1000}}))
+
+def test_convert_skips_pack_pointers(tmp_path):
+    pointer = pack_pointer(tmp_path)
+    assert json_codec.is_pack_pointer(pointer)
+    for codec in ('zstd', 'gzip', 'none'):
+        assert convert(pointer, codec, decompress=False) is None
+    assert convert(pointer, 'gzip', decompress=True) is None
+
+def test_convert_still_rewrites_inline_values():
+    text = '{"a": 1}'
+    assert convert(text, 'gzip', decompress=False)[:1] == json_codec.TAG_GZIP
+    assert convert(json_codec.encode(text, 'gzip'), 'gzip', decompress=True) == text
+
+def test_migrate_column_keeps_pointer_rows(tmp_path):
+    pointer = pack_pointer(tmp_path)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, raw_json BLOB)")
+    conn.execute("INSERT INTO contracts VALUES ('contract-1', ?)", (pointer,))
+    conn.execute("INSERT INTO contracts VALUES ('contract-2', ?)", ('{"b": 2}',))
+
+    for decompress in (False, True):
+        migrate_column(conn, 'raw_json', 'gzip', decompress)
+        stored = conn.execute("SELECT raw_json FROM contracts WHERE id = 'contract-1'").fetchone()[0]
+        assert bytes(stored) == bytes(pointer)
+
+def test_table_blocks_json_is_migrated_both_ways():
+    assert 'table_blocks_json' in json_codec.JSON_COLUMNS
+    text = '{"tableBlocks": []}'
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, table_blocks_json BLOB)")
+    conn.execute("INSERT INTO contracts VALUES ('contract-1', ?)", (json_codec.encode(text, 'gzip'),))
+
+    migrate_column(conn, 'table_blocks_json', 'gzip', decompress=True)
+    assert conn.execute("SELECT table_blocks_json FROM contracts").fetchone()[0] == text
@@ -0,0 +1,18 @@
+"""CSV cell parsing for load_csv_data"""
+import pytest
+
+from csv_values import parse_year
+
+@pytest.mark.parametrize('value, expected', [
+    ('2016', 2016),
+    ('2016.0', 2016),     # pandas export of a year column with blanks
+    (' 2023 ', 2023),
+    ('', None),
+    (' ', None),
+    ('n/a', None),
+    ('nan', None),
+    ('inf', None),
+    (None, None),
+])
+def test_parse_year(value, expected):
+    assert parse_year(value) == expected
@@ -0,0 +1,58 @@
+"""connect(): WAL mode, pragmas and read-only connections"""
+import sqlite3
+import threading
+
+import pytest
+
+import db_connection
+from db_connection import connect
+
+def make_db(tmp_path):
+    db_path = tmp_path / 'test.db'
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    return db_path, conn
+
+def test_write_connection_uses_wal_and_tuned_pragmas(tmp_path):
+    _, conn = make_db(tmp_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db_connection.BUSY_TIMEOUT_MS
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -db_connection.CACHE_SIZE_KB
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+def test_readonly_connection_cannot_write(tmp_path):
+    db_path, _ = make_db(tmp_path)
+    reader = connect(db_path, readonly=True)
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("INSERT INTO items VALUES (1)")
+
+def test_reader_sees_committed_rows_while_a_write_is_open(tmp_path):
+    db_path, writer = make_db(tmp_path)
+    writer.execute("INSERT INTO items VALUES (1)")
+    writer.commit()
+
+    # WAL: an open write transaction doesn't block readers
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO items VALUES (2)")
+    reader = connect(db_path, readonly=True)
+    assert reader.execute("SELECT id FROM items").fetchall() == [(1,)]
+    writer.commit()
+    assert reader.execute("SELECT id FROM items ORDER BY id").fetchall() == [(1,), (2,)]
+
+def test_connection_can_be_shared_across_threads_when_asked(tmp_path):
+    db_path, _ = make_db(tmp_path)
+    conn = connect(db_path, check_same_thread=False)
+    errors = []
+
+    def use():
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=use)
+    thread.start()
+    thread.join()
+    assert errors == []
@@ -0,0 +1,99 @@
+"""BatchedDBWriter batching, per-statement fallback and callbacks"""
+import sqlite3
+import threading
+
+from db_writer import BatchedDBWriter
+
+INSERT_SQL = "INSERT INTO items (id, value) VALUES (?, ?)"
+
+def make_writer(tmp_path, **kwargs):
+    db_path = tmp_path / 'writer.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+    conn.commit()
+    conn.close()
+    return db_path, BatchedDBWriter(db_path, **kwargs).start()
+
+def rows(db_path):
+    conn = sqlite3.connect(db_path)
+    result = dict(conn.execute("SELECT id, value FROM items").fetchall())
+    conn.close()
+    return result
+
+def test_batches_statements_into_one_transaction(tmp_path):
+    db_path, writer = make_writer(tmp_path, batch_size=10, flush_interval=5)
+    committed = []
+    for i in range(10):
+        writer.submit(INSERT_SQL, (i, f"v{i}"), on_commit=lambda seconds, i=i: committed.append(i))
+    writer.flush()
+
+    assert rows(db_path) == {i: f"v{i}" for i in range(10)}
+    assert writer.stats()['transactions'] == 1
+    assert sorted(committed) == list(range(10))
+    writer.close()
+
+def test_callable_params_run_on_writer_thread(tmp_path):
+    db_path, writer = make_writer(tmp_path)
+    threads = []
+
+    def params():
+        threads.append(threading.current_thread().name)
+        return (1, 'lazy')
+
+    writer.submit(INSERT_SQL, params)
+    writer.close()
+
+    assert rows(db_path) == {1: 'lazy'}
+    assert threads == ['db-writer']
+
+def test_failing_params_call_on_error(tmp_path):
+    db_path, writer = make_writer(tmp_path)
+    errors = []
+
+    def params():
+        raise ValueError("cannot serialize")
+
+    writer.submit(INSERT_SQL, params, on_commit=lambda seconds: errors.append('committed'),
+                  on_error=errors.append)
+    writer.submit(INSERT_SQL, (2, 'ok'))
+    writer.close()
+
+    assert rows(db_path) == {2: 'ok'}
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+    assert writer.stats()['errors'] == 1
+
+def test_sqlite_error_falls_back_to_single_statements(tmp_path):
+    db_path, writer = make_writer(tmp_path, batch_size=10, flush_interval=5)
+    errors, committed = [], []
+    writer.submit(INSERT_SQL, (1, 'first'), on_commit=lambda seconds: committed.append(1))
+    writer.submit(INSERT_SQL, (1, 'duplicate'), on_error=errors.append)
+    writer.submit(INSERT_SQL, (3, 'third'), on_commit=lambda seconds: committed.append(3))
+    writer.flush()
+
+    assert rows(db_path) == {1: 'first', 3: 'third'}
+    assert committed == [1, 3]
+    assert len(errors) == 1 and isinstance(errors[0], sqlite3.IntegrityError)
+    writer.close()
+
+def test_binding_error_keeps_writer_alive(tmp_path):
+    db_path, writer = make_writer(tmp_path, batch_size=10, flush_interval=5)
+    errors = []
+    writer.submit(INSERT_SQL, (2 ** 70, 'too big'), on_error=errors.append)
+    writer.submit(INSERT_SQL, (1, 'fine'))
+    writer.flush()
+
+    # The thread survived: later statements still commit and flush() returns
+    writer.submit(INSERT_SQL, (2, 'after'))
+    writer.flush()
+    writer.close()
+
+    assert rows(db_path) == {1: 'fine', 2: 'after'}
+    assert len(errors) == 1 and isinstance(errors[0], OverflowError)
+
+def test_close_writes_statements_queued_by_callbacks(tmp_path):
+    db_path, writer = make_writer(tmp_path)
+    writer.submit(INSERT_SQL, (1, 'parent'),
+                  on_commit=lambda seconds: writer.submit(INSERT_SQL, (2, 'child')))
+    writer.close()
+
+    assert rows(db_path) == {1: 'parent', 2: 'child'}
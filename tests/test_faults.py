@@ -0,0 +1,60 @@
+"""FaultInjector outcome mix, bursts, latency and the command-line options"""
+import argparse
+
+import faults
+from faults import FaultInjector, add_fault_arguments, injector_from_args
+
+def test_no_faults_by_default():
+    injector = FaultInjector()
+    assert [injector.decide() for _ in range(50)] == [faults.OK] * 50
+    assert injector.latency() == 0.0
+    assert injector.stats()[faults.OK] == 50
+
+def test_seeded_runs_are_reproducible():
+    options = dict(rate_429=0.2, rate_500=0.1, rate_timeout=0.05, rate_malformed=0.05, seed=7)
+    first = FaultInjector(**options)
+    second = FaultInjector(**options)
+    assert [first.decide() for _ in range(200)] == [second.decide() for _ in range(200)]
+
+def test_outcome_mix_follows_the_rates():
+    injector = FaultInjector(rate_429=0.2, rate_500=0.1, rate_timeout=0.1, rate_malformed=0.1, seed=1)
+    for _ in range(5000):
+        injector.decide()
+    counts = injector.stats()
+    assert sum(counts.values()) == 5000
+    assert abs(counts[faults.RATE_LIMITED] / 5000 - 0.2) < 0.03
+    assert abs(counts[faults.SERVER_ERROR] / 5000 - 0.1) < 0.03
+    assert abs(counts[faults.TIMEOUT] / 5000 - 0.1) < 0.03
+    assert abs(counts[faults.MALFORMED] / 5000 - 0.1) < 0.03
+    assert abs(counts[faults.OK] / 5000 - 0.5) < 0.03
+
+def test_burst_rejects_every_request():
+    injector = FaultInjector(burst_every=3600, burst_seconds=3600, seed=1)
+    assert injector.in_burst()
+    assert {injector.decide() for _ in range(20)} == {faults.RATE_LIMITED}
+
+    # A burst length without a period (or the reverse) means no bursts
+    assert not FaultInjector(burst_seconds=5).in_burst()
+    assert not FaultInjector(burst_every=5).in_burst()
+
+def test_latency_is_fixed_without_sigma_and_spread_with_it():
+    assert FaultInjector(latency_ms=250).latency() == 0.25
+
+    injector = FaultInjector(latency_ms=100, latency_sigma=0.5, seed=3)
+    samples = sorted(injector.latency() for _ in range(2001))
+    assert samples[0] > 0
+    assert 0.08 < samples[1000] < 0.12  # Median stays around latency_ms
+    assert samples[-1] > 0.2
+
+def test_injector_from_args():
+    parser = argparse.ArgumentParser()
+    add_fault_arguments(parser)
+    args = parser.parse_args(['--latency-ms', '300', '--rate-429', '0.25', '--burst-every', '60',
+                              '--burst-seconds', '5', '--seed', '9'])
+    injector = injector_from_args(args)
+
+    assert injector.latency() == 0.3
+    assert injector.rate_429 == 0.25
+    assert (injector.burst_every, injector.burst_seconds) == (60, 5)
+    assert injector.hang_seconds == 150.0
+    assert injector.rate_500 == injector.rate_timeout == injector.rate_malformed == 0.0
@@ -0,0 +1,36 @@
+"""Input fingerprints (input_fingerprint) and the rows --changed-only compares"""
+import sqlite3
+
+from input_fingerprint import ensure_fingerprint_columns, fingerprint_rows, input_fingerprint, gcs_document, GCS_POLICY
+
+def make_db(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("""
+        CREATE TABLE contracts (
+            id TEXT PRIMARY KEY, original_pdf_url TEXT, gcs_pdf_path TEXT, extraction_status TEXT
+        )
+    """)
+    ensure_fingerprint_columns(conn)
+    conn.executemany("""
+        INSERT INTO contracts (id, original_pdf_url, extraction_status, input_fingerprint, input_pdf_sha256)
+        VALUES (?, 'https://example.org/a.pdf', ?, ?, 'sha')
+    """, rows)
+    return conn
+
+def test_failed_rerun_drops_the_old_fingerprint():
+    # 'b' succeeded once (fingerprint kept on the row), then failed on a re-run
+    conn = make_db([('a', 'success', 'fp-a'), ('b', 'failed', 'fp-b'), ('c', 'pending', None)])
+
+    stored = {row[0]: row[3] for row in fingerprint_rows(conn)}
+    assert stored == {'a': 'fp-a', 'b': None, 'c': None}
+
+def test_gcs_fingerprint_follows_the_object_generation():
+    uri = 'gs://bucket/contract.pdf'
+    url = 'https://storage.cloud.google.com/bucket/contract.pdf'
+
+    def fingerprint(generation):
+        return input_fingerprint(gcs_document(uri, generation), url, GCS_POLICY, 'processor/v1')
+
+    assert fingerprint('1700000000000001') == fingerprint('1700000000000001')
+    assert fingerprint('1700000000000001') != fingerprint('1700000000000002')  # Object overwritten
+    assert fingerprint(None) != fingerprint('1700000000000001')
@@ -0,0 +1,50 @@
+"""json_codec round trips, legacy TEXT and format tags"""
+import gzip
+
+import pytest
+
+import json_codec
+
+DOC = {'document': {'text': 'Hospital São João ' * 50, 'pages': [{'pageNumber': 1}]}}
+
+@pytest.mark.parametrize('codec', ['gzip', 'none'] + (['zstd'] if json_codec.HAS_ZSTD else []))
+def test_round_trip(codec):
+    stored = json_codec.dumps(DOC, codec)
+    assert json_codec.is_encoded(stored)
+    assert json_codec.loads(stored) == DOC
+    assert json_codec.loads(memoryview(stored)) == DOC
+
+def test_tags_identify_the_codec():
+    assert json_codec.encode('{}', 'gzip')[:1] == json_codec.TAG_GZIP
+    assert json_codec.encode('{}', 'none')[:1] == json_codec.TAG_PLAIN
+
+def test_gzip_output_is_deterministic():
+    assert json_codec.encode('{"a": 1}', 'gzip') == json_codec.encode('{"a": 1}', 'gzip')
+
+def test_gzip_compresses_large_documents():
+    text = json_codec.decode(json_codec.dumps(DOC, 'none'))
+    assert len(json_codec.encode(text, 'gzip')) < len(text.encode('utf-8')) / 5
+
+def test_legacy_text_and_none_pass_through():
+    assert json_codec.decode('{"a": 1}') == '{"a": 1}'
+    assert json_codec.loads('{"a": 1}') == {'a': 1}
+    assert json_codec.decode(None) is None
+    assert json_codec.loads(None) is None
+    assert json_codec.dumps(None) is None
+    assert json_codec.encode(None) is None
+    assert not json_codec.is_encoded('{"a": 1}')
+
+def test_non_ascii_is_stored_as_utf8():
+    stored = json_codec.dumps({'name': 'Coimbra – Unidade'}, 'none')
+    assert 'Coimbra – Unidade'.encode('utf-8') in stored
+
+def test_unknown_tag_and_codec_raise():
+    with pytest.raises(json_codec.CodecError):
+        json_codec.decode(b'X' + gzip.compress(b'{}'))
+    with pytest.raises(json_codec.CodecError):
+        json_codec.encode('{}', 'lz4')
+
+def test_pack_pointer_detection():
+    assert json_codec.is_pack_pointer(json_codec.TAG_PACK + b'pointer')
+    assert not json_codec.is_pack_pointer(json_codec.encode('{}', 'gzip'))
+    assert not json_codec.is_pack_pointer('P-looking text')
@@ -0,0 +1,60 @@
+"""Table-page screening, sub-PDF selection and pageSpan remapping"""
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+from page_screening import score_page, is_candidate, screen_pages, remap_page_spans, prepare_screened_pdf
+
+PROSE = ['This agreement is made between the hospital and the regional health authority.']
+TABLE = ['Item 1 Consultas 1.200,00 EUR', 'Item 2 Cirurgias 3.400,50 EUR', 'Item 3 Urgencias 560,75 EUR',
+         'Total 5.161,25 EUR']
+
+def test_numeric_page_is_a_candidate_and_prose_is_not(make_pdf):
+    reader = PdfReader(str(make_pdf([PROSE, TABLE])))
+    prose, table = (score_page(page) for page in reader.pages)
+
+    assert prose['has_text'] and not is_candidate(prose)
+    assert table['numeric_rows'] >= 3 and table['currency_marks'] >= 2
+    assert is_candidate(table)
+    assert table['score'] > prose['score']
+
+def test_page_without_text_layer_is_always_a_candidate(make_pdf):
+    reader = PdfReader(str(make_pdf([None])))
+    scan = score_page(reader.pages[0])
+    assert not scan['has_text'] and is_candidate(scan)
+
+def test_screen_pages_keeps_candidates_in_document_order(make_pdf):
+    pages, num_pages = screen_pages(str(make_pdf([PROSE, TABLE, PROSE, TABLE])))
+    assert (pages, num_pages) == ([2, 4], 4)
+
+def test_scans_over_the_limit_keep_the_last_pages(make_pdf):
+    # Equal scores everywhere: ties go to the end of the contract, like trim_pdf
+    pages, num_pages = screen_pages(str(make_pdf([None] * 8)), max_pages=3)
+    assert (pages, num_pages) == ([6, 7, 8], 8)
+
+def test_scans_rank_above_text_candidates(make_pdf):
+    pages, _ = screen_pages(str(make_pdf([TABLE, None, TABLE, None])), max_pages=2)
+    assert pages == [2, 4]
+
+def test_prepare_without_candidates_falls_back_to_last_pages(make_pdf):
+    path, page_map = prepare_screened_pdf(str(make_pdf([PROSE] * 5)), max_pages=2)
+    try:
+        assert page_map == [4, 5]
+        assert len(PdfReader(path).pages) == 2
+    finally:
+        Path(path).unlink()
+
+def test_prepare_sends_original_when_every_page_is_selected(make_pdf):
+    pdf_path = str(make_pdf([TABLE, None]))
+    assert prepare_screened_pdf(pdf_path) == (pdf_path, None)
+
+def test_remap_page_spans_to_original_pages():
+    response = {'document': {'documentLayout': {'blocks': [
+        {'blockId': '1', 'pageSpan': {'pageStart': 1, 'pageEnd': 2},
+         'tableBlock': {'bodyRows': [{'cells': [{'pageSpan': {'pageStart': 2, 'pageEnd': 2}}]}]}},
+    ]}}}
+    remap_page_spans(response, [7, 12])
+
+    block = response['document']['documentLayout']['blocks'][0]
+    assert block['pageSpan'] == {'pageStart': 7, 'pageEnd': 12}
+    assert block['tableBlock']['bodyRows'][0]['cells'][0]['pageSpan'] == {'pageStart': 12, 'pageEnd': 12}
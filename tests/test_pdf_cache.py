@@ -0,0 +1,61 @@
+"""PDFCache alias lookups and eviction"""
+from pathlib import Path
+
+from pdf_cache import PDFCache
+
+OLD_URL = 'https://example.org/old.pdf'
+NEW_URL = 'https://example.org/new.pdf'
+
+def add(cache, tmp_path, content, **aliases):
+    path = tmp_path / 'upload.pdf'
+    path.write_bytes(content)
+    return cache.add_file(path, **aliases)
+
+def test_changed_url_does_not_return_old_pdf(tmp_path):
+    cache = PDFCache(cache_dir=tmp_path / 'cache')
+    old_path = add(cache, tmp_path, b'%PDF-1.4 old', url=OLD_URL, contract_id='c1')
+
+    # CSV refresh: same contract, new URL - the contract alias must not answer for it
+    assert cache.lookup(url=NEW_URL, contract_id='c1') is None
+    assert cache.lookup(url=OLD_URL, contract_id='c1') == old_path
+
+    new_path = add(cache, tmp_path, b'%PDF-1.4 new', url=NEW_URL, contract_id='c1')
+    assert cache.lookup(url=NEW_URL, contract_id='c1') == new_path
+    assert cache.lookup(contract_id='c1') == new_path
+
+def test_contract_alias_without_url(tmp_path):
+    cache = PDFCache(cache_dir=tmp_path / 'cache')
+    path = add(cache, tmp_path, b'%PDF-1.4 only by contract', contract_id='c2')
+
+    assert cache.lookup(contract_id='c2') == path
+    assert cache.lookup(url=NEW_URL, contract_id='c2') is None
+
+def test_url_alias_wins_over_contract_alias(tmp_path):
+    cache = PDFCache(cache_dir=tmp_path / 'cache')
+    shared = add(cache, tmp_path, b'%PDF-1.4 shared', url=NEW_URL)
+    add(cache, tmp_path, b'%PDF-1.4 stale', url=OLD_URL, contract_id='c3')
+
+    assert cache.lookup(url=NEW_URL, contract_id='c3') == shared
+
+def test_eviction_skips_pinned_and_recent_files(tmp_path):
+    cache = PDFCache(cache_dir=tmp_path / 'cache', max_bytes=1, grace_seconds=0)
+    pinned = add(cache, tmp_path, b'%PDF-1.4 in use', url=OLD_URL)
+    cache.pin(pinned)
+    unpinned = add(cache, tmp_path, b'%PDF-1.4 done', url=NEW_URL)
+
+    # Adding another file evicts everything over the cap except pinned / just-added ones
+    add(cache, tmp_path, b'%PDF-1.4 newest', contract_id='c4')
+    assert Path(pinned).exists()
+    assert not Path(unpinned).exists()
+
+    cache.unpin(pinned)
+    add(cache, tmp_path, b'%PDF-1.4 after unpin', contract_id='c5')
+    assert not Path(pinned).exists()
+
+def test_eviction_grace_window_protects_recent_files(tmp_path):
+    cache = PDFCache(cache_dir=tmp_path / 'cache', max_bytes=1, grace_seconds=600)
+    first = add(cache, tmp_path, b'%PDF-1.4 first', url=OLD_URL)
+    add(cache, tmp_path, b'%PDF-1.4 second', url=NEW_URL)
+
+    assert Path(first).exists()
+    assert cache.evict() == 0
@@ -0,0 +1,130 @@
+"""PDFDownloader streaming, Range resume, conditional GET and error wrapping"""
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import pdf_downloader
+from pdf_cache import PDFCache
+from pdf_downloader import PDFDownloader, DownloadError
+
+BODY = b'%PDF-1.4 ' + bytes(range(256)) * 64
+ETAG = '"v1"'
+
+class PDFHandler(BaseHTTPRequestHandler):
+    """Serves BODY with an ETag, honouring Range / If-Range / If-None-Match
+
+    `drop_first` cuts the first full response off halfway, like a dropped connection.
+    """
+
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    drop_first = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.path != '/contract.pdf':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.end_headers()
+            return
+
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') in (None, ETAG):
+            start = int(range_header[len('bytes='):].rstrip('-'))
+            body = BODY[start:]
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        else:
+            body = BODY
+            self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if type(self).drop_first and self.headers.get('Range') is None:
+            type(self).drop_first = False
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+@pytest.fixture
+def server(monkeypatch):
+    """Local PDF server; yields its base URL"""
+    monkeypatch.setattr(PDFHandler, 'requests_seen', [])
+    monkeypatch.setattr(PDFHandler, 'drop_first', False)
+    monkeypatch.setattr(pdf_downloader, 'time', SimpleNamespace(sleep=lambda seconds: None))
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PDFHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def downloader(tmp_path):
+    return PDFDownloader(cache=PDFCache(cache_dir=tmp_path / 'cache'), chunk_size=1024, timeout=(5, 5))
+
+def test_download_streams_into_the_cache(server, tmp_path):
+    engine = downloader(tmp_path)
+    url = f"{server}/contract.pdf"
+
+    path = engine.download(url, contract_id='c1')
+    with open(path, 'rb') as f:
+        assert f.read() == BODY
+    assert engine.download(url, contract_id='c1') == path
+    assert engine.stats()['downloads'] == 1
+    assert engine.stats()['cache_hits'] == 1
+    assert len(PDFHandler.requests_seen) == 1
+
+def test_dropped_connection_resumes_with_range(server, tmp_path):
+    PDFHandler.drop_first = True
+    engine = downloader(tmp_path)
+
+    path = engine.download(f"{server}/contract.pdf")
+    with open(path, 'rb') as f:
+        assert f.read() == BODY
+    assert engine.resumes == 1
+
+    resumed = PDFHandler.requests_seen[-1]
+    offset = int(resumed['Range'][len('bytes='):].rstrip('-'))
+    assert 0 < offset <= len(BODY) // 2  # Whatever reached the disk before the drop
+    assert resumed['If-Range'] == ETAG
+    assert not list((tmp_path / 'cache' / 'partial').iterdir())
+
+def test_revalidate_sends_conditional_get(server, tmp_path):
+    engine = downloader(tmp_path)
+    url = f"{server}/contract.pdf"
+    path = engine.download(url)
+
+    assert engine.download(url, revalidate=True) == path
+    assert PDFHandler.requests_seen[-1]['If-None-Match'] == ETAG
+    assert engine.not_modified == 1
+
+def test_http_error_raises_download_error(server, tmp_path):
+    engine = downloader(tmp_path)
+    with pytest.raises(DownloadError, match='HTTP error'):
+        engine.download(f"{server}/missing.pdf")
+    assert not list((tmp_path / 'cache' / 'partial').iterdir())
+
+def test_invalid_url_raises_download_error(tmp_path):
+    engine = downloader(tmp_path)
+    with pytest.raises(DownloadError):
+        engine.download('http://')
+
+def test_unreachable_host_gives_up_after_max_attempts(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_downloader, 'time', SimpleNamespace(sleep=lambda seconds: None))
+    engine = PDFDownloader(cache=PDFCache(cache_dir=tmp_path / 'cache'), timeout=(1, 1), max_attempts=2)
+    with pytest.raises(DownloadError, match='after 2 attempts'):
+        engine.download('http://127.0.0.1:1/contract.pdf')
@@ -0,0 +1,84 @@
+"""PDF preflight checks and the pdf_metadata index"""
+import sqlite3
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from pdf_preflight import (inspect_pdf, metadata_params, setup_pdf_metadata, known_page_counts,
+                           metadata_summary, UPSERT_METADATA_SQL, PASSWORD_ERROR)
+
+TEXT = ['Contrato-programa entre o hospital e a administracao regional de saude.']
+
+def test_html_error_page_is_not_a_pdf(tmp_path):
+    path = tmp_path / 'error.pdf'
+    path.write_bytes(b'<!DOCTYPE html><html><body>404 Not Found</body></html>')
+    metadata = inspect_pdf(path)
+
+    assert not metadata['is_pdf']
+    assert metadata['error'] == "Not a PDF (HTML page)"
+    assert metadata['byte_size'] == path.stat().st_size
+    assert len(metadata['pdf_sha256']) == 64
+
+def test_empty_file_is_not_a_pdf(tmp_path):
+    path = tmp_path / 'empty.pdf'
+    path.write_bytes(b'')
+    assert inspect_pdf(path)['error'] == "Not a PDF (empty file)"
+
+def test_pdf_page_count_and_text_layer(make_pdf):
+    metadata = inspect_pdf(make_pdf([TEXT, None, None]))
+    assert metadata['is_pdf'] and metadata['error'] is None
+    assert metadata['page_count'] == 3
+    assert metadata['encrypted'] is False
+    assert metadata['has_text_layer'] is True
+
+def test_scanned_pdf_has_no_text_layer(make_pdf):
+    assert inspect_pdf(make_pdf([None, None]))['has_text_layer'] is False
+
+def test_password_protected_pdf_fails_preflight(make_pdf, tmp_path):
+    writer = PdfWriter()
+    for page in PdfReader(str(make_pdf([TEXT]))).pages:
+        writer.add_page(page)
+    writer.encrypt(user_password='secret', owner_password='owner')
+    path = tmp_path / 'locked.pdf'
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+    metadata = inspect_pdf(path)
+    assert metadata['encrypted'] is True
+    assert metadata['error'] == PASSWORD_ERROR
+    assert metadata['page_count'] is None
+
+def make_db(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, original_pdf_url TEXT)")
+    conn.executemany("INSERT INTO contracts VALUES (?, ?)", rows)
+    setup_pdf_metadata(conn)
+    return conn
+
+def test_known_page_counts_ignore_changed_urls(make_pdf):
+    conn = make_db([('c1', 'https://a/1.pdf'), ('c2', 'https://a/2-new.pdf')])
+    metadata = inspect_pdf(make_pdf([TEXT, TEXT]))
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('c1', 'https://a/1.pdf', metadata))
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('c2', 'https://a/2-old.pdf', metadata))
+
+    assert known_page_counts(conn) == {'c1': 2}
+
+def test_upsert_replaces_the_previous_check(make_pdf, tmp_path):
+    conn = make_db([('c1', 'https://a/1.pdf')])
+    html = tmp_path / 'error.pdf'
+    html.write_bytes(b'<html></html>')
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('c1', 'https://a/1.pdf', inspect_pdf(html)))
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('c1', 'https://a/1.pdf', inspect_pdf(make_pdf([TEXT]))))
+
+    assert conn.execute("SELECT COUNT(*), MAX(is_pdf) FROM pdf_metadata").fetchone() == (1, 1)
+
+def test_metadata_summary_counts(make_pdf, tmp_path):
+    conn = make_db([])
+    html = tmp_path / 'error.pdf'
+    html.write_bytes(b'<html></html>')
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('html', None, inspect_pdf(html)))
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('scan', None, inspect_pdf(make_pdf([None] * 3, 'scan.pdf'))))
+    conn.execute(UPSERT_METADATA_SQL, metadata_params('text', None, inspect_pdf(make_pdf([TEXT], 'text.pdf'))))
+
+    assert metadata_summary(conn, max_pages=2) == {
+        'checked': 3, 'not_pdf': 1, 'password_protected': 0, 'no_text_layer': 1, 'over_limit': 1,
+    }
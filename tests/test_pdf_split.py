@@ -0,0 +1,65 @@
+"""Page-range sharding and merging of per-chunk responses"""
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+from pdf_split import split_pdf, cleanup_shards, merge_responses
+
+def block(block_id, page, children=()):
+    return {'blockId': str(block_id), 'pageSpan': {'pageStart': page, 'pageEnd': page},
+            'tableBlock': {'bodyRows': [{'cells': [{'blocks': list(children)}]}]}}
+
+def response(*blocks):
+    return {'document': {'documentLayout': {'blocks': list(blocks)}}}
+
+def test_small_pdf_is_a_single_chunk(make_pdf):
+    pdf_path = make_pdf([None] * 3)
+    assert split_pdf(pdf_path, shard_pages=30) == [(str(pdf_path), 1)]
+
+def test_split_into_chunks_with_first_pages(make_pdf):
+    pdf_path = make_pdf([None] * 7)
+    shards = split_pdf(pdf_path, shard_pages=3)
+    try:
+        assert [first_page for _, first_page in shards] == [1, 4, 7]
+        assert [len(PdfReader(path).pages) for path, _ in shards] == [3, 3, 1]
+    finally:
+        cleanup_shards(shards, pdf_path)
+    assert all(not Path(path).exists() for path, _ in shards)
+    assert pdf_path.exists()
+
+def test_merge_offsets_page_spans_to_the_full_document():
+    merged = merge_responses([
+        (response(block(1, 1), block(2, 3)), 1),
+        (response(block(1, 1), block(2, 2)), 31),
+    ])
+    spans = [b['pageSpan']['pageStart'] for b in merged['document']['documentLayout']['blocks']]
+    assert spans == [1, 3, 31, 32]
+
+def test_merge_keeps_block_ids_unique_including_nested_blocks():
+    first = response(block(1, 1, [block(2, 1)]), block(3, 2))
+    second = response(block(1, 1, [block(2, 1, [block(3, 1)])]))
+    merged = merge_responses([(first, 1), (second, 31)])
+
+    ids = []
+    def collect(obj):
+        if isinstance(obj, dict):
+            if 'blockId' in obj:
+                ids.append(obj['blockId'])
+            for value in obj.values():
+                collect(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                collect(item)
+    collect(merged)
+
+    assert ids == ['1', '2', '3', '4', '5', '6']
+    nested = merged['document']['documentLayout']['blocks'][2]['tableBlock']['bodyRows'][0]['cells'][0]['blocks'][0]
+    assert nested['pageSpan'] == {'pageStart': 31, 'pageEnd': 31}
+
+def test_merge_reads_responses_without_document_wrapper():
+    merged = merge_responses([({'documentLayout': {'blocks': [block(1, 2)]}}, 11)])
+    assert merged['document']['documentLayout']['blocks'][0]['pageSpan']['pageStart'] == 12
+
+def test_non_numeric_block_ids_are_left_alone():
+    merged = merge_responses([(response({'blockId': 'a'}), 1), (response({'blockId': 'b'}), 31)])
+    assert [b['blockId'] for b in merged['document']['documentLayout']['blocks']] == ['a', 'b']
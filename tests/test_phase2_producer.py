@@ -0,0 +1,76 @@
+"""Phase 2 id producer: keyset paging, bounded queue, claims and poison pills"""
+import asyncio
+import sqlite3
+
+import llm_extract_tables_openai
+from llm_extract_tables_openai import GPT5TableExtractor
+
+PENDING = "raw_json IS NOT NULL AND llm_extracted_tables IS NULL"
+
+def make_db(tmp_path, count=10):
+    db_path = tmp_path / 'contracts.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, raw_json TEXT, llm_extracted_tables TEXT)")
+    conn.executemany("INSERT INTO contracts VALUES (?, ?, ?)",
+                     [(f"c{i:02d}", '{}', '{}' if i == 4 else None) for i in range(count)])
+    conn.commit()
+    conn.close()
+    return db_path
+
+def produce(extractor, total, ordered_ids=None, queue_depth=2):
+    """Run produce_ids against a slow consumer
+
+    Returns:
+        tuple: (queued items, largest queue size seen)
+    """
+    async def scenario():
+        queue = asyncio.Queue(maxsize=queue_depth)
+        producer = asyncio.create_task(extractor.produce_ids(queue, PENDING, total, ordered_ids))
+        items, peak = [], 0
+        while len([item for item in items if item is None]) < extractor.num_workers:
+            peak = max(peak, queue.qsize())
+            items.append(await queue.get())
+            await asyncio.sleep(0)
+        await producer
+        return items, peak
+
+    return asyncio.run(scenario())
+
+def test_ids_are_paged_in_order_up_to_total(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_extract_tables_openai, 'ID_PAGE_SIZE', 3)
+    extractor = GPT5TableExtractor(num_workers=2, db_path=make_db(tmp_path))
+
+    items, peak = produce(extractor, total=7)
+    assert items[:-2] == [(1, 'c00'), (2, 'c01'), (3, 'c02'), (4, 'c03'), (5, 'c05'), (6, 'c06'), (7, 'c07')]
+    assert items[-2:] == [None, None]  # One poison pill per worker
+    assert peak <= 2
+
+def test_unclaimed_ids_are_skipped_without_using_up_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_extract_tables_openai, 'ID_PAGE_SIZE', 2)
+    extractor = GPT5TableExtractor(num_workers=1, db_path=make_db(tmp_path))
+
+    async def claim(contract_id):
+        return contract_id not in ('c01', 'c02')
+    extractor.claim = claim
+
+    items, _ = produce(extractor, total=4)
+    assert items == [(1, 'c00'), (2, 'c03'), (3, 'c05'), (4, 'c06'), None]
+
+def test_ordered_ids_replace_paging(tmp_path):
+    extractor = GPT5TableExtractor(num_workers=1, db_path=make_db(tmp_path))
+
+    items, _ = produce(extractor, total=3, ordered_ids=['c09', 'c00', 'c05'])
+    assert items == [(1, 'c09'), (2, 'c00'), (3, 'c05'), None]
+
+def test_poison_pills_are_sent_when_the_query_fails(tmp_path):
+    extractor = GPT5TableExtractor(num_workers=2, db_path=make_db(tmp_path))
+
+    async def scenario():
+        queue = asyncio.Queue()
+        try:
+            await extractor.produce_ids(queue, "no_such_column = 1", 5)
+        except sqlite3.OperationalError:
+            pass
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert asyncio.run(scenario()) == [None, None]
@@ -0,0 +1,71 @@
+"""Token buckets, the named-bucket registry and the LLM token estimate"""
+import asyncio
+import threading
+import time
+
+from rate_limiter import TokenBucket, RateLimiter
+from call_llm import estimate_tokens, DEFAULT_OUTPUT_RESERVE
+
+def test_burst_up_to_capacity_does_not_wait():
+    bucket = TokenBucket('test', rate_per_minute=60, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+def test_reservations_past_capacity_queue_in_order():
+    bucket = TokenBucket('test', rate_per_minute=60, capacity=1)
+    bucket.reserve()
+
+    # One token per second: the 2nd and 3rd callers wait ~1s and ~2s
+    second, third = bucket.reserve(), bucket.reserve()
+    assert 0.9 < second <= 1.0
+    assert 1.9 < third <= 2.0
+
+def test_request_larger_than_capacity_still_gets_through():
+    bucket = TokenBucket('test', rate_per_minute=600, capacity=10)
+    wait = bucket.reserve(30)
+    assert 1.9 < wait <= 2.0
+
+def test_refill_restores_tokens():
+    bucket = TokenBucket('test', rate_per_minute=6000, capacity=1)
+    bucket.reserve()
+    time.sleep(0.05)
+    assert bucket.reserve() == 0.0
+
+def test_concurrent_acquires_never_overspend():
+    bucket = TokenBucket('test', rate_per_minute=60, capacity=5)
+    waits = []
+
+    def worker():
+        waits.append(bucket.reserve())
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 5 from the burst, the other 5 spread one second apart
+    assert sorted(round(w) for w in waits) == [0, 0, 0, 0, 0, 1, 2, 3, 4, 5]
+
+def test_acquire_async_sleeps_for_the_reserved_wait():
+    bucket = TokenBucket('test', rate_per_minute=1200, capacity=1)
+
+    async def scenario():
+        await bucket.acquire_async()
+        started = time.monotonic()
+        waited = await bucket.acquire_async()
+        return waited, time.monotonic() - started
+
+    waited, elapsed = asyncio.run(scenario())
+    assert waited > 0 and elapsed >= waited * 0.9
+
+def test_unconfigured_bucket_is_a_no_op():
+    limiter = RateLimiter()
+    assert limiter.acquire('missing', 1000) == 0.0
+    assert limiter.configure('disabled', 0) is None
+    assert limiter.acquire('disabled') == 0.0
+    assert limiter.stats() == {}
+
+def test_estimate_includes_system_prompt_and_output():
+    prompt, system = 'x' * 400, 'y' * 40
+    assert estimate_tokens(prompt) == 100 + DEFAULT_OUTPUT_RESERVE
+    assert estimate_tokens(prompt, system, max_tokens=500) == 110 + 500
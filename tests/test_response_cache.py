@@ -0,0 +1,50 @@
+"""ResponseCache keys and pack linking"""
+import base64
+
+import pytest
+
+import json_codec
+import response_cache
+from response_cache import ResponseCache
+from response_pack import ResponsePackWriter, ResponsePackReader
+
+ENDPOINT = 'https://eu-documentai.googleapis.com/v1/projects/p/locations/eu/processors/abc:process'
+
+def inline_body(content):
+    return {'rawDocument': {'content': base64.b64encode(content).decode('ascii'), 'mimeType': 'application/pdf'}}
+
+@pytest.fixture
+def packs(tmp_path, monkeypatch):
+    writer, reader = ResponsePackWriter(pack_dir=tmp_path), ResponsePackReader(pack_dir=tmp_path)
+    monkeypatch.setattr(response_cache, 'get_pack_writer', lambda: writer)
+    monkeypatch.setattr(response_cache, 'get_pack_reader', lambda: reader)
+    return tmp_path
+
+def test_gcs_requests_are_not_cached():
+    cache = ResponseCache(ENDPOINT, enabled=True)
+    gcs_body = {'gcsDocument': {'gcsUri': 'gs://bucket/contract.pdf', 'mimeType': 'application/pdf'}}
+
+    assert cache.key(gcs_body) is None
+    assert cache.response_key([cache.key(inline_body(b'%PDF-1')), cache.key(gcs_body)]) is None
+    assert cache.get(None) is None
+
+def test_key_depends_on_content_and_pages():
+    cache = ResponseCache(ENDPOINT, enabled=True)
+    body = inline_body(b'%PDF-1 a')
+
+    assert cache.key(body, '1-') == cache.key(inline_body(b'%PDF-1 a'), '1-')
+    assert cache.key(body, '1-') != cache.key(inline_body(b'%PDF-1 b'), '1-')
+    assert cache.key(body, '1-') != cache.key(body, '3,4')
+    assert ResponseCache(ENDPOINT, enabled=False).key(body) is None
+
+def test_link_reuses_the_packed_raw_json(packs):
+    cache = ResponseCache(ENDPOINT, enabled=True)
+    response = {'document': {'text': 'x' * 5000}}
+    pointer = response_cache.get_pack_writer().append('contract-1', json_codec.dumps(response))
+    pack_bytes = sum(path.stat().st_size for path in packs.glob('*.pack'))
+
+    key = cache.response_key([cache.key(inline_body(b'%PDF-1 a'), '1-')])
+    cache.link(key, pointer)
+
+    assert sum(path.stat().st_size for path in packs.glob('*.pack')) == pack_bytes
+    assert cache.get(key) == response
@@ -0,0 +1,31 @@
+"""Cost-based ordering (scheduler.predict_costs)"""
+import sqlite3
+
+from scheduler import predict_costs, order_by_cost, ORDER_LPT, ORDER_SPT
+from stage_timer import PHASE1, setup_stage_timings
+
+def make_db(sizes):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, hospital_name TEXT, raw_json BLOB)")
+    setup_stage_timings(conn)
+    for contract_id in sizes:
+        conn.execute("INSERT INTO contracts (id, hospital_name) VALUES (?, 'H')", (contract_id,))
+    return conn
+
+def test_page_count_drives_phase1_costs():
+    # 'small' is a small file with many pages (scans compress well), 'big' the opposite
+    sizes = {'small': 100_000, 'big': 5_000_000}
+    conn = make_db(sizes)
+    pages = {'small': 120, 'big': 4}
+
+    assert order_by_cost(conn, ['big', 'small'], PHASE1, ORDER_LPT, extra_sizes=sizes, page_counts=pages) == ['small', 'big']
+    assert order_by_cost(conn, ['big', 'small'], PHASE1, ORDER_SPT, extra_sizes=sizes, page_counts=pages) == ['big', 'small']
+
+def test_size_is_the_fallback_without_page_count():
+    sizes = {'a': 100_000, 'b': 5_000_000, 'c': 1_000_000}
+    conn = make_db(sizes)
+
+    costs = predict_costs(conn, list(sizes), PHASE1, extra_sizes=sizes, page_counts={'a': 30})
+    assert costs['a'] == 1.0              # Only contract with pages: the page median
+    assert costs['b'] > costs['c']        # By size
+    assert order_by_cost(conn, list(sizes), PHASE1, ORDER_LPT, extra_sizes=sizes) == ['b', 'c', 'a']
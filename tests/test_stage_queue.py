@@ -0,0 +1,58 @@
+"""StageQueue back-pressure and statistics"""
+import asyncio
+
+from stage_queue import StageQueue
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+def test_full_queue_blocks_producer_until_a_get():
+    async def scenario():
+        queue = StageQueue('test', maxsize=2)
+        await queue.put(1)
+        await queue.put(2)
+
+        blocked = asyncio.create_task(queue.put(3))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+
+        assert await queue.get() == 1
+        await asyncio.wait_for(blocked, timeout=1)
+        return queue
+
+    queue = run(scenario())
+    stats = queue.stats()
+    assert stats['items'] == 3
+    assert stats['max_depth'] == 2
+    assert stats['maxsize'] == 2
+    assert stats['put_wait'] >= 0.04
+
+def test_empty_queue_records_consumer_idle_time():
+    async def scenario():
+        queue = StageQueue('test', maxsize=1)
+
+        async def late_producer():
+            await asyncio.sleep(0.05)
+            await queue.put('job')
+
+        producer = asyncio.create_task(late_producer())
+        assert await queue.get() == 'job'
+        await producer
+        return queue
+
+    queue = run(scenario())
+    assert queue.stats()['get_wait'] >= 0.04
+
+def test_fifo_order_and_mean_depth():
+    async def scenario():
+        queue = StageQueue('test')
+        for i in range(5):
+            await queue.put(i)
+        await asyncio.sleep(0.02)
+        return queue, [await queue.get() for _ in range(5)]
+
+    queue, items = run(scenario())
+    assert items == [0, 1, 2, 3, 4]
+    stats = queue.stats()
+    assert stats['max_depth'] == 5
+    assert 0 < stats['mean_depth'] <= 5
@@ -0,0 +1,69 @@
+"""StageTimer recording, flushing through the writer and percentiles"""
+import sqlite3
+import time
+
+from db_writer import BatchedDBWriter
+from stage_timer import StageTimer, PHASE1, setup_stage_timings, stage_percentiles, percentile
+
+def test_stage_records_time_and_meta_set_inside_the_block():
+    timer = StageTimer('c1', PHASE1)
+    with timer.stage('docai', payload_bytes=100) as meta:
+        time.sleep(0.01)
+        meta['retries'] = 2
+        meta['http_status'] = 200
+
+    [(name, seconds, payload_bytes, retries, http_status)] = timer.records
+    assert (name, payload_bytes, retries, http_status) == ('docai', 100, 2, 200)
+    assert seconds >= 0.01
+
+def test_stage_is_recorded_when_the_block_raises():
+    timer = StageTimer('c1', PHASE1)
+    try:
+        with timer.stage('download'):
+            raise RuntimeError("connection reset")
+    except RuntimeError:
+        pass
+    assert [record[0] for record in timer.records] == ['download']
+
+def test_total_sums_repeated_stages():
+    timer = StageTimer('c1', PHASE1)
+    timer.add('docai', 1.0)
+    timer.add('docai', 0.5)
+    timer.add('filter', 0.1)
+    assert timer.total('docai') == 1.5
+
+def test_flush_writes_rows_and_clears_the_timer(tmp_path):
+    db_path = tmp_path / 'timings.db'
+    conn = sqlite3.connect(db_path)
+    setup_stage_timings(conn)
+    conn.close()
+
+    writer = BatchedDBWriter(db_path).start()
+    timer = StageTimer('c1', PHASE1)
+    timer.add('download', 0.25, payload_bytes=2048)
+    timer.add('docai', 3.0, retries=1, http_status=429)
+    timer.flush(writer)
+    writer.close()
+
+    assert timer.records == []
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT contract_id, phase, stage, seconds, payload_bytes, retries, http_status "
+                        "FROM stage_timings ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [('c1', PHASE1, 'download', 0.25, 2048, None, None), ('c1', PHASE1, 'docai', 3.0, None, 1, 429)]
+
+def test_percentiles_per_stage():
+    conn = sqlite3.connect(':memory:')
+    setup_stage_timings(conn)
+    conn.executemany("INSERT INTO stage_timings (contract_id, phase, stage, seconds, retries) VALUES (?, ?, ?, ?, ?)",
+                     [(f'c{i}', PHASE1, 'docai', float(i), 1 if i == 100 else None) for i in range(1, 101)])
+
+    stats = stage_percentiles(conn, PHASE1)['docai']
+    assert (stats['count'], stats['p50'], stats['p95'], stats['p99']) == (100, 50.0, 95.0, 99.0)
+    assert stats['total'] == 5050.0 and stats['retries'] == 1
+    assert stage_percentiles(conn, 'phase2') == {}
+
+def test_percentiles_without_table_or_values():
+    assert stage_percentiles(sqlite3.connect(':memory:'), PHASE1) == {}
+    assert percentile([], 50) is None
+    assert percentile([7.0], 99) == 7.0
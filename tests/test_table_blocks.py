@@ -0,0 +1,41 @@
+"""materialize_table_blocks and the table_blocks column migration"""
+import json
+import sqlite3
+
+from table_blocks import materialize_table_blocks, ensure_table_blocks_columns, TABLE_BLOCKS_COLUMNS
+
+def cells(n):
+    return [{'blocks': [{'textBlock': {'text': str(i)}}]} for i in range(n)]
+
+RESPONSE = {'document': {'documentLayout': {'blocks': [
+    {'blockId': '1', 'pageSpan': {'pageStart': 1, 'pageEnd': 1}, 'textBlock': {'text': 'Clausula 1'}},
+    {'blockId': '2', 'pageSpan': {'pageStart': 2, 'pageEnd': 2}, 'textBlock': {'text': 'Anexo', 'blocks': [
+        {'blockId': '3', 'tableBlock': {'headerRows': [{'cells': cells(2)}],
+                                        'bodyRows': [{'cells': cells(2)}, {'cells': cells(2)}]}},
+    ]}},
+    {'blockId': '4', 'pageSpan': {'pageStart': 3, 'pageEnd': 3}, 'tableBlock': {'bodyRows': [{'cells': cells(3)}]}},
+]}, 'text': 'full document text ' * 100}}
+
+def test_only_table_blocks_are_kept_with_their_page_spans():
+    table_blocks_json, num_blocks, num_cells = materialize_table_blocks(RESPONSE)
+    blocks = json.loads(table_blocks_json)['documentLayout']['blocks']
+
+    assert (num_blocks, num_cells) == (2, 9)
+    assert [block['blockId'] for block in blocks] == ['3', '4']
+    # A nested table inherits its parent's pageSpan
+    assert blocks[0]['pageSpan'] == {'pageStart': 2, 'pageEnd': 2}
+    assert 'full document text' not in table_blocks_json
+
+def test_response_without_tables():
+    table_blocks_json, num_blocks, num_cells = materialize_table_blocks({'document': {'text': 'x'}})
+    assert json.loads(table_blocks_json) == {'documentLayout': {'blocks': []}}
+    assert (num_blocks, num_cells) == (0, 0)
+
+def test_columns_are_added_once():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY)")
+    ensure_table_blocks_columns(conn)
+    ensure_table_blocks_columns(conn)
+
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(contracts)").fetchall()]
+    assert columns == ['id'] + [name for name, _ in TABLE_BLOCKS_COLUMNS]
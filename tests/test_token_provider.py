@@ -0,0 +1,105 @@
+"""TokenProvider caching, shared file cache and invalidation"""
+import os
+import stat
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import token_provider
+from token_provider import TokenProvider
+
+class FakeCredentials:
+    """Counts refreshes; every refresh hands out a new token valid for an hour"""
+
+    def __init__(self, refresh_token='account-1'):
+        self.refresh_token = refresh_token
+        self.token = None
+        self.expiry = None
+        self.refresh_calls = 0
+        self.lock = threading.Lock()
+
+    def refresh(self, request):
+        with self.lock:
+            self.refresh_calls += 1
+            self.token = f"token-{self.refresh_calls}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+@pytest.fixture(autouse=True)
+def no_google_request(monkeypatch):
+    monkeypatch.setattr(token_provider, '_request', lambda: None)
+
+def test_token_is_reused_until_close_to_expiry(tmp_path):
+    credentials = FakeCredentials()
+    tokens = TokenProvider(credentials, cache_path=None)
+
+    assert tokens.get_token() == tokens.get_token() == 'token-1'
+    assert credentials.refresh_calls == 1
+
+    # Inside the refresh margin: refreshed again
+    tokens.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=10)
+    assert tokens.get_token() == 'token-2'
+
+def test_concurrent_callers_share_one_refresh():
+    credentials = FakeCredentials()
+    tokens = TokenProvider(credentials, cache_path=None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tokens.get_token())) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(results) == {'token-1'}
+    assert credentials.refresh_calls == 1
+
+def test_second_process_adopts_the_shared_token(tmp_path):
+    cache_path = tmp_path / 'token_cache.json'
+    first = TokenProvider(FakeCredentials(), cache_path=cache_path)
+    second_credentials = FakeCredentials()
+    second = TokenProvider(second_credentials, cache_path=cache_path)
+
+    assert first.get_token() == 'token-1'
+    assert second.get_token() == 'token-1'
+    assert second_credentials.refresh_calls == 0
+    assert second.stats()['shared_hits'] == 1
+
+def test_other_account_does_not_reuse_the_token(tmp_path):
+    cache_path = tmp_path / 'token_cache.json'
+    TokenProvider(FakeCredentials('account-1'), cache_path=cache_path).get_token()
+    other_credentials = FakeCredentials('account-2')
+    TokenProvider(other_credentials, cache_path=cache_path).get_token()
+    assert other_credentials.refresh_calls == 1
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX file modes')
+def test_cache_file_is_owner_only(tmp_path):
+    cache_path = tmp_path / 'token_cache.json'
+    TokenProvider(FakeCredentials(), cache_path=cache_path).get_token()
+    assert stat.S_IMODE(cache_path.stat().st_mode) == 0o600
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
+
+def test_invalidate_drops_the_rejected_token_everywhere(tmp_path):
+    cache_path = tmp_path / 'token_cache.json'
+    credentials = FakeCredentials()
+    tokens = TokenProvider(credentials, cache_path=cache_path)
+    token = tokens.get_token()
+
+    tokens.invalidate(token)
+    assert not cache_path.exists()
+    assert tokens.get_token() == 'token-2'
+
+def test_invalidate_keeps_a_newer_shared_token(tmp_path):
+    cache_path = tmp_path / 'token_cache.json'
+    stale = TokenProvider(FakeCredentials(), cache_path=cache_path)
+    old_token = stale.get_token()
+
+    # Another process refreshed in the meantime and saved its token
+    newer_credentials = FakeCredentials()
+    newer_credentials.refresh_calls = 1
+    newer = TokenProvider(newer_credentials, cache_path=cache_path)
+    newer._refresh()
+    newer._save_shared()
+
+    stale.invalidate(old_token)
+    assert cache_path.exists()
+    assert stale.get_token() == 'token-2'
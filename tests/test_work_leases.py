@@ -0,0 +1,131 @@
+"""WorkLeases claiming, expiry, heartbeat and done markers across owners"""
+import time
+import sqlite3
+
+from work_leases import WorkLeases, RELEASE_SQL, TASK_PHASE1, setup_work_leases, lease_summary
+
+def make_db(tmp_path, statuses):
+    db_path = tmp_path / 'leases.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE contracts (id TEXT PRIMARY KEY, extraction_status TEXT)")
+    conn.executemany("INSERT INTO contracts VALUES (?, ?)", statuses.items())
+    setup_work_leases(conn)
+    conn.close()
+    return db_path
+
+def set_status(db_path, contract_id, status):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE contracts SET extraction_status = ? WHERE id = ?", (status, contract_id))
+    conn.close()
+
+def test_only_one_owner_claims_a_contract(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, owner='a')
+    second = WorkLeases(db_path, TASK_PHASE1, owner='b')
+
+    assert first.claim('c1')
+    assert not second.claim('c1')
+    assert second.stats()['skipped'] == 1
+
+def test_expired_lease_is_taken_over(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    dead = WorkLeases(db_path, TASK_PHASE1, owner='dead', lease_seconds=0.05)
+    alive = WorkLeases(db_path, TASK_PHASE1, owner='alive')
+
+    assert dead.claim('c1')
+    time.sleep(0.1)
+    assert alive.claim('c1')
+
+def test_heartbeat_keeps_lease_alive(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    holder = WorkLeases(db_path, TASK_PHASE1, owner='holder', lease_seconds=0.3)
+    other = WorkLeases(db_path, TASK_PHASE1, owner='other')
+    holder.start()
+    try:
+        assert holder.claim('c1')
+        time.sleep(0.6)
+        assert not other.claim('c1')
+    finally:
+        holder.stop()
+
+def test_pending_condition_is_checked_in_the_claim(tmp_path):
+    db_path = make_db(tmp_path, {'done': 'success', 'todo': 'failed'})
+    leases = WorkLeases(db_path, TASK_PHASE1, pending_sql="extraction_status IN ('pending', 'failed')")
+
+    assert not leases.claim('done')
+    assert leases.claim('todo')
+
+def test_finished_contract_is_not_reclaimed_without_pending_condition(tmp_path):
+    # --no-resume / --changed-only: no pending condition, only the done marker protects it
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, owner='a')
+    second = WorkLeases(db_path, TASK_PHASE1, owner='b')
+
+    assert first.claim('c1')
+    first.release('c1')
+    assert not second.claim('c1')
+
+def test_failed_contract_is_not_reclaimed_by_the_same_run(tmp_path):
+    pending = "extraction_status IN ('pending', 'failed')"
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, pending_sql=pending, owner='a')
+    second = WorkLeases(db_path, TASK_PHASE1, pending_sql=pending, owner='b')
+
+    assert first.claim('c1')
+    set_status(db_path, 'c1', 'failed')
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(RELEASE_SQL, first.release_params('c1'))
+    conn.close()
+
+    assert not second.claim('c1')
+    assert not first.claim('c1')
+
+def test_later_run_reclaims_finished_contract(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, owner='a')
+    assert first.claim('c1')
+    first.release('c1')
+
+    time.sleep(0.01)
+    later = WorkLeases(db_path, TASK_PHASE1, owner='b')
+    assert later.claim('c1')
+
+def test_shared_run_id_protects_contracts_finished_before_start(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, owner='a', run_id='run-1')
+    assert first.claim('c1')
+    first.release('c1')
+
+    time.sleep(0.01)
+    second = WorkLeases(db_path, TASK_PHASE1, owner='b', run_id='run-1')
+    assert not second.claim('c1')
+
+def test_stop_drops_unfinished_leases_but_keeps_done_markers(tmp_path):
+    db_path = make_db(tmp_path, {'c1': 'pending', 'c2': 'pending'})
+    first = WorkLeases(db_path, TASK_PHASE1, owner='a')
+    second = WorkLeases(db_path, TASK_PHASE1, owner='b')
+    assert first.claim('c1') and first.claim('c2')
+    first.release('c1')
+    first.stop()
+
+    assert second.claim('c2')
+    assert not second.claim('c1')
+
+    conn = sqlite3.connect(db_path)
+    assert lease_summary(conn) == {TASK_PHASE1: (1, 0)}
+    conn.close()
+
+def test_setup_adds_columns_to_existing_table(tmp_path):
+    db_path = tmp_path / 'old.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE work_leases (task TEXT, contract_id TEXT, claimed_by TEXT, claimed_at REAL,
+            heartbeat_at REAL, lease_expires_at REAL, attempts INTEGER DEFAULT 1, PRIMARY KEY (task, contract_id))
+    """)
+    setup_work_leases(conn)
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(work_leases)").fetchall()]
+    conn.close()
+
+    assert 'run_id' in columns and 'done_at' in columns